@@ -136,6 +136,14 @@ def create_app():
     app.register_blueprint(debug_bp, url_prefix='/api/debug')
     print("✅ Debug blueprint registered")
     
+    # Live camera streaming (WebSocket); optional dependency
+    from blueprints.stream import sock, STREAMING_AVAILABLE
+    if STREAMING_AVAILABLE and config.STREAMING_ENABLED:
+        sock.init_app(app)
+        print("✅ Stream WebSocket registered at /api/attendance/stream")
+    elif config.STREAMING_ENABLED:
+        print("⚠️  flask-sock not installed - live streaming disabled")
+    
     # Debug: Print all registered routes
     print(f"\n📋 Total routes registered: {len(list(app.url_map.iter_rules()))}")
     analytics_routes = [rule for rule in app.url_map.iter_rules() if 'analytics' in rule.rule]
@@ -149,6 +157,19 @@ def create_app():
     def health():
         return jsonify({'status': 'healthy', 'service': 'SmartAttendance API'})
     
+    # Readiness check: only route recognition traffic to warmed-up workers
+    @app.route('/ready')
+    def ready():
+        from recognizer.warmup import model_warmup
+        report = model_warmup.report()
+        report['service'] = 'SmartAttendance API'
+        return jsonify(report), 200 if report['ready'] else 503
+    
+    # Preload and warm up recognition models off the request path
+    if config.PRELOAD_MODELS:
+        from recognizer.warmup import model_warmup
+        model_warmup.start(background=True)
+    
     # Error handlers
     @app.errorhandler(404)
     def not_found(error):
@@ -163,26 +184,5 @@ def create_app():
 if __name__ == '__main__':
     app = create_app()
     
-    # Load model on startup (temporarily disabled)
-    # print("\n" + "="*60)
-    # print("LOADING FACE RECOGNITION MODEL")
-    # print("="*60)
-    # try:
-    #     from recognizer.loader import model_loader
-    #     success = model_loader.load_models()
-    #     if success:
-    #         print("✅ Model loaded successfully")
-    #         metadata = model_loader.get_metadata()
-    #         if metadata:
-    #             print(f"   Students: {metadata.get('num_classes', 0)}")
-    #             print(f"   Threshold: {metadata.get('threshold', 0):.4f}")
-    #     else:
-    #         print("❌ Model loading failed - recognition will not work")
-    # except Exception as e:
-    #     print(f"❌ Error loading model: {e}")
-    #     import traceback
-    #     traceback.print_exc()
-    # print("="*60 + "\n")
-    
     print(f"🚀 SmartAttendance API running on http://{config.HOST}:{config.PORT}")
     app.run(host=config.HOST, port=config.PORT, debug=config.DEBUG)
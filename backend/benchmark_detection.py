@@ -0,0 +1,185 @@
+"""
+Benchmark detection modes: latency and recall
+Compares the single-pass detectors (640 recognition, 320, 160 preview) with
+coarse-to-fine detection. Recall is measured against the 640 single pass as
+reference (a face counts as found at IoU >= 0.5), overall and for small faces.
+
+A synthetic crowded frame (a mosaic of the test images, one face per cell)
+checks that coarse-to-fine finds at least as many faces as the 640 single
+pass when a classroom is full; the script exits 1 if it does not.
+
+Usage:
+    python benchmark_detection.py --images path/to/classroom/photos [--repeats 5] [--crowded 24]
+"""
+
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+import cv2
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from recognizer.detector import DetectionResult
+from recognizer.model_registry import model_registry
+from recognizer.coarse_to_fine import CoarseToFineDetector
+from recognizer.tracker import iou_matrix
+
+MATCH_IOU = 0.5
+SMALL_FACE_PX = 40  # Faces shorter than this count as "back row"
+DET_THRESH = 0.5
+CROWDED_SIZE = (1280, 720)  # Recognition frames are decoded at up to 1280 px
+
+
+def single_pass(size):
+    """Detection function running one full-frame pass at size x size"""
+    def detect(img):
+        rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        dets, kpss = model_registry.detect(rgb, (size, size), DET_THRESH)
+        return DetectionResult.from_xyxy(dets[:, :4], dets[:, 4], kpss)
+    return detect
+
+
+def load_images(path, limit):
+    images = []
+    for img_path in sorted(Path(path).rglob('*')):
+        if img_path.suffix.lower() not in ('.jpg', '.jpeg', '.png'):
+            continue
+        img = cv2.imread(str(img_path))
+        if img is not None:
+            images.append(img)
+        if len(images) >= limit:
+            break
+    return images
+
+
+def crowded_frame(images, faces):
+    """
+    Mosaic of downscaled test images, one per grid cell
+
+    Returns:
+        (frame, cells) with the (x1, y1, x2, y2) cell of every placed image
+    """
+    width, height = CROWDED_SIZE
+    cols = int(np.ceil(np.sqrt(faces * width / height)))
+    rows = int(np.ceil(faces / cols))
+    cell_w, cell_h = width // cols, height // rows
+
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+    cells = []
+    for n in range(faces):
+        row, col = divmod(n, cols)
+        x1, y1 = col * cell_w, row * cell_h
+        frame[y1:y1 + cell_h, x1:x1 + cell_w] = cv2.resize(images[n % len(images)], (cell_w, cell_h))
+        cells.append((x1, y1, x1 + cell_w, y1 + cell_h))
+    return frame, cells
+
+
+def cells_found(cells, detection):
+    """Number of mosaic cells containing the center of at least one detection"""
+    if detection.num_faces == 0:
+        return 0
+    centers = detection.bboxes[:, :2] + detection.bboxes[:, 2:4] / 2
+    return sum(
+        1 for x1, y1, x2, y2 in cells
+        if np.any((centers[:, 0] >= x1) & (centers[:, 0] < x2) & (centers[:, 1] >= y1) & (centers[:, 1] < y2))
+    )
+
+
+def matched(reference, detection):
+    """Boolean mask of reference faces found by detection"""
+    if reference.num_faces == 0:
+        return np.zeros(0, dtype=bool)
+    if detection.num_faces == 0:
+        return np.zeros(reference.num_faces, dtype=bool)
+    return iou_matrix(reference.bboxes, detection.bboxes).max(axis=1) >= MATCH_IOU
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark single-pass vs coarse-to-fine detection')
+    parser.add_argument('--images', type=str, default='dataset/processed',
+                        help='Directory of test images (classroom photos work best)')
+    parser.add_argument('--limit', type=int, default=50, help='Maximum number of images')
+    parser.add_argument('--repeats', type=int, default=5, help='Timed runs per image')
+    parser.add_argument('--crowded', type=int, default=24,
+                        help='Faces in the synthetic crowded frame (0 = skip the crowded check)')
+    args = parser.parse_args()
+
+    images = load_images(args.images, args.limit)
+    if not images:
+        print(f"❌ No images found in {args.images}")
+        return 1
+
+    print("=" * 70)
+    print("DETECTION BENCHMARK")
+    print("=" * 70)
+    print(f"Images: {len(images)}, repeats: {args.repeats}")
+
+    modes = [
+        ('single-640', single_pass(640)),
+        ('single-320', single_pass(320)),
+        ('single-160', single_pass(160)),
+        ('coarse-to-fine', CoarseToFineDetector(det_thresh=DET_THRESH).detect),
+    ]
+
+    # Warm-up (model load + first inference)
+    for _, detect in modes:
+        detect(images[0])
+
+    references = [modes[0][1](img) for img in images]
+    total_faces = sum(r.num_faces for r in references)
+    small_masks = [r.bboxes[:, 3] < SMALL_FACE_PX for r in references]
+    total_small = int(sum(m.sum() for m in small_masks))
+    print(f"Reference faces (640): {total_faces}, small (<{SMALL_FACE_PX}px): {total_small}")
+
+    print(f"\n{'mode':<16} {'mean ms':>9} {'p95 ms':>9} {'recall':>8} {'small':>8} {'extra':>7}")
+    print("-" * 70)
+
+    for name, detect in modes:
+        timings = []
+        found = 0
+        found_small = 0
+        extra = 0
+
+        for img, reference, small in zip(images, references, small_masks):
+            for _ in range(args.repeats):
+                start = time.perf_counter()
+                detection = detect(img)
+                timings.append((time.perf_counter() - start) * 1000)
+
+            hits = matched(reference, detection)
+            found += int(hits.sum())
+            found_small += int(hits[small].sum())
+            extra += max(0, detection.num_faces - int(hits.sum()))
+
+        recall = found / total_faces if total_faces else 0.0
+        recall_small = found_small / total_small if total_small else 0.0
+        print(f"{name:<16} {np.mean(timings):>9.1f} {np.percentile(timings, 95):>9.1f} "
+              f"{recall * 100:>7.1f}% {recall_small * 100:>7.1f}% {extra:>7}")
+
+    print("-" * 70)
+    print("recall/small: share of 640 reference faces found (IoU >= 0.5)")
+    print("extra: detections with no matching reference face")
+
+    passed = True
+    if args.crowded > 0:
+        frame, cells = crowded_frame(images, args.crowded)
+        print(f"\nCrowded frame: {len(cells)} faces in {CROWDED_SIZE[0]}x{CROWDED_SIZE[1]}")
+        found = {name: cells_found(cells, detect(frame)) for name, detect in modes}
+        for name, count in found.items():
+            print(f"{name:<16} {count:>3}/{len(cells)} faces")
+
+        passed = found['coarse-to-fine'] >= found['single-640']
+        print(f"{'✅' if passed else '❌'} coarse-to-fine recall on the crowded frame "
+              f"{'is not worse than' if passed else 'is below'} the 640 single pass")
+
+    print("=" * 70)
+    return 0 if passed else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
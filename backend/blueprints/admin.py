@@ -1155,33 +1155,114 @@ def export_attendance_excel():
 @jwt_required()
 @role_required('admin')
 def upload_model():
-    """Upload model files (admin only)"""
+    """
+    Upload model files (admin only)
+    
+    Creates a new model version from the active one with the uploaded file
+    replaced, and hot-swaps to it unless activate=false is given.
+    """
+    from recognizer.loader import model_loader
+    
     if 'file' not in request.files:
         return jsonify({'error': 'No file provided'}), 400
     
     file = request.files['file']
     file_type = request.form.get('type', 'classifier')
+    activate = request.form.get('activate', 'true').lower() in ('1', 'true', 'yes')
     
     if file.filename == '':
         return jsonify({'error': 'No file selected'}), 400
     
-    # Save file to models directory
     filename_map = {
         'classifier': 'face_classifier_v1.pkl',
         'encoder': 'label_encoder.pkl',
         'classes': 'label_encoder_classes.npy'
     }
     
-    filename = filename_map.get(file_type, file.filename)
-    filepath = os.path.join(config.MODEL_PATH, filename)
+    filename = filename_map.get(file_type)
+    if filename is None:
+        return jsonify({'error': f'Unknown model file type: {file_type}'}), 400
     
-    file.save(filepath)
+    try:
+        version = model_loader.create_version(
+            overrides={filename: file},
+            note=f'Uploaded {filename} ({file.filename})'
+        )
+    except Exception as e:
+        print(f"❌ Error creating model version: {e}")
+        return jsonify({'error': 'Failed to store model file', 'message': str(e)}), 500
+    
+    activated = model_loader.activate(version) if activate else False
     
     return jsonify({
         'message': 'Model file uploaded successfully',
-        'filename': filename
+        'filename': filename,
+        'version': version,
+        'activated': activated,
+        'active_version': model_loader.get_version()
+    }), 200 if activated or not activate else 500
+
+@admin_bp.route('/model-versions', methods=['GET'])
+@jwt_required()
+@role_required('admin')
+def list_model_versions():
+    """List published model versions and the active one (admin only)"""
+    from recognizer.loader import model_loader
+    
+    return jsonify({
+        'active_version': model_loader.get_version(),
+        'rollback_versions': model_loader.get_history(),
+        'versions': model_loader.list_versions()
     }), 200
 
+@admin_bp.route('/model-versions', methods=['POST'])
+@jwt_required()
+@role_required('admin')
+def publish_model_version():
+    """Snapshot the files in the model directory (e.g. after training) as a new version (admin only)"""
+    from recognizer.loader import model_loader
+    
+    data = request.get_json(silent=True) or {}
+    
+    try:
+        version = model_loader.create_version(source_dir=config.MODEL_PATH, note=data.get('note'))
+    except Exception as e:
+        print(f"❌ Error creating model version: {e}")
+        return jsonify({'error': 'Failed to create model version', 'message': str(e)}), 500
+    
+    activated = model_loader.activate(version) if data.get('activate', True) else False
+    
+    return jsonify({
+        'version': version,
+        'activated': activated,
+        'active_version': model_loader.get_version()
+    }), 201
+
+@admin_bp.route('/model-versions/<version>/activate', methods=['POST'])
+@jwt_required()
+@role_required('admin')
+def activate_model_version(version):
+    """Hot-swap to a published model version (admin only)"""
+    from recognizer.loader import model_loader
+    
+    if not model_loader.activate(version):
+        return jsonify({'error': f'Failed to activate model version {version}'}), 400
+    
+    return jsonify({'active_version': model_loader.get_version()}), 200
+
+@admin_bp.route('/model-versions/rollback', methods=['POST'])
+@jwt_required()
+@role_required('admin')
+def rollback_model_version():
+    """Swap back to the previously active model version (admin only)"""
+    from recognizer.loader import model_loader
+    
+    version = model_loader.rollback()
+    if version is None:
+        return jsonify({'error': 'No previous model version to roll back to'}), 400
+    
+    return jsonify({'active_version': version}), 200
+
 @admin_bp.route('/instructor/<instructor_id>', methods=['DELETE'])
 @jwt_required()
 @role_required('admin')
@@ -7,66 +7,453 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime, date, timedelta
 import logging
+import threading
 import traceback
+import io
+from collections import OrderedDict
 import sys
 import os
-import base64
-import io
-from PIL import Image
 import numpy as np
 
 from db.mysql import get_db
 from utils.security import role_required
 from utils.timezone_helper import get_ethiopian_time, convert_utc_to_ethiopian, format_time_for_display
 from middleware.working_security import working_security_check, working_audit_log
+from config import config
+from utils.image_ingest import decode_frame, FrameTooLarge
 
 attendance_bp = Blueprint('attendance', __name__)
 logger = logging.getLogger(__name__)
 
+# Section rosters of active sessions: session_id -> (loaded_at, student_ids),
+# least recently used first; dropped when a session ends
+ROSTER_CACHE_TTL = 300  # seconds; picks up newly enrolled students
+ROSTER_CACHE_MAX_SESSIONS = 256
+_roster_cache = OrderedDict()
+_roster_lock = threading.Lock()
 
-def decode_image_data(image_data):
+
+def decode_image_data(image_data, max_side=None):
     """
     Decode image from various formats: base64, file bytes, or data URL
     Returns: numpy array (BGR format for OpenCV)
+    
+    Thin wrapper over utils.image_ingest.decode_frame; max_side enables
+    reduced-resolution JPEG decoding down to the detector's input size.
     """
     try:
-        # Case 1: String (base64 or data URL)
-        if isinstance(image_data, str):
-            # Remove data URL prefix if present
-            if image_data.startswith('data:image'):
-                image_data = image_data.split(',')[1]
-            
-            # Decode base64
-            image_bytes = base64.b64decode(image_data)
-        
-        # Case 2: Already bytes
-        elif isinstance(image_data, bytes):
-            image_bytes = image_data
-        
-        else:
-            raise ValueError(f"Unsupported image data type: {type(image_data)}")
-        
-        # Convert to PIL Image
-        image = Image.open(io.BytesIO(image_bytes))
-        
-        # Convert to RGB if needed
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
-        
-        # Convert to numpy array (RGB)
-        img_array = np.array(image)
-        
-        # Convert RGB to BGR for OpenCV
-        import cv2
-        img_bgr = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
-        
-        return img_bgr
-        
+        return decode_frame(image_data, max_side=max_side)
+    except FrameTooLarge:
+        raise
     except Exception as e:
         logger.error(f"Image decoding error: {e}")
         raise ValueError(f"Failed to decode image: {str(e)}")
 
 
+def _get_session_roster(db, session):
+    """
+    Student IDs enrolled in the session's section/year, cached per session
+    
+    Used as the recognition candidate set so classification only scores
+    students who can actually attend this session.
+    """
+    import time
+    
+    session_id = str(session.get('id'))
+    with _roster_lock:
+        cached = _roster_cache.get(session_id)
+        if cached and time.time() - cached[0] < ROSTER_CACHE_TTL:
+            _roster_cache.move_to_end(session_id)
+            return cached[1]
+    
+    rows = db.execute_query(
+        'SELECT student_id FROM students WHERE section = %s AND year = %s',
+        (session.get('section_id'), session.get('year'))
+    )
+    roster = frozenset(str(row['student_id']) for row in rows) if rows else frozenset()
+    
+    with _roster_lock:
+        _roster_cache[session_id] = (time.time(), roster)
+        _roster_cache.move_to_end(session_id)
+        while len(_roster_cache) > ROSTER_CACHE_MAX_SESSIONS:
+            _roster_cache.popitem(last=False)
+    print(f"✓ Section roster loaded: {len(roster)} student(s) for session {session_id}")
+    return roster
+
+
+def _invalidate_session_roster(session_id):
+    """Drop the cached roster and face tracks once a session is no longer active"""
+    with _roster_lock:
+        _roster_cache.pop(str(session_id), None)
+    
+    from recognizer.tracker import session_trackers
+    session_trackers.drop(session_id)
+
+
+def _tracked_payload(db, session, session_id, face, tracker):
+    """
+    Attendance response for a recognized face
+    
+    Faces that the recognizer reused from an already recognized track
+    ('tracked') replay that track's earlier response instead of querying the
+    database again; anything else goes through _record_recognized_student.
+    """
+    track = tracker.get(face.get('track_id')) if tracker is not None else None
+    
+    if face.get('tracked') and track is not None and track.payload is not None:
+        payload = dict(track.payload)
+        if payload.get('status') in ('recognized', 'updated_to_present', 'confidence_updated'):
+            payload['status'] = 'already_present'
+            payload['message'] = f'{payload.get("student_name")} already marked present'
+            payload['action'] = 'no_change_needed'
+            payload.pop('new_entry', None)
+    else:
+        payload = _record_recognized_student(
+            db, session, session_id,
+            face.get('student_id'), face.get('confidence', 0)
+        )
+        if track is not None:
+            track.payload = payload
+    
+    payload['tracked'] = bool(face.get('tracked'))
+    if face.get('track_id') is not None:
+        payload['track_id'] = face.get('track_id')
+    payload['model_version'] = face.get('model_version')
+    return payload
+
+
+def _record_recognized_student(db, session, session_id, student_id, confidence):
+    """
+    Validate a recognized student against the session and record attendance
+    
+    Shared by the single-face and multi-face recognition paths. The student
+    and today's attendance row come back in one query; the record is written
+    by utils/attendance_service.py inside the caller's db.transaction().
+    
+    Returns:
+        dict response payload describing the attendance action taken
+    """
+    from utils.attendance_service import load_student, record_present
+    
+    print(f"✓ Recognized: {student_id} (confidence: {confidence:.4f})")
+    
+    # Get student info (with any attendance already recorded today)
+    student = load_student(db, student_id, session_id)
+    
+    if not student:
+        print(f"✗ Student not in database: {student_id}")
+        return {
+            'status': 'unknown',
+            'message': f'Student {student_id} not found in database'
+        }
+    
+    # ============================================================
+    # VALIDATE STUDENT SECTION/YEAR MATCHES SESSION
+    # ============================================================
+    student_section = student.get('section', '')
+    student_year = student.get('year', '')
+    session_section = session.get('section_id', '')
+    session_year = session.get('year', '')
+    
+    if student_section != session_section or student_year != session_year:
+        print(f"✗ SECTION/YEAR MISMATCH:")
+        print(f"  Student: {student.get('name')} ({student_id})")
+        print(f"  Student Section/Year: {student_section}, {student_year}")
+        print(f"  Session Section/Year: {session_section}, {session_year}")
+        print(f"  → REJECTED: Student not in this class")
+        sys.stdout.flush()
+    
+        return {
+            'status': 'wrong_section',
+            'message': f'{student.get("name")} is not in this class (Section {student_section}, {student_year})',
+            'student_id': student_id,
+            'student_name': student.get('name'),
+            'student_section': student_section,
+            'student_year': student_year,
+            'session_section': session_section,
+            'session_year': session_year
+        }
+    
+    print(f"✓ Section/Year validated: {student_section}, {student_year}")
+    
+    # ============================================================
+    # ONE ATTENDANCE RECORD PER STUDENT PER SESSION DAY
+    # ============================================================
+    # INSERT IGNORE for a new record, otherwise lock the row and upsert it:
+    # promotes absent -> present and keeps the best confidence in SQL
+    return record_present(db, session, session_id, student, confidence)
+
+
+def _validate_recognition_session(db, session_id, time_check):
+    """
+    Load the session and check it can take attendance right now
+    
+    Returns:
+        (session, None) if valid, else (None, (response_body, status_code))
+    """
+    try:
+        session_result = db.execute_query('SELECT * FROM sessions WHERE id = %s', (session_id,))
+    except Exception as e:
+        print(f"✗ Invalid session ID format: {e}")
+        return None, ({
+            'status': 'error',
+            'error': 'Invalid session ID format',
+            'message': str(e)
+        }, 400)
+    
+    if not session_result:
+        print(f"✗ Session not found: {session_id}")
+        return None, ({
+            'status': 'error',
+            'error': 'Session not found',
+            'message': f'Session {session_id} does not exist'
+        }, 404)
+    
+    session = session_result[0]  # Get the first result
+    
+    if session.get('status') != 'active':
+        print(f"✗ Session not active: {session.get('status')}")
+        # Ended elsewhere (e.g. by an admin): drop its roster and tracks too
+        _invalidate_session_roster(session_id)
+        return None, ({
+            'status': 'error',
+            'error': 'Session not active',
+            'message': f'Session status is {session.get("status")}'
+        }, 400)
+    
+    print("✓ Session validated")
+    
+    # ============================================================
+    # TIME BLOCK VALIDATION - Match session time_block to current period
+    # ============================================================
+    session_time_block = session.get('time_block')  # 'morning' or 'afternoon'
+    current_period = time_check.get('period')  # 'morning' or 'afternoon'
+    
+    if session_time_block and session_time_block != current_period:
+        period_names = {
+            'morning': 'Morning (8:30 AM - 12:30 PM)',
+            'afternoon': 'Afternoon (1:30 PM - 5:30 PM)'
+        }
+        
+        print(f"🚫 TIME BLOCK MISMATCH: {session_time_block} session during {current_period} hours")
+        return None, ({
+            'status': 'time_block_mismatch',
+            'message': f'Cannot take attendance for {session_time_block} session during {current_period} hours',
+            'session_time_block': session_time_block,
+            'current_period': current_period,
+            'current_time': time_check['current_time'],
+            'allowed_periods': {
+                'morning_sessions': 'Only during 8:30 AM - 12:30 PM',
+                'afternoon_sessions': 'Only during 1:30 PM - 5:30 PM'
+            },
+            'suggestion': f'This {session_time_block} session can only be used during {period_names.get(session_time_block, session_time_block)} hours'
+        }, 403)
+    
+    print(f"✓ Time block validated: {session_time_block} session during {current_period} hours")
+    sys.stdout.flush()
+    return session, None
+
+
+def _recognition_context(db, session, session_id):
+    """Candidate student IDs and face tracker used to recognize frames of a session"""
+    # Only score students enrolled in this session's section/year
+    candidates = _get_session_roster(db, session)
+    if not candidates:
+        print("⚠ Empty section roster - scoring against all enrolled students")
+        candidates = None
+    
+    # Faces already recognized in this session are not re-embedded
+    tracker = None
+    if config.TRACKING_ENABLED:
+        from recognizer.tracker import session_trackers
+        tracker = session_trackers.get(session_id)
+    
+    return candidates, tracker
+
+
+def _active_model_version():
+    """Version of the active model bundle (None before the first load)"""
+    from recognizer.loader import model_loader
+    return model_loader.get_version()
+
+
+def _recognition_response(db, session, session_id, result, tracker):
+    """
+    Turn a recognizer result into the /recognize response body, recording
+    attendance for every recognized face (shared with the live stream)
+    
+    Every body carries model_version; results that end before
+    classification (error, no_face, low_quality) get the active version.
+    """
+    body = _recognition_body(db, session, session_id, result, tracker)
+    if body.get('model_version') is None:
+        body = dict(body, model_version=_active_model_version())
+    return body
+
+
+def _recognition_body(db, session, session_id, result, tracker):
+    """Response body for one recognizer result (see _recognition_response)"""
+    # Error during recognition
+    if result.get('status') == 'error':
+        print(f"✗ Recognition returned error: {result.get('error')}")
+        return result  # Returned with HTTP 200
+    
+    # No face detected
+    if result.get('status') == 'no_face':
+        print("⚠ No face detected")
+        return result
+    
+    # Unknown face (low confidence)
+    if result.get('status') == 'unknown':
+        print("⚠ Unknown face (low confidence)")
+        return result
+    
+    # Face not worth recognizing (blurred, tiny, turned, badly lit)
+    if result.get('status') == 'low_quality':
+        print(f"⚠ Low quality face: {result.get('reason')}")
+        return result
+    
+    # Face recognized
+    if result.get('status') == 'recognized':
+        payload = _tracked_payload(db, session, session_id, result, tracker)
+        print("="*80 + "\n")
+        sys.stdout.flush()
+        return payload
+    
+    # Multiple faces recognized in one frame
+    if result.get('status') == 'multi_face':
+        face_results = []
+        for face in result.get('faces', []):
+            if face.get('status') == 'recognized':
+                payload = _tracked_payload(db, session, session_id, face, tracker)
+                payload['bbox'] = face.get('bbox')
+                payload['detection_score'] = face.get('detection_score')
+                face_results.append(payload)
+            else:
+                face_results.append(face)
+        
+        new_entries = sum(1 for r in face_results if r.get('new_entry'))
+        print(f"✓ Multi-face frame processed: {len(face_results)} face(s), {new_entries} new attendance record(s)")
+        print("="*80 + "\n")
+        sys.stdout.flush()
+        
+        return {
+            'status': 'multi_face',
+            'count': len(face_results),
+            'recognized_count': result.get('recognized_count', 0),
+            'new_entries': new_entries,
+            'model_version': result.get('model_version'),
+            'faces': face_results
+        }
+    
+    # Unknown status
+    print(f"⚠ Unknown recognition status: {result.get('status')}")
+    return result
+
+
+def _overlay_response(body, frame_shape=None):
+    """
+    Overlay-mode body: always a 'faces' list (boxes are in the coordinates of
+    the decoded frame, whose size is included for scaling on the client)
+    """
+    if body.get('status') != 'multi_face':
+        body = dict(body, faces=[], count=0)
+    body['mode'] = 'overlay'
+    if frame_shape is not None:
+        body['frame_size'] = {'width': int(frame_shape[1]), 'height': int(frame_shape[0])}
+    return body
+
+
+def _edge_input_from_request():
+    """
+    Face crops or embeddings sent by an edge device instead of a full frame
+    
+    Accepts (JSON or multipart):
+    - 'embeddings': JSON list of 512-d vectors, or a binary file of
+      little-endian float32 values (N x 512), plus 'embedding_model'
+    - 'crops': JSON list of base64 JPEGs, or one 'crops' file per face
+    - optional 'boxes': [[x, y, w, h], ...] in the device's frame
+    
+    Returns:
+        dict(kind, items, model_tag, boxes) or None if the request has neither
+    
+    Raises:
+        ValueError: malformed input
+    """
+    import json
+    
+    if request.is_json and request.json:
+        data = request.json
+        crops = data.get('crops')
+    else:
+        data = request.form
+        crops = [f.read() for f in request.files.getlist('crops')] or request.form.getlist('crops')
+    
+    if 'embeddings' in request.files:
+        raw = request.files['embeddings'].read()
+        if len(raw) == 0 or len(raw) % (512 * 4):
+            raise ValueError(f"Binary embeddings must be N x 512 float32 values ({len(raw)} bytes received)")
+        items = np.frombuffer(raw, dtype='<f4').reshape(-1, 512)
+        kind = 'embeddings'
+    elif data.get('embeddings') is not None:
+        items = data.get('embeddings')
+        if isinstance(items, str):
+            items = json.loads(items)
+        kind = 'embeddings'
+    elif crops:
+        items = list(crops)
+        kind = 'crops'
+    else:
+        return None
+    
+    boxes = data.get('boxes')
+    if isinstance(boxes, str):
+        boxes = json.loads(boxes)
+    if boxes is not None and len(boxes) != len(items):
+        raise ValueError(f"Got {len(boxes)} boxes for {len(items)} {kind}")
+    
+    return {
+        'kind': kind,
+        'items': items,
+        'model_tag': data.get('embedding_model'),
+        'boxes': boxes
+    }
+
+
+def _recognize_edge_input(db, session, session_id, edge_input, multi_face, overlay):
+    """STEP 3-5 of /recognize for edge crops/embeddings: no frame decoding or detection"""
+    from recognizer.classifier import face_recognizer
+    
+    candidates = _get_session_roster(db, session) or None
+    
+    try:
+        if edge_input['kind'] == 'embeddings':
+            result = face_recognizer.recognize_embeddings(
+                edge_input['items'], model_tag=edge_input['model_tag'], multi_face=multi_face,
+                candidates=candidates, boxes=edge_input['boxes']
+            )
+        else:
+            crops = [decode_image_data(crop) for crop in edge_input['items']]
+            result = face_recognizer.recognize_crops(
+                crops, multi_face=multi_face, candidates=candidates, boxes=edge_input['boxes']
+            )
+    except ValueError as e:
+        print(f"✗ Edge input rejected: {e}")
+        return jsonify({
+            'status': 'error',
+            'error': 'Invalid edge input',
+            'message': str(e)
+        }), 400
+    
+    print(f"✓ Edge recognition complete: {result.get('status')}")
+    with db.transaction():
+        body = _recognition_response(db, session, session_id, result, None)
+    if overlay:
+        body = _overlay_response(body)
+    body['input'] = edge_input['kind']
+    return jsonify(body), 200
+
+
 @attendance_bp.route('/test-ping', methods=['GET'])
 def test_ping():
     """Test endpoint - no auth required"""
@@ -74,6 +461,24 @@ def test_ping():
     return jsonify({'status': 'ok', 'message': 'Attendance blueprint is working'}), 200
 
 
+def _detect_face_preview(img_array):
+    """
+    Live-preview detection: retry once with an ultra-low threshold.
+    Thresholds are per call, never stored, so request threads share the
+    one improved detector.
+    """
+    from recognizer.detector_improved import get_face_detector
+    
+    detector = get_face_detector()
+    detection = detector.detect(img_array, min_confidence=0.5)
+    
+    if detection.num_faces == 0:
+        # Try with ultra-low threshold for maximum speed
+        detection = detector.detect(img_array, min_confidence=0.2)
+    
+    return detection
+
+
 @attendance_bp.route('/detect-face', methods=['POST'])
 @jwt_required()
 def detect_face():
@@ -81,6 +486,10 @@ def detect_face():
     Detect face in image and return bounding box + landmarks
     Used for real-time face tracking overlay
     
+    Frames that barely differ from the previous one of the same camera
+    (optional 'session_id', else the current user) reuse the cached
+    detection; the response's 'cached' flag says which one was returned.
+    
     Returns:
     - 200: Success with face detection data
     - 400: Bad request
@@ -103,9 +512,15 @@ def detect_face():
                 'error': 'No image provided'
             }), 400
         
-        # Decode image
+        # Decode image (reduced resolution is enough for the preview detector)
         try:
-            img_array = decode_image_data(image_data)
+            img_array = decode_image_data(image_data, max_side=config.INGEST_PREVIEW_SIDE)
+        except FrameTooLarge as e:
+            return jsonify({
+                'status': 'error',
+                'error': 'Image too large',
+                'message': str(e)
+            }), 413
         except Exception as e:
             return jsonify({
                 'status': 'error',
@@ -116,30 +531,40 @@ def detect_face():
         # Detect faces with improved detector
         try:
             print("🔍 Using Improved Face Detector...")
-            from recognizer.detector_improved import get_face_detector
+            print(f"🔍 Detecting faces in image shape: {img_array.shape}")
             
-            detector = get_face_detector(method='insightface')
-            print("✓ Improved detector loaded")
+            def run_detection(frame):
+                if config.INFERENCE_BATCHING:
+                    # Queue behind/alongside recognition frames on the shared worker
+                    from recognizer.inference_scheduler import inference_scheduler
+                    detection, _ = inference_scheduler.infer(frame, embed=False, detect_fn=_detect_face_preview)
+                    return detection
+                return _detect_face_preview(frame)
             
-            print(f"🔍 Detecting faces in image shape: {img_array.shape}")
-            print(f"🔍 Image stats: min={img_array.min()}, max={img_array.max()}, mean={img_array.mean():.1f}")
+            cached = False
+            frame_diff = None
+            if config.MOTION_GATING:
+                from recognizer.motion_gate import motion_gate
+                camera_key = request.form.get('session_id') or (
+                    request.json.get('session_id') if request.is_json and request.json else None
+                ) or f"user:{get_jwt_identity()}"
+                detection, cached, frame_diff = motion_gate.run(camera_key, img_array, run_detection)
+            else:
+                detection = run_detection(img_array)
             
-            # Detect faces with confidence scores
-            results = detector.detect_faces(img_array, return_confidence=True)
-            print(f"✓ Detection complete, found {len(results)} faces")
+            if cached:
+                print(f"✓ Scene unchanged (diff={frame_diff:.4f}), reusing {detection.num_faces} cached face(s)")
+            else:
+                print(f"✓ Detection complete, found {detection.num_faces} faces")
             
-            if len(results) == 0:
-                print("⚠️ No faces detected - trying with ULTRA-LOW threshold for speed...")
-                # Try with ultra-low threshold for maximum speed
-                detector.min_detection_confidence = 0.2
-                results = detector.detect_faces(img_array, return_confidence=True)
-                print(f"✓ Second attempt found {len(results)} faces")
+            results = list(zip(detection.bboxes, detection.scores))
             
             if len(results) == 0:
                 print("⚠️ No faces detected")
                 return jsonify({
                     'status': 'no_face',
-                    'faces': []
+                    'faces': [],
+                    'cached': cached
                 }), 200
             
             # Convert face data to JSON-serializable format
@@ -162,7 +587,9 @@ def detect_face():
             return jsonify({
                 'status': 'success',
                 'faces': face_data,
-                'count': len(face_data)
+                'count': len(face_data),
+                'cached': cached,
+                'frame_diff': round(frame_diff, 4) if frame_diff is not None else None
             }), 200
             
         except Exception as e:
@@ -196,6 +623,9 @@ def recognize_face():
     Accepts:
     - multipart/form-data with 'image' file and 'session_id'
     - application/json with 'image' (base64) and 'session_id'
+    - optional 'multi_face': recognize every face in the frame
+    - optional 'overlay': multi-face plus every face's bbox and detection
+      score from the same detection pass (replaces /detect-face per frame)
     
     Returns:
     - 200: Success with recognition result
@@ -249,8 +679,24 @@ def recognize_face():
         image_data = None
         session_id = None
         
+        # Edge devices may send aligned face crops or embeddings instead of a frame
+        try:
+            edge_input = _edge_input_from_request() if config.EDGE_INPUTS_ENABLED else None
+        except ValueError as e:
+            print(f"✗ Invalid edge input: {e}")
+            return jsonify({
+                'status': 'error',
+                'error': 'Invalid edge input',
+                'message': str(e)
+            }), 400
+        
         # Try to get image from different sources
-        if request.files and 'image' in request.files:
+        if edge_input is not None:
+            print(f"✓ Edge input: {len(edge_input['items'])} {edge_input['kind']}")
+            if request.is_json and request.json:
+                session_id = request.json.get('session_id')
+        
+        elif request.files and 'image' in request.files:
             # Multipart form data with file
             image_file = request.files['image']
             image_data = image_file.read()
@@ -289,6 +735,25 @@ def recognize_face():
             }), 400
         
         print(f"✓ Session ID: {session_id}")
+        
+        # Multi-face mode: recognize every face in the frame, not just the largest
+        if request.is_json and request.json:
+            multi_face = str(request.json.get('multi_face', '')).lower() in ('1', 'true', 'yes')
+        else:
+            multi_face = str(request.form.get('multi_face', '')).lower() in ('1', 'true', 'yes')
+        
+        # Overlay mode: one call per frame returns every face's box, detection
+        # score and attendance action, replacing the separate /detect-face call
+        if request.is_json and request.json:
+            overlay = str(request.json.get('overlay', '')).lower() in ('1', 'true', 'yes')
+        else:
+            overlay = str(request.form.get('overlay', '')).lower() in ('1', 'true', 'yes')
+        if overlay:
+            multi_face = True
+            print("✓ Overlay mode enabled (detect + recognize in one pass)")
+        
+        if multi_face:
+            print("✓ Multi-face mode enabled")
         sys.stdout.flush()
         
         # ============================================================
@@ -297,73 +762,28 @@ def recognize_face():
         
         db = get_db()
         
-        try:
-            session_result = db.execute_query('SELECT * FROM sessions WHERE id = %s', (session_id,))
-        except Exception as e:
-            print(f"✗ Invalid session ID format: {e}")
-            return jsonify({
-                'status': 'error',
-                'error': 'Invalid session ID format',
-                'message': str(e)
-            }), 400
-        
-        if not session_result:
-            print(f"✗ Session not found: {session_id}")
-            return jsonify({
-                'status': 'error',
-                'error': 'Session not found',
-                'message': f'Session {session_id} does not exist'
-            }), 404
-        
-        session = session_result[0]  # Get the first result
+        session, error = _validate_recognition_session(db, session_id, time_check)
+        if error is not None:
+            return jsonify(error[0]), error[1]
         
-        if session.get('status') != 'active':
-            print(f"✗ Session not active: {session.get('status')}")
-            return jsonify({
-                'status': 'error',
-                'error': 'Session not active',
-                'message': f'Session status is {session.get("status")}'
-            }), 400
-        
-        print("✓ Session validated")
-        
-        # ============================================================
-        # TIME BLOCK VALIDATION - Match session time_block to current period
-        # ============================================================
-        session_time_block = session.get('time_block')  # 'morning' or 'afternoon'
-        current_period = time_check.get('period')  # 'morning' or 'afternoon'
-        
-        if session_time_block and session_time_block != current_period:
-            period_names = {
-                'morning': 'Morning (8:30 AM - 12:30 PM)',
-                'afternoon': 'Afternoon (1:30 PM - 5:30 PM)'
-            }
-            
-            print(f"🚫 TIME BLOCK MISMATCH: {session_time_block} session during {current_period} hours")
-            return jsonify({
-                'status': 'time_block_mismatch',
-                'message': f'Cannot take attendance for {session_time_block} session during {current_period} hours',
-                'session_time_block': session_time_block,
-                'current_period': current_period,
-                'current_time': time_check['current_time'],
-                'allowed_periods': {
-                    'morning_sessions': 'Only during 8:30 AM - 12:30 PM',
-                    'afternoon_sessions': 'Only during 1:30 PM - 5:30 PM'
-                },
-                'suggestion': f'This {session_time_block} session can only be used during {period_names.get(session_time_block, session_time_block)} hours'
-            }), 403
-        
-        print(f"✓ Time block validated: {session_time_block} session during {current_period} hours")
-        sys.stdout.flush()
+        if edge_input is not None:
+            return _recognize_edge_input(db, session, session_id, edge_input, multi_face, overlay)
         
         # ============================================================
         # STEP 3: Decode image
         # ============================================================
         
         try:
-            img_array = decode_image_data(image_data)
+            img_array = decode_image_data(image_data, max_side=config.INGEST_RECOGNITION_SIDE)
             print(f"✓ Image decoded: shape {img_array.shape}")
             sys.stdout.flush()
+        except FrameTooLarge as e:
+            print(f"✗ Image rejected: {e}")
+            return jsonify({
+                'status': 'error',
+                'error': 'Image too large',
+                'message': str(e)
+            }), 413
         except Exception as e:
             print(f"✗ Image decoding failed: {e}")
             traceback.print_exc()
@@ -383,7 +803,11 @@ def recognize_face():
             print("→ Starting face recognition...")
             sys.stdout.flush()
             
-            result = face_recognizer.recognize(img_array)
+            candidates, tracker = _recognition_context(db, session, session_id)
+            
+            result = face_recognizer.recognize(
+                img_array, multi_face=multi_face, candidates=candidates, tracker=tracker
+            )
             
             print(f"✓ Recognition complete: {result.get('status')}")
             sys.stdout.flush()
@@ -394,7 +818,8 @@ def recognize_face():
             return jsonify({
                 'status': 'error',
                 'error': 'Recognition system not available',
-                'message': 'Face recognition dependencies not loaded. Check server logs.'
+                'message': 'Face recognition dependencies not loaded. Check server logs.',
+                'model_version': _active_model_version()
             }), 500
         
         except Exception as e:
@@ -404,270 +829,20 @@ def recognize_face():
                 'status': 'error',
                 'error': 'Recognition failed',
                 'message': str(e),
-                'type': type(e).__name__
+                'type': type(e).__name__,
+                'model_version': _active_model_version()
             }), 500
         
         # ============================================================
         # STEP 5: Handle recognition results
         # ============================================================
         
-        # Error during recognition
-        if result.get('status') == 'error':
-            print(f"✗ Recognition returned error: {result.get('error')}")
-            return jsonify(result), 200  # Return 200 with error status
-        
-        # No face detected
-        if result.get('status') == 'no_face':
-            print("⚠ No face detected")
-            return jsonify(result), 200
-        
-        # Unknown face (low confidence)
-        if result.get('status') == 'unknown':
-            print("⚠ Unknown face (low confidence)")
-            return jsonify(result), 200
-        
-        # Face recognized
-        if result.get('status') == 'recognized':
-            student_id = result.get('student_id')
-            confidence = result.get('confidence', 0)
-            
-            print(f"✓ Recognized: {student_id} (confidence: {confidence:.4f})")
-            
-            # Get student info
-            student_result = db.execute_query('SELECT * FROM students WHERE student_id = %s', (student_id,))
-            
-            if not student_result:
-                print(f"✗ Student not in database: {student_id}")
-                return jsonify({
-                    'status': 'unknown',
-                    'message': f'Student {student_id} not found in database'
-                }), 200
-            
-            student = student_result[0]  # Get the first result
-            
-            # ============================================================
-            # VALIDATE STUDENT SECTION/YEAR MATCHES SESSION
-            # ============================================================
-            student_section = student.get('section', '')
-            student_year = student.get('year', '')
-            session_section = session.get('section_id', '')
-            session_year = session.get('year', '')
-            
-            if student_section != session_section or student_year != session_year:
-                print(f"✗ SECTION/YEAR MISMATCH:")
-                print(f"  Student: {student.get('name')} ({student_id})")
-                print(f"  Student Section/Year: {student_section}, {student_year}")
-                print(f"  Session Section/Year: {session_section}, {session_year}")
-                print(f"  → REJECTED: Student not in this class")
-                sys.stdout.flush()
-                
-                return jsonify({
-                    'status': 'wrong_section',
-                    'message': f'{student.get("name")} is not in this class (Section {student_section}, {student_year})',
-                    'student_id': student_id,
-                    'student_name': student.get('name'),
-                    'student_section': student_section,
-                    'student_year': student_year,
-                    'session_section': session_section,
-                    'session_year': session_year
-                }), 200
-            
-            print(f"✓ Section/Year validated: {student_section}, {student_year}")
-            
-            # ============================================================
-            # ULTRA-STRICT DUPLICATE PREVENTION FOR SINGLE SESSION
-            # ============================================================
-            # Check for ANY existing attendance record in this session (present OR absent)
-            # This ensures ONE attendance record per student per session, period.
-            
-            existing_result = db.execute_query(
-                '''SELECT * FROM attendance 
-                   WHERE student_id = %s 
-                   AND session_id = %s 
-                   ORDER BY timestamp DESC
-                   LIMIT 1''',
-                (student_id, session_id)
-            )
-            existing = existing_result[0] if existing_result else None
-            
-            if existing:
-                # Student already has a record in this session
-                existing_time = existing.get('timestamp')
-                existing_status = existing.get('status')
-                existing_confidence = existing.get('confidence', 0)
-                # Fix timezone issue: ensure both datetimes are timezone-aware
-                if existing_time:
-                    # If existing_time is naive (no timezone), assume it's UTC and convert
-                    if existing_time.tzinfo is None:
-                        from utils.timezone_helper import UTC_TZ
-                        existing_time = UTC_TZ.localize(existing_time)
-                    
-                    # Convert both to Ethiopian time for comparison
-                    current_ethiopian = get_ethiopian_time()
-                    existing_ethiopian = existing_time.astimezone(current_ethiopian.tzinfo)
-                    time_diff = current_ethiopian - existing_ethiopian
-                else:
-                    time_diff = timedelta(0)
-                
-                print(f"🚫 DUPLICATE BLOCKED: {student.get('name')} already has attendance in session {session_id}")
-                print(f"   Existing: {existing_status} at {existing_time} (confidence: {existing_confidence:.1f}%)")
-                print(f"   New attempt: present at {current_ethiopian} (confidence: {confidence:.1f}%)")
-                print(f"   Time difference: {time_diff.total_seconds():.1f} seconds")
-                
-                # If existing record is 'absent' and new is 'present' with higher confidence, update to present
-                if existing_status == 'absent' and confidence > 50:
-                    new_confidence = max(confidence, existing_confidence)
-                    db.execute_query(
-                        'UPDATE attendance SET status = %s, confidence = %s, timestamp = %s WHERE id = %s',
-                        ('present', new_confidence, get_ethiopian_time(), existing['id']),
-                        fetch=False
-                    )
-                    
-                    print(f"✓ Updated absent → present: confidence {existing_confidence:.1f}% → {new_confidence:.1f}%")
-                    
-                    return jsonify({
-                        'status': 'updated_to_present',
-                        'message': f'{student.get("name")} updated from absent to present',
-                        'student_id': student_id,
-                        'student_name': student.get('name'),
-                        'confidence': new_confidence,
-                        'previous_status': existing_status,
-                        'action': 'absent_to_present'
-                    }), 200
-                
-                # If existing record is 'present', just update confidence if higher
-                elif existing_status == 'present':
-                    if confidence > existing_confidence:
-                        db.execute_query(
-                            'UPDATE attendance SET confidence = %s, timestamp = %s WHERE id = %s',
-                            (confidence, get_ethiopian_time(), existing['id']),
-                            fetch=False
-                        )
-                        
-                        print(f"✓ Updated confidence: {existing_confidence:.1f}% → {confidence:.1f}%")
-                        
-                        return jsonify({
-                            'status': 'confidence_updated',
-                            'message': f'{student.get("name")} confidence updated (already present)',
-                            'student_id': student_id,
-                            'student_name': student.get('name'),
-                            'confidence': confidence,
-                            'previous_confidence': existing_confidence,
-                            'action': 'confidence_improved'
-                        }), 200
-                    else:
-                        print(f"✓ No update needed: existing confidence {existing_confidence:.1f}% >= new {confidence:.1f}%")
-                        
-                        return jsonify({
-                            'status': 'already_present',
-                            'message': f'{student.get("name")} already marked present',
-                            'student_id': student_id,
-                            'student_name': student.get('name'),
-                            'confidence': existing_confidence,
-                            'time_since_last': f"{time_diff.total_seconds():.1f}s",
-                            'action': 'no_change_needed'
-                        }), 200
-                
-                # Any other case - block duplicate
-                return jsonify({
-                    'status': 'duplicate_blocked',
-                    'message': f'{student.get("name")} already has attendance record in this session',
-                    'student_id': student_id,
-                    'student_name': student.get('name'),
-                    'existing_status': existing_status,
-                    'existing_confidence': existing_confidence,
-                    'action': 'blocked_duplicate'
-                }), 200
-            
-            print(f"✓ No existing record found - creating new attendance record")
-            
-            # Record NEW attendance entry with instructor_id, section_id, session_type, and time_block
-            today = date.today().isoformat()
-            attendance_doc = {
-                'student_id': student_id,
-                'session_id': session_id,
-                'instructor_id': session.get('instructor_id'),
-                'section_id': session.get('section_id', ''),
-                'year': session.get('year', ''),
-                'session_type': session.get('session_type', ''),  # 'lab' or 'theory'
-                'time_block': session.get('time_block', ''),  # 'morning' or 'afternoon'
-                'course_name': session.get('course_name', ''),
-                'class_year': session.get('class_year', ''),
-                'timestamp': get_ethiopian_time(),
-                'date': today,
-                'confidence': confidence,
-                'status': 'present'
-            }
-            
-            try:
-                db.execute_query(
-                    '''INSERT INTO attendance 
-                       (student_id, session_id, instructor_id, section_id, year, 
-                        session_type, time_block, course_name, class_year, 
-                        timestamp, date, confidence, status) 
-                       VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)''',
-                    (attendance_doc['student_id'], attendance_doc['session_id'], 
-                     attendance_doc['instructor_id'], attendance_doc['section_id'], 
-                     attendance_doc['year'], attendance_doc['session_type'], 
-                     attendance_doc['time_block'], attendance_doc['course_name'], 
-                     attendance_doc['class_year'], attendance_doc['timestamp'], 
-                     attendance_doc['date'], attendance_doc['confidence'], 
-                     attendance_doc['status']),
-                    fetch=False
-                )
-            except Exception as e:
-                # Handle database constraint violation (duplicate key)
-                if "Duplicate entry" in str(e) or "1062" in str(e):
-                    print(f"🚫 DATABASE CONSTRAINT: Duplicate prevented by unique constraint")
-                    print(f"   Student: {student.get('name')} ({student_id})")
-                    print(f"   Session: {session_id}")
-                    print(f"   → Updating existing record instead")
-                    
-                    # Update existing record
-                    db.execute_query(
-                        '''UPDATE attendance 
-                           SET confidence = GREATEST(confidence, %s), 
-                               timestamp = %s 
-                           WHERE student_id = %s AND session_id = %s''',
-                        (confidence, get_ethiopian_time(), student_id, session_id),
-                        fetch=False
-                    )
-                    
-                    return jsonify({
-                        'status': 'duplicate_prevented',
-                        'message': f'{student.get("name")} already marked (database constraint)',
-                        'student_id': student_id,
-                        'student_name': student.get('name'),
-                        'confidence': confidence,
-                        'action': 'constraint_prevented'
-                    }), 200
-                else:
-                    # Re-raise other database errors
-                    raise e
-            
-            # Update session count (only for NEW entries)
-            db.execute_query(
-                'UPDATE sessions SET attendance_count = attendance_count + 1 WHERE id = %s',
-                (session_id,),
-                fetch=False
-            )
-            
-            print(f"✓ NEW attendance recorded: {student.get('name')}")
-            print("="*80 + "\n")
-            sys.stdout.flush()
-            
-            return jsonify({
-                'status': 'recognized',
-                'student_id': student_id,
-                'student_name': student.get('name'),
-                'confidence': confidence,
-                'message': f'Attendance recorded for {student.get("name")}',
-                'new_entry': True
-            }), 200
-        
-        # Unknown status
-        print(f"⚠ Unknown recognition status: {result.get('status')}")
-        return jsonify(result), 200
+        # Attendance writes (insert + session counter) commit together
+        with db.transaction():
+            body = _recognition_response(db, session, session_id, result, tracker)
+        if overlay:
+            body = _overlay_response(body, img_array.shape)
+        return jsonify(body), 200
     
     except Exception as e:
         # Catch-all for any unexpected errors
@@ -688,6 +863,320 @@ def recognize_face():
         }), 500
 
 
+@attendance_bp.route('/recognize-photo', methods=['POST'])
+@working_security_check
+@working_audit_log('FACE_RECOGNITION_PHOTO')
+@jwt_required()
+@role_required('instructor')
+def recognize_photo():
+    """
+    Classroom-photo mode: record attendance for everyone in one photo
+    
+    The full-resolution image is split into overlapping tiles detected in
+    parallel, faces are merged across tiles, embedded in one batch and
+    recorded with the same rules as /recognize.
+    
+    Accepts:
+    - multipart/form-data with 'image' file and 'session_id'
+    - application/json with 'image' (base64) and 'session_id'
+    
+    Returns:
+    - 200: multi_face result plus per-stage 'timings' (ms)
+    - 400/404/413: as /recognize
+    """
+    import time
+    from utils.time_restrictions import is_within_working_hours
+    
+    time_check = is_within_working_hours()
+    if not time_check['allowed']:
+        print(f"🚫 BLOCKED: Outside working hours - {time_check['message']}")
+        return jsonify({
+            'status': 'time_blocked',
+            'message': time_check['message'],
+            'current_time': time_check['current_time'],
+            'next_period': time_check['next_period'],
+            'minutes_until_next': time_check.get('minutes_until_next', 0)
+        }), 403
+    
+    print("\n" + "="*80)
+    print("RECOGNIZE CLASSROOM PHOTO REQUEST")
+    print("="*80)
+    
+    try:
+        if request.files and 'image' in request.files:
+            image_data = request.files['image'].read()
+            session_id = request.form.get('session_id')
+        elif request.is_json and request.json:
+            image_data = request.json.get('image')
+            session_id = request.json.get('session_id')
+        else:
+            image_data = request.form.get('image')
+            session_id = request.form.get('session_id')
+        
+        if not image_data:
+            return jsonify({
+                'status': 'error',
+                'error': 'No image provided',
+                'message': 'Please provide a classroom photo in the request'
+            }), 400
+        
+        if not session_id:
+            return jsonify({
+                'status': 'error',
+                'error': 'Session ID required',
+                'message': 'Please provide a session_id'
+            }), 400
+        
+        db = get_db()
+        session, error = _validate_recognition_session(db, session_id, time_check)
+        if error is not None:
+            return jsonify(error[0]), error[1]
+        
+        timings = {}
+        started = time.perf_counter()
+        
+        # Full resolution: small back-row faces are the point of this mode
+        try:
+            img_array = decode_image_data(image_data)
+            print(f"✓ Photo decoded: shape {img_array.shape}")
+        except FrameTooLarge as e:
+            print(f"✗ Photo rejected: {e}")
+            return jsonify({
+                'status': 'error',
+                'error': 'Image too large',
+                'message': str(e)
+            }), 413
+        except Exception as e:
+            print(f"✗ Photo decoding failed: {e}")
+            return jsonify({
+                'status': 'error',
+                'error': 'Image decoding failed',
+                'message': str(e)
+            }), 400
+        timings['decode_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        
+        from recognizer.classifier import face_recognizer
+        
+        candidates = _get_session_roster(db, session) or None
+        result = face_recognizer.recognize_photo(img_array, candidates=candidates, timings=timings)
+        
+        record_started = time.perf_counter()
+        with db.transaction():
+            body = _recognition_response(db, session, session_id, result, None)
+        timings['record_ms'] = round((time.perf_counter() - record_started) * 1000, 1)
+        timings['total_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        
+        body['mode'] = 'photo'
+        body['frame_size'] = {'width': int(img_array.shape[1]), 'height': int(img_array.shape[0])}
+        body['timings'] = timings
+        print(f"✓ Classroom photo processed in {timings['total_ms']}ms: {timings}")
+        return jsonify(body), 200
+    
+    except Exception as e:
+        print(f"✗ Classroom photo error: {e}")
+        traceback.print_exc()
+        return jsonify({
+            'status': 'error',
+            'error': 'Recognition failed',
+            'message': str(e),
+            'type': type(e).__name__,
+            'model_version': _active_model_version()
+        }), 500
+
+
+def _batch_images_from_request():
+    """
+    Uploaded images of a /recognize-batch request as (name, bytes) pairs
+    
+    Accepts any number of 'images' (or 'image') files; .zip files among them
+    are expanded. Non-image zip members are skipped.
+    
+    Raises:
+        ValueError: too many images, or a bad / oversized zip
+    """
+    import zipfile
+    
+    images = []
+    for upload in request.files.getlist('images') + request.files.getlist('image'):
+        name = upload.filename or f'image_{len(images)}'
+        data = upload.read()
+        
+        if name.lower().endswith('.zip') or upload.mimetype in ('application/zip', 'application/x-zip-compressed'):
+            try:
+                archive = zipfile.ZipFile(io.BytesIO(data))
+            except zipfile.BadZipFile:
+                raise ValueError(f"{name} is not a valid zip archive")
+            with archive:
+                for member in sorted(archive.infolist(), key=lambda m: m.filename):
+                    if member.is_dir() or not member.filename.lower().endswith(('.jpg', '.jpeg', '.png')):
+                        continue
+                    # Checked before extracting: the declared size bounds the read
+                    if member.file_size > config.INGEST_MAX_BYTES:
+                        raise ValueError(f"{name}/{member.filename} exceeds {config.INGEST_MAX_BYTES} bytes")
+                    images.append((member.filename, archive.read(member)))
+                    if len(images) > config.BATCH_MAX_IMAGES:
+                        break
+        else:
+            images.append((name, data))
+        
+        if len(images) > config.BATCH_MAX_IMAGES:
+            raise ValueError(f"At most {config.BATCH_MAX_IMAGES} images per batch")
+    
+    return images
+
+
+@attendance_bp.route('/recognize-batch', methods=['POST'])
+@working_security_check
+@working_audit_log('FACE_RECOGNITION_BATCH')
+@jwt_required()
+@role_required('instructor')
+def recognize_batch():
+    """
+    Recognize many images for one session (late phone uploads, recorded replays)
+    
+    Images are decoded in parallel, detected and embedded in batches, and
+    all attendance writes of the batch commit in one transaction with the
+    same rules as /recognize.
+    
+    Accepts multipart/form-data:
+    - 'images': one or more image files and/or .zip archives of images
+    - 'session_id'
+    - optional 'multi_face': recognize every face in each image
+    
+    Returns:
+    - 200: per-image 'results' plus a 'summary'
+    - 400/404/413: as /recognize
+    """
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from utils.time_restrictions import is_within_working_hours
+    
+    time_check = is_within_working_hours()
+    if not time_check['allowed']:
+        print(f"🚫 BLOCKED: Outside working hours - {time_check['message']}")
+        return jsonify({
+            'status': 'time_blocked',
+            'message': time_check['message'],
+            'current_time': time_check['current_time'],
+            'next_period': time_check['next_period'],
+            'minutes_until_next': time_check.get('minutes_until_next', 0)
+        }), 403
+    
+    print("\n" + "="*80)
+    print("RECOGNIZE BATCH REQUEST")
+    print("="*80)
+    
+    try:
+        session_id = request.form.get('session_id')
+        if not session_id:
+            return jsonify({
+                'status': 'error',
+                'error': 'Session ID required',
+                'message': 'Please provide a session_id'
+            }), 400
+        
+        try:
+            uploads = _batch_images_from_request()
+        except ValueError as e:
+            print(f"✗ Batch rejected: {e}")
+            return jsonify({
+                'status': 'error',
+                'error': 'Invalid batch',
+                'message': str(e)
+            }), 400
+        
+        if not uploads:
+            return jsonify({
+                'status': 'error',
+                'error': 'No image provided',
+                'message': "Please upload one or more 'images' files or a zip of images"
+            }), 400
+        
+        multi_face = str(request.form.get('multi_face', '')).lower() in ('1', 'true', 'yes')
+        print(f"✓ Batch of {len(uploads)} image(s) for session {session_id} (multi_face={multi_face})")
+        
+        db = get_db()
+        session, error = _validate_recognition_session(db, session_id, time_check)
+        if error is not None:
+            return jsonify(error[0]), error[1]
+        
+        timings = {}
+        started = time.perf_counter()
+        
+        # OpenCV releases the GIL while decoding, so threads decode in parallel
+        def decode(upload):
+            try:
+                return decode_image_data(upload[1], max_side=config.INGEST_RECOGNITION_SIDE), None
+            except FrameTooLarge as e:
+                return None, {'status': 'error', 'error': 'Image too large', 'message': str(e)}
+            except Exception as e:
+                return None, {'status': 'error', 'error': 'Image decoding failed', 'message': str(e)}
+        
+        with ThreadPoolExecutor(max_workers=max(1, config.BATCH_DECODE_WORKERS)) as pool:
+            decoded = list(pool.map(decode, uploads))
+        images = [img for img, _ in decoded]
+        timings['decode_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        
+        from recognizer.classifier import face_recognizer
+        
+        step_started = time.perf_counter()
+        candidates = _get_session_roster(db, session) or None
+        recognized = face_recognizer.recognize_batch(images, multi_face=multi_face, candidates=candidates)
+        timings['recognize_ms'] = round((time.perf_counter() - step_started) * 1000, 1)
+        
+        # One transaction for every attendance write of the batch
+        step_started = time.perf_counter()
+        results = []
+        with db.transaction():
+            for (name, _), (img, decode_error), result in zip(uploads, decoded, recognized):
+                if img is None:
+                    body = dict(decode_error, model_version=_active_model_version())
+                else:
+                    body = _recognition_response(db, session, session_id, result, None)
+                results.append(dict(body, image=name))
+        timings['record_ms'] = round((time.perf_counter() - step_started) * 1000, 1)
+        timings['total_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        
+        # Per-face records: multi-face bodies list them under 'faces'
+        records = []
+        for body in results:
+            records.extend(body.get('faces', []) if body.get('status') == 'multi_face' else [body])
+        
+        summary = {
+            'images': len(results),
+            'failed': sum(1 for body in results if body.get('status') == 'error'),
+            'no_face': sum(1 for body in results if body.get('status') == 'no_face'),
+            'faces': sum(1 for r in records if r.get('status') not in ('error', 'no_face')),
+            'recognized': sum(1 for r in records if r.get('student_id') and r.get('status') not in ('unknown', 'wrong_section')),
+            'new_entries': sum(1 for r in records if r.get('new_entry')),
+            'students': sorted({r['student_id'] for r in records if r.get('new_entry')})
+        }
+        
+        print(f"✓ Batch processed in {timings['total_ms']}ms: {summary['images']} image(s), "
+              f"{summary['new_entries']} new attendance record(s)")
+        print("="*80 + "\n")
+        sys.stdout.flush()
+        
+        return jsonify({
+            'status': 'batch',
+            'session_id': session_id,
+            'summary': summary,
+            'timings': timings,
+            'results': results
+        }), 200
+    
+    except Exception as e:
+        print(f"✗ Batch recognition error: {e}")
+        traceback.print_exc()
+        return jsonify({
+            'status': 'error',
+            'error': 'Batch recognition failed',
+            'message': str(e),
+            'type': type(e).__name__,
+            'model_version': _active_model_version()
+        }), 500
+
+
 # Other endpoints remain the same...
 @attendance_bp.route('/start-session', methods=['POST'])
 @jwt_required()
@@ -899,11 +1388,13 @@ def end_session():
         
         if end_type == 'daily':
             # Stop camera for the day - can be reopened after 12 hours
-            db.execute_query(
-                'UPDATE sessions SET end_time = %s, status = %s WHERE id = %s',
-                (get_ethiopian_time(), 'stopped_daily', data['session_id']),
-                fetch=False
-            )
+            with db.transaction():
+                db.execute_query(
+                    'UPDATE sessions SET end_time = %s, status = %s WHERE id = %s',
+                    (get_ethiopian_time(), 'stopped_daily', data['session_id']),
+                    fetch=False
+                )
+            _invalidate_session_roster(data['session_id'])
             logger.info(f"Session {data['session_id']} stopped for the day")
             return jsonify({'message': 'Session stopped for the day. Can be reopened after 12 hours.'}), 200
         else:
@@ -949,11 +1440,13 @@ def end_session():
                 print(f"✅ SEMESTER END ALLOWED: {eligibility['message']}")
             
             # Permanent end for semester
-            db.execute_query(
-                'UPDATE sessions SET end_time = %s, status = %s WHERE id = %s',
-                (get_ethiopian_time(), 'ended_semester', data['session_id']),
-                fetch=False
-            )
+            with db.transaction():
+                db.execute_query(
+                    'UPDATE sessions SET end_time = %s, status = %s WHERE id = %s',
+                    (get_ethiopian_time(), 'ended_semester', data['session_id']),
+                    fetch=False
+                )
+            _invalidate_session_roster(data['session_id'])
             logger.info(f"Session {data['session_id']} ended permanently")
             return jsonify({'message': 'Session ended permanently for semester'}), 200
     
@@ -1222,34 +1715,39 @@ def mark_absent_students():
         present_student_ids = [row['student_id'] for row in present_students_result] if present_students_result else []
         
         # Mark absent students
-        absent_count = 0
-        for student in all_students_result:
-            student_id = student['student_id']
-            
-            if student_id not in present_student_ids:
-                # Mark as absent
-                db.execute_query(
+        now = get_ethiopian_time()
+        absent_rows = [
+            (student['student_id'], session_id, session.get('instructor_id'),
+             session.get('section_id'), session.get('year'),
+             session.get('session_type'), session.get('time_block'),
+             session.get('course_name'), session.get('class_year'),
+             now, today, 0.0, 'absent')
+            for student in all_students_result
+            if student['student_id'] not in present_student_ids
+        ]
+        absent_count = len(absent_rows)
+        
+        # Absent records and the session stop commit together
+        with db.transaction():
+            if absent_rows:
+                db.execute_many(
                     '''INSERT INTO attendance 
                        (student_id, session_id, instructor_id, section_id, year,
                         session_type, time_block, course_name, class_year,
                         timestamp, date, confidence, status) 
                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)''',
-                    (student_id, session_id, session.get('instructor_id'),
-                     session.get('section_id'), session.get('year'),
-                     session.get('session_type'), session.get('time_block'),
-                     session.get('course_name'), session.get('class_year'),
-                     get_ethiopian_time(), today, 0.0, 'absent'),
-                    fetch=False
+                    absent_rows
                 )
-                absent_count += 1
-                logger.info(f"Marked {student_id} as absent for session {session_id}")
-        
-        # Stop session for the day (can be reopened)
-        db.execute_query(
-            'UPDATE sessions SET end_time = %s, status = %s WHERE id = %s',
-            (get_ethiopian_time(), 'stopped_daily', session_id),
-            fetch=False
-        )
+            
+            # Stop session for the day (can be reopened)
+            db.execute_query(
+                'UPDATE sessions SET end_time = %s, status = %s WHERE id = %s',
+                (now, 'stopped_daily', session_id),
+                fetch=False
+            )
+        _invalidate_session_roster(session_id)
+        for row in absent_rows:
+            logger.info(f"Marked {row[0]} as absent for session {session_id}")
         
         logger.info(f"Marked {absent_count} students as absent and ended session {session_id}")
         
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from recognizer.classifier import face_recognizer
 from recognizer.loader import model_loader
+from recognizer.model_registry import model_registry
 import os
 from config import config
 
@@ -57,9 +58,13 @@ def model_status():
     
     return jsonify({
         'model_loaded': model_loader.is_loaded(),
+        'model_version': model_loader.get_version(),
+        'rollback_versions': model_loader.get_history(),
+        'head': model_loader.get_head(),
         'model_path': model_path,
         'files': files_status,
-        'threshold': config.RECOGNITION_CONFIDENCE_THRESHOLD
+        'threshold': config.RECOGNITION_CONFIDENCE_THRESHOLD,
+        'loaded_models': model_registry.footprint()
     }), 200
 
 @debug_bp.route('/reload-models', methods=['POST'])
@@ -69,7 +74,31 @@ def reload_models():
     
     return jsonify({
         'success': success,
-        'model_loaded': model_loader.is_loaded()
+        'model_loaded': model_loader.is_loaded(),
+        'model_version': model_loader.get_version()
     }), 200 if success else 500
 
+@debug_bp.route('/inference-metrics', methods=['GET'])
+def inference_metrics():
+    """Queue depth and batch statistics of the inference scheduler and gates"""
+    from recognizer.inference_scheduler import inference_scheduler
+    from recognizer.tracker import session_trackers
+    from recognizer.motion_gate import motion_gate
+    from recognizer.quality import quality_gate
+    
+    return jsonify({
+        'batching_enabled': config.INFERENCE_BATCHING,
+        'scheduler': inference_scheduler.metrics(),
+        'tracking': session_trackers.stats(),
+        'motion_gate': motion_gate.stats(),
+        'quality_gate': quality_gate.stats()
+    }), 200
+
+@debug_bp.route('/db-metrics', methods=['GET'])
+def db_metrics():
+    """Checkouts, wait times, in-use count and errors of the MySQL connection pool"""
+    from db.mysql import get_db
+    
+    return jsonify(get_db().pool.metrics()), 200
+
 from datetime import datetime
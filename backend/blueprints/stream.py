@@ -0,0 +1,294 @@
+"""
+Live camera streaming over WebSocket
+One persistent connection per attendance session: the client authenticates
+and the session is validated once, then binary JPEG frames are recognized
+and detection boxes / attendance events are pushed back as they complete.
+
+Only the latest frame is kept while one is being processed, so a slow
+server drops stale frames instead of building a backlog.
+
+Protocol (ws://<host>/api/attendance/stream):
+    client -> {"type": "auth", "token": "<JWT>", "session_id": 12, "multi_face": true}
+    server -> {"type": "ready", "session_id": 12, ...}   or {"type": "error", ...} + close
+    client -> <binary JPEG frame>  (repeated)
+    server -> {"type": "frame", "frame_id": n, "status": ..., "faces": [...], "dropped": k}
+    server -> {"type": "attendance", "frame_id": n, ...}  for each new attendance record
+    client -> {"type": "ping"} / {"type": "close"}
+"""
+
+import json
+import time
+import logging
+import threading
+import traceback
+
+from flask_jwt_extended import decode_token
+
+from config import config
+from db.mysql import get_db
+from utils.security import check_user_role
+
+logger = logging.getLogger(__name__)
+
+try:
+    from flask_sock import Sock
+    sock = Sock()
+    STREAMING_AVAILABLE = True
+except ImportError:
+    sock = None
+    STREAMING_AVAILABLE = False
+
+
+class LatestFrame:
+    """Single-slot mailbox: a new frame replaces the one still waiting"""
+
+    def __init__(self):
+        self._frame = None
+        self._closed = False
+        self._cond = threading.Condition()
+        self.received = 0
+        self.dropped = 0
+
+    def put(self, frame):
+        with self._cond:
+            if self._frame is not None:
+                self.dropped += 1
+            self._frame = frame
+            self.received += 1
+            self._cond.notify()
+
+    def take(self, timeout=None):
+        """Wait for the next frame; None once closed (or on timeout)"""
+        with self._cond:
+            if self._frame is None and not self._closed:
+                self._cond.wait(timeout)
+            frame, self._frame = self._frame, None
+            return frame
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+
+class SerializedSocket:
+    """WebSocket with serialized sends: the reader thread and the recognition loop share it"""
+
+    def __init__(self, ws):
+        self._ws = ws
+        self._send_lock = threading.Lock()
+
+    def send(self, data):
+        with self._send_lock:
+            self._ws.send(data)
+
+    def receive(self, timeout=None):
+        return self._ws.receive(timeout=timeout)
+
+
+def _send(ws, message):
+    ws.send(json.dumps(message, default=str))
+
+
+def _authenticate(ws):
+    """
+    Read the auth message and validate user and session once
+
+    Returns:
+        (session_id, session, multi_face) or None after sending an error
+    """
+    from utils.time_restrictions import is_within_working_hours
+    from blueprints.attendance import _validate_recognition_session
+
+    raw = ws.receive(timeout=config.STREAM_AUTH_TIMEOUT_SECONDS)
+    try:
+        message = json.loads(raw) if isinstance(raw, str) else None
+    except ValueError:
+        message = None
+
+    if not message or message.get('type') != 'auth' or not message.get('token'):
+        _send(ws, {'type': 'error', 'error': 'Authentication required',
+                   'message': 'First message must be {"type": "auth", "token": ..., "session_id": ...}'})
+        return None
+
+    try:
+        claims = decode_token(message['token'])
+    except Exception as e:
+        _send(ws, {'type': 'error', 'error': 'Invalid token', 'message': str(e)})
+        return None
+
+    # decode_token accepts refresh tokens too; only access tokens open a stream
+    if claims.get('type') != 'access':
+        _send(ws, {'type': 'error', 'error': 'Invalid token', 'message': 'Access token required'})
+        return None
+
+    user_id = claims['sub']
+    _, error, _ = check_user_role(user_id, ('instructor',), verbose=False)
+    if error is not None:
+        logger.warning(f"Stream rejected for user {user_id}: {error}")
+        _send(ws, {'type': 'error', 'error': error})
+        return None
+
+    db = get_db()
+
+    time_check = is_within_working_hours()
+    if not time_check['allowed']:
+        _send(ws, {'type': 'error', 'status': 'time_blocked', 'message': time_check['message']})
+        return None
+
+    session_id = message.get('session_id')
+    if not session_id:
+        _send(ws, {'type': 'error', 'error': 'Session ID required'})
+        return None
+
+    session, error = _validate_recognition_session(db, session_id, time_check)
+    if error is not None:
+        _send(ws, dict(error[0], type='error'))
+        return None
+
+    multi_face = str(message.get('multi_face', 'true')).lower() in ('1', 'true', 'yes')
+    logger.info(f"Instructor {user_id} streaming session {session_id} (multi_face={multi_face})")
+    return session_id, session, multi_face
+
+
+def _reader(ws, mailbox):
+    """Receive thread: binary frames go to the mailbox, text is control"""
+    try:
+        while not mailbox.closed:
+            message = ws.receive()
+            if message is None:
+                break
+            if isinstance(message, (bytes, bytearray)):
+                if len(message) > config.INGEST_MAX_BYTES:
+                    _send(ws, {'type': 'error', 'error': 'Image too large'})
+                    continue
+                mailbox.put(message)
+                continue
+
+            try:
+                control = json.loads(message)
+            except ValueError:
+                continue
+            if control.get('type') == 'ping':
+                _send(ws, {'type': 'pong'})
+            elif control.get('type') == 'close':
+                break
+    except Exception as e:
+        # Connection closed by the client
+        logger.info(f"Stream reader stopped: {e}")
+    finally:
+        mailbox.close()
+
+
+def _frame_message(frame_id, body, mailbox, elapsed_ms):
+    """Compact per-frame message: boxes and per-face status"""
+    if body.get('status') == 'multi_face':
+        faces = body.get('faces', [])
+    elif body.get('status') in ('recognized', 'already_present', 'unknown') or 'student_id' in body:
+        faces = [body]
+    else:
+        faces = []
+
+    return {
+        'type': 'frame',
+        'frame_id': frame_id,
+        'status': body.get('status'),
+        'faces': [{
+            'bbox': face.get('bbox'),
+            'status': face.get('status'),
+            'student_id': face.get('student_id'),
+            'student_name': face.get('student_name'),
+            'confidence': face.get('confidence'),
+            'track_id': face.get('track_id')
+        } for face in faces],
+        'model_version': body.get('model_version'),
+        'processing_ms': round(elapsed_ms, 1),
+        'dropped': mailbox.dropped
+    }
+
+
+def stream_session(ws):
+    """WebSocket handler for one live attendance session"""
+    from blueprints.attendance import (
+        decode_image_data, _validate_recognition_session, _recognition_context, _recognition_response,
+        _active_model_version
+    )
+    from recognizer.classifier import face_recognizer
+    from utils.time_restrictions import is_within_working_hours
+
+    ws = SerializedSocket(ws)
+    auth = _authenticate(ws)
+    if auth is None:
+        return
+    session_id, session, multi_face = auth
+
+    db = get_db()
+    _send(ws, {'type': 'ready', 'session_id': session_id, 'multi_face': multi_face,
+               'course_name': session.get('course_name')})
+
+    mailbox = LatestFrame()
+    reader = threading.Thread(target=_reader, args=(ws, mailbox), name=f'stream-{session_id}', daemon=True)
+    reader.start()
+
+    frame_id = 0
+    revalidated_at = time.monotonic()
+
+    try:
+        while True:
+            frame = mailbox.take(timeout=1.0)
+            if frame is None:
+                if mailbox.closed:
+                    break
+                continue
+
+            frame_id += 1
+            started = time.monotonic()
+
+            # Cheap re-checks: clock every frame, session row now and then
+            time_check = is_within_working_hours()
+            if not time_check['allowed']:
+                _send(ws, {'type': 'error', 'status': 'time_blocked', 'message': time_check['message']})
+                break
+            if started - revalidated_at > config.STREAM_REVALIDATE_SECONDS:
+                session, error = _validate_recognition_session(db, session_id, time_check)
+                if error is not None:
+                    _send(ws, dict(error[0], type='error'))
+                    break
+                revalidated_at = started
+
+            try:
+                img_array = decode_image_data(memoryview(frame), max_side=config.INGEST_RECOGNITION_SIDE)
+                candidates, tracker = _recognition_context(db, session, session_id)
+                result = face_recognizer.recognize(
+                    img_array, multi_face=multi_face, candidates=candidates, tracker=tracker
+                )
+                # One commit per frame; a connection is held only for the
+                # writes, never for the lifetime of the stream
+                with db.transaction():
+                    body = _recognition_response(db, session, session_id, result, tracker)
+            except Exception as e:
+                traceback.print_exc()
+                _send(ws, {'type': 'error', 'frame_id': frame_id, 'error': 'Recognition failed', 'message': str(e),
+                           'model_version': _active_model_version()})
+                continue
+
+            elapsed_ms = (time.monotonic() - started) * 1000
+            _send(ws, _frame_message(frame_id, body, mailbox, elapsed_ms))
+
+            # Attendance events for faces that produced a new record
+            records = body.get('faces', []) if body.get('status') == 'multi_face' else [body]
+            for record in records:
+                if record.get('new_entry'):
+                    _send(ws, dict(record, type='attendance', frame_id=frame_id))
+    finally:
+        mailbox.close()
+        logger.info(f"Session {session_id} stream closed: {frame_id} frame(s) processed, "
+                    f"{mailbox.dropped} dropped")
+
+
+if STREAMING_AVAILABLE:
+    stream_session = sock.route('/api/attendance/stream')(stream_session)
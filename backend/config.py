@@ -15,6 +15,16 @@ class Config:
     MYSQL_DATABASE = os.getenv('MYSQL_DATABASE', 'smart_attendance')
     MYSQL_USER = os.getenv('MYSQL_USER', 'root')
     MYSQL_PASSWORD = os.getenv('MYSQL_PASSWORD', '')
+    # Connection pool (db/pool.py); sizes are per worker process
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))  # Connections kept open
+    DB_POOL_MAX_OVERFLOW = int(os.getenv('DB_POOL_MAX_OVERFLOW', '10'))  # Extra connections under load
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))  # Seconds to wait for a free connection
+    DB_POOL_MAX_WAITERS = int(os.getenv('DB_POOL_MAX_WAITERS', '50'))  # Beyond this, fail fast
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    DB_POOL_RECYCLE_SECONDS = float(os.getenv('DB_POOL_RECYCLE_SECONDS', '3600'))  # 0 = never
+    # Optional server-wide budget split across worker processes (0 = no budget)
+    DB_MAX_CONNECTIONS = int(os.getenv('DB_MAX_CONNECTIONS', '0'))
+    DB_POOL_WORKERS = int(os.getenv('DB_POOL_WORKERS', os.getenv('WEB_CONCURRENCY', '1')))
     
     # MongoDB (Legacy - for migration reference)
     # MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/')
@@ -25,14 +35,98 @@ class Config:
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=int(os.getenv('JWT_EXPIRY_HOURS', '168')))  # 7 days default
     
     # Recognition
-    # Threshold set to 0.75 to accept faces with confidence 0.75+
-    # This reduces false positives and improves accuracy
-    RECOGNITION_CONFIDENCE_THRESHOLD = 0.75
+    # Acceptance threshold for the SVC head (the only one the classifier uses;
+    # the threshold stored in training_metadata.json is informational)
+    RECOGNITION_CONFIDENCE_THRESHOLD = float(os.getenv('RECOGNITION_CONFIDENCE_THRESHOLD', '0.75'))
+    # Minimum cosine similarity for the gallery head (classifier_head: gallery)
+    GALLERY_SIMILARITY_THRESHOLD = float(os.getenv('GALLERY_SIMILARITY_THRESHOLD', '0.65'))
     MODEL_PATH = os.path.join(os.path.dirname(__file__), 'models', 'Classifier')
+    # Prefer pickle-free native_*.npy artifacts (mmap-shared across workers) when present
+    MODEL_NATIVE_FORMAT = os.getenv('MODEL_NATIVE_FORMAT', 'true').lower() == 'true'
+    
+    # Embedding backend: 'torch' (facenet-pytorch) or 'onnx' (ONNX Runtime)
+    # Export the ONNX model once with: python export_facenet_onnx.py
+    EMBEDDING_BACKEND = os.getenv('EMBEDDING_BACKEND', 'torch').lower()
+    ONNX_EMBEDDER_PATH = os.getenv(
+        'ONNX_EMBEDDER_PATH',
+        os.path.join(os.path.dirname(__file__), 'models', 'facenet_vggface2.onnx')
+    )
+    ONNX_INTRA_OP_THREADS = int(os.getenv('ONNX_INTRA_OP_THREADS', '0'))  # 0 = let ONNX Runtime decide
+    
+    # Micro-batching inference scheduler shared by /recognize and /detect-face
+    INFERENCE_BATCHING = os.getenv('INFERENCE_BATCHING', 'true').lower() == 'true'
+    INFERENCE_MAX_BATCH_SIZE = int(os.getenv('INFERENCE_MAX_BATCH_SIZE', '8'))  # frames per batch
+    INFERENCE_MAX_WAIT_MS = float(os.getenv('INFERENCE_MAX_WAIT_MS', '10'))  # wait for a batch to fill
+    INFERENCE_DEADLINE_MS = float(os.getenv('INFERENCE_DEADLINE_MS', '5000'))  # drop frames queued longer
+    # Worker threads: 1 gives the fullest FaceNet batches but serializes
+    # detection; more detect in parallel with smaller batches
+    INFERENCE_WORKERS = int(os.getenv('INFERENCE_WORKERS', '1'))
+    
+    # Per-session face tracking: recognized faces are not re-embedded while in view
+    TRACKING_ENABLED = os.getenv('TRACKING_ENABLED', 'true').lower() == 'true'
+    TRACK_IOU_THRESHOLD = float(os.getenv('TRACK_IOU_THRESHOLD', '0.3'))
+    TRACK_MAX_AGE_SECONDS = float(os.getenv('TRACK_MAX_AGE_SECONDS', '10'))  # drop unseen tracks
+    # Give up on a track whose running-mean confidence is still below
+    # TRACK_REJECT_RATIO * threshold after TRACK_REJECT_AFTER_FRAMES frames
+    TRACK_REJECT_AFTER_FRAMES = int(os.getenv('TRACK_REJECT_AFTER_FRAMES', '6'))
+    TRACK_REJECT_RATIO = float(os.getenv('TRACK_REJECT_RATIO', '0.6'))
+    TRACK_REJECT_COOLDOWN_SECONDS = float(os.getenv('TRACK_REJECT_COOLDOWN_SECONDS', '30'))
+    # Live preview (/detect-face): reuse the previous detection while the scene is static
+    MOTION_GATING = os.getenv('MOTION_GATING', 'true').lower() == 'true'
+    MOTION_DIFF_THRESHOLD = float(os.getenv('MOTION_DIFF_THRESHOLD', '0.02'))  # mean abs gray diff, 0-1
+    MOTION_FORCE_REFRESH_FRAMES = int(os.getenv('MOTION_FORCE_REFRESH_FRAMES', '10'))
+    MOTION_THUMB_WIDTH = int(os.getenv('MOTION_THUMB_WIDTH', '64'))
+    # Recognition detector: 'single' (one 640 pass) or 'coarse_to_fine'
+    # (low-res proposals, then a fine pass on expanded crops)
+    DETECTION_MODE = os.getenv('DETECTION_MODE', 'single').lower()
+    CTF_COARSE_SIZE = int(os.getenv('CTF_COARSE_SIZE', '320'))  # multiple of 32
+    CTF_FINE_SIZE = int(os.getenv('CTF_FINE_SIZE', '160'))  # multiple of 32
+    CTF_CROP_EXPAND = float(os.getenv('CTF_CROP_EXPAND', '1.0'))
+    CTF_MAX_CROPS = int(os.getenv('CTF_MAX_CROPS', '8'))
+    CTF_MAX_REGION_SCALE = float(os.getenv('CTF_MAX_REGION_SCALE', '2.0'))  # merged crop side <= this x CTF_FINE_SIZE
+    # Face quality gate: faces failing these checks are not sent to FaceNet
+    QUALITY_GATE_ENABLED = os.getenv('QUALITY_GATE_ENABLED', 'true').lower() == 'true'
+    QUALITY_MIN_FACE_SIZE = int(os.getenv('QUALITY_MIN_FACE_SIZE', '32'))  # px, min(bbox w, h)
+    QUALITY_MIN_SHARPNESS = float(os.getenv('QUALITY_MIN_SHARPNESS', '30'))  # Laplacian variance of the 160px crop
+    QUALITY_MIN_BRIGHTNESS = float(os.getenv('QUALITY_MIN_BRIGHTNESS', '40'))
+    QUALITY_MAX_BRIGHTNESS = float(os.getenv('QUALITY_MAX_BRIGHTNESS', '220'))
+    QUALITY_MAX_YAW = float(os.getenv('QUALITY_MAX_YAW', '0.45'))  # nose offset / eye distance
+    QUALITY_MAX_PITCH_OFFSET = float(os.getenv('QUALITY_MAX_PITCH_OFFSET', '0.25'))
+    # Edge devices may send aligned 160x160 crops or FaceNet embeddings to /recognize
+    EDGE_INPUTS_ENABLED = os.getenv('EDGE_INPUTS_ENABLED', 'true').lower() == 'true'
+    # Identifies the embedding space; edge embeddings must carry the same tag
+    EMBEDDING_MODEL_TAG = os.getenv('EMBEDDING_MODEL_TAG', 'facenet-vggface2')
+    EDGE_EMBEDDING_NORM_TOLERANCE = float(os.getenv('EDGE_EMBEDDING_NORM_TOLERANCE', '0.01'))
+    EDGE_MAX_FACES = int(os.getenv('EDGE_MAX_FACES', '64'))
+    # Classroom-photo mode (/recognize-photo): overlapping tiles detected in parallel
+    PHOTO_TILE_SIZE = int(os.getenv('PHOTO_TILE_SIZE', '1280'))  # Tile side in image pixels
+    PHOTO_TILE_OVERLAP = int(os.getenv('PHOTO_TILE_OVERLAP', '256'))  # Larger than the biggest face
+    PHOTO_DET_SIZE = int(os.getenv('PHOTO_DET_SIZE', '640'))
+    PHOTO_DET_THRESH = float(os.getenv('PHOTO_DET_THRESH', '0.5'))
+    PHOTO_DETECT_WORKERS = int(os.getenv('PHOTO_DETECT_WORKERS', '4'))
+    PHOTO_MAX_FACES = int(os.getenv('PHOTO_MAX_FACES', '200'))
+    # Batch recognition (/recognize-batch): many images or a zip in one request
+    BATCH_MAX_IMAGES = int(os.getenv('BATCH_MAX_IMAGES', '100'))
+    BATCH_DECODE_WORKERS = int(os.getenv('BATCH_DECODE_WORKERS', '4'))
+    BATCH_EMBED_SIZE = int(os.getenv('BATCH_EMBED_SIZE', '32'))  # FaceNet crops per forward pass
+    
+    # Load and warm up all recognition models at startup (see /ready)
+    PRELOAD_MODELS = os.getenv('PRELOAD_MODELS', 'true').lower() == 'true'
+    WARMUP_ITERATIONS = int(os.getenv('WARMUP_ITERATIONS', '3'))
     
     # Upload
     UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), 'uploads')
-    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+    MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', str(16 * 1024 * 1024)))  # 16MB max request size (batch uploads included)
+    # Frame ingestion: rejected before decoding above these limits
+    INGEST_MAX_BYTES = int(os.getenv('INGEST_MAX_BYTES', str(8 * 1024 * 1024)))
+    INGEST_MAX_PIXELS = int(os.getenv('INGEST_MAX_PIXELS', str(4096 * 4096)))
+    # JPEGs are decoded at 1/2, 1/4 or 1/8 scale while the long side stays >= these
+    INGEST_PREVIEW_SIDE = int(os.getenv('INGEST_PREVIEW_SIDE', '640'))
+    INGEST_RECOGNITION_SIDE = int(os.getenv('INGEST_RECOGNITION_SIDE', '1280'))
+    # Live camera streaming over WebSocket (/api/attendance/stream, needs flask-sock)
+    STREAMING_ENABLED = os.getenv('STREAMING_ENABLED', 'true').lower() == 'true'
+    STREAM_AUTH_TIMEOUT_SECONDS = float(os.getenv('STREAM_AUTH_TIMEOUT_SECONDS', '10'))
+    STREAM_REVALIDATE_SECONDS = float(os.getenv('STREAM_REVALIDATE_SECONDS', '30'))
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
     
     # CORS - Allow all localhost ports for development
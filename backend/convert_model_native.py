@@ -0,0 +1,127 @@
+"""
+Convert pickled model bundles to the pickle-free native format
+Reads face_classifier_v1.pkl (+ label_encoder.pkl) as written by
+train_fixed_model.save_model / train_production_model.save_model and writes
+native_manifest.json + native_*.npy next to them. The loader prefers the
+native files (memory-mapped, shared across workers) while the pickle files
+still have the hashes recorded in the native manifest.
+
+Usage:
+    python convert_model_native.py [--model-dir models/Classifier] [--publish]
+"""
+
+import os
+import sys
+import time
+import pickle
+import argparse
+
+import numpy as np
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from config import config
+from recognizer.native_model import save_native, load_native
+
+PARITY_TOLERANCE = 1e-6
+
+
+def load_pickle_bundle(model_dir):
+    """Load classifier, scaler, label encoder and metadata from the pickle files"""
+    with open(os.path.join(model_dir, 'face_classifier_v1.pkl'), 'rb') as f:
+        data = pickle.load(f)
+
+    if isinstance(data, dict) and 'classifier' in data:
+        classifier = data['classifier']
+        scaler = data.get('scaler')
+        label_encoder = data.get('label_encoder')
+        metadata = data.get('metadata', {})
+    else:
+        classifier, scaler, label_encoder, metadata = data, None, None, {}
+
+    encoder_path = os.path.join(model_dir, 'label_encoder.pkl')
+    if label_encoder is None and os.path.exists(encoder_path):
+        with open(encoder_path, 'rb') as f:
+            label_encoder = pickle.load(f)
+
+    classes = None
+    classes_path = os.path.join(model_dir, 'label_encoder_classes.npy')
+    if label_encoder is None and os.path.exists(classes_path):
+        classes = np.load(classes_path, allow_pickle=True)
+
+    return classifier, scaler, label_encoder, classes, metadata
+
+
+def check_parity(model_dir, classifier, scaler):
+    """Compare native predict_proba with sklearn on X.npy (or random unit vectors)"""
+    X_path = os.path.join(model_dir, 'X.npy')
+    if os.path.exists(X_path):
+        X = np.load(X_path)[:256]
+    else:
+        rng = np.random.default_rng(0)
+        X = rng.standard_normal((64, 512))
+        X /= np.linalg.norm(X, axis=1, keepdims=True)
+
+    X_scaled = scaler.transform(X) if scaler is not None else X
+    expected = classifier.predict_proba(X_scaled)
+
+    native = load_native(model_dir)
+    X_native = native['scaler'].transform(X) if native['scaler'] is not None else X
+    actual = native['classifier'].predict_proba(X_native)
+
+    max_diff = float(np.abs(expected - actual).max())
+    same_argmax = float(np.mean(expected.argmax(axis=1) == actual.argmax(axis=1)))
+
+    print(f"Samples compared:  {len(X)}")
+    print(f"Max |Δ proba|:     {max_diff:.2e}")
+    print(f"Same prediction:   {same_argmax * 100:.1f}%")
+
+    return max_diff <= PARITY_TOLERANCE and same_argmax == 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert pickled model to native mmap format')
+    parser.add_argument('--model-dir', type=str, default=config.MODEL_PATH,
+                        help='Directory with face_classifier_v1.pkl')
+    parser.add_argument('--publish', action='store_true',
+                        help='Publish the directory as a new model version and activate it')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("CONVERTING MODEL TO NATIVE FORMAT")
+    print("=" * 60)
+
+    classifier, scaler, label_encoder, classes, metadata = load_pickle_bundle(args.model_dir)
+    print(f"✅ Loaded pickle bundle: {type(classifier).__name__}, "
+          f"{len(classifier.classes_)} classes")
+
+    try:
+        manifest_path = save_native(args.model_dir, classifier, scaler=scaler,
+                                    label_encoder=label_encoder, classes=classes, metadata=metadata)
+    except ValueError as e:
+        print(f"❌ Cannot convert: {e}")
+        return 1
+    print(f"✅ Wrote: {manifest_path}")
+
+    started = time.perf_counter()
+    load_native(args.model_dir)
+    print(f"✅ Native load time: {(time.perf_counter() - started) * 1000:.1f}ms (mmap)")
+
+    if not check_parity(args.model_dir, classifier, scaler):
+        print("❌ Parity check FAILED - native files kept, set MODEL_NATIVE_FORMAT=false to ignore them")
+        return 1
+    print("✅ Parity OK")
+
+    if args.publish:
+        from recognizer.loader import model_loader
+        version = model_loader.create_version(source_dir=args.model_dir, note='Native format conversion')
+        print(f"✅ Published model version {version}")
+        print("   Activate it with POST /api/admin/model-versions/<version>/activate")
+
+    print("=" * 60)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,37 +1,41 @@
 import mysql.connector
-from mysql.connector import Error, pooling
+from mysql.connector import Error
 import os
 import sys
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 import json
 
 class MySQLConnection:
     def __init__(self):
         self.pool = None
+        # transaction() state of the current thread
+        self._local = threading.local()
         self.init_pool()
     
     def init_pool(self):
-        """Initialize MySQL connection pool"""
+        """Initialize MySQL connection pool (sizes and timeouts from Config.DB_POOL_*)"""
         try:
             from config import Config as config
+            from db.pool import ConnectionPool
             
-            self.pool = pooling.MySQLConnectionPool(
-                pool_name="smartattendance_pool",
-                pool_size=5,
-                host=config.MYSQL_HOST,
-                port=config.MYSQL_PORT,
-                database=config.MYSQL_DATABASE,
-                user=config.MYSQL_USER,
-                password=config.MYSQL_PASSWORD,
-                charset='utf8mb4',
-                collation='utf8mb4_unicode_ci',
-                autocommit=False
-            )
+            self.pool = ConnectionPool({
+                'host': config.MYSQL_HOST,
+                'port': config.MYSQL_PORT,
+                'database': config.MYSQL_DATABASE,
+                'user': config.MYSQL_USER,
+                'password': config.MYSQL_PASSWORD,
+                'charset': 'utf8mb4',
+                'collation': 'utf8mb4_unicode_ci',
+                'autocommit': False
+            })
             
             # Test connection
             conn = self.pool.get_connection()
             if conn.is_connected():
-                print(f"✅ Connected to MySQL: {config.MYSQL_DATABASE}")
+                print(f"✅ Connected to MySQL: {config.MYSQL_DATABASE} "
+                      f"(pool {self.pool.pool_size} + {self.pool.max_overflow} overflow)")
                 conn.close()
                 return True
                 
@@ -40,19 +44,79 @@ class MySQLConnection:
             sys.exit(1)
     
     def get_connection(self):
-        """Get connection from pool"""
+        """Get connection from pool (waits up to Config.DB_POOL_TIMEOUT when all are in use)"""
         try:
             return self.pool.get_connection()
         except Error as e:
             print(f"❌ Error getting connection: {e}")
             raise
     
-    def execute_query(self, query, params=None, fetch=True):
-        """Execute a query and return results"""
+    def _in_transaction(self):
+        return getattr(self._local, 'active', False)
+    
+    def _transaction_connection(self):
+        """
+        Connection of the enclosing transaction() block, or None outside one
+        
+        Checked out when the block runs its first statement, so a block
+        that never touches the database never holds a connection.
+        """
+        if not self._in_transaction():
+            return None
+        if self._local.conn is None:
+            self._local.conn = self.get_connection()
+        return self._local.conn
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Unit of work: every execute_query/execute_many in the block runs on
+        one connection and commits once on exit (rollback if the block raises)
+        
+        The connection is bound to the calling thread from the block's first
+        statement until it exits, so only the write phase holds it. Outside
+        a block every statement checks a connection out and returns it right
+        away. Nested transaction() blocks join the outer one.
+        
+        Usage:
+            with db.transaction() as tx:
+                tx.execute_query('INSERT ...', params, fetch=False)
+                tx.execute_query('UPDATE ...', params, fetch=False)
+        """
+        if self._in_transaction():
+            yield self
+            return
+        
+        self._local.active = True
+        self._local.conn = None
+        try:
+            yield self
+            if self._local.conn is not None:
+                self._local.conn.commit()
+        except Exception:
+            if self._local.conn is not None:
+                self._local.conn.rollback()
+            raise
+        finally:
+            conn = self._local.conn
+            self._local.active = False
+            self._local.conn = None
+            if conn is not None:
+                conn.close()
+    
+    def execute_query(self, query, params=None, fetch=True, rowcount=False):
+        """
+        Execute a query and return results
+        
+        Writes return the new row id (or the affected-row count when there is
+        none); rowcount=True always returns the affected-row count.
+        """
         conn = None
         cursor = None
+        shared = self._transaction_connection()
+        in_tx = shared is not None
         try:
-            conn = self.get_connection()
+            conn = shared or self.get_connection()
             cursor = conn.cursor(dictionary=True, buffered=True)  # Added buffered=True
             
             cursor.execute(query, params or ())
@@ -61,11 +125,17 @@ class MySQLConnection:
                 result = cursor.fetchall()
                 return result
             else:
-                conn.commit()
+                # Inside transaction() the block commits once on exit
+                if not in_tx:
+                    conn.commit()
+                if rowcount:
+                    return cursor.rowcount
                 return cursor.lastrowid if cursor.lastrowid else cursor.rowcount
                 
         except Error as e:
-            if conn:
+            self.pool.record_error()
+            # Inside transaction() the block decides whether to roll back
+            if conn and not in_tx:
                 conn.rollback()
             print(f"❌ Query execution error: {e}")
             print(f"Query: {query}")
@@ -74,30 +144,34 @@ class MySQLConnection:
         finally:
             if cursor:
                 cursor.close()
-            if conn:
+            if conn and not shared:
                 conn.close()
     
     def execute_many(self, query, data_list):
         """Execute query with multiple data sets"""
         conn = None
         cursor = None
+        shared = self._transaction_connection()
+        in_tx = shared is not None
         try:
-            conn = self.get_connection()
+            conn = shared or self.get_connection()
             cursor = conn.cursor()
             
             cursor.executemany(query, data_list)
-            conn.commit()
+            if not in_tx:
+                conn.commit()
             return cursor.rowcount
             
         except Error as e:
-            if conn:
+            self.pool.record_error()
+            if conn and not in_tx:
                 conn.rollback()
             print(f"❌ Batch execution error: {e}")
             raise
         finally:
             if cursor:
                 cursor.close()
-            if conn:
+            if conn and not shared:
                 conn.close()
 
 # Global MySQL connection instance
@@ -0,0 +1,283 @@
+"""
+MySQL connection pool
+Replaces mysql.connector's fixed-size pool, which raises as soon as it is
+exhausted: requests wait (bounded) for a connection instead, overflow
+connections absorb bursts, stale connections are pinged or recycled before
+use, and checkouts are instrumented for /api/debug/db-metrics.
+"""
+
+import time
+import queue
+import logging
+import threading
+
+import mysql.connector
+from mysql.connector.errors import PoolError
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the checkout wait histogram buckets
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+class PoolTimeout(PoolError):
+    """No connection became available within the checkout timeout"""
+    pass
+
+
+class PoolOverloaded(PoolError):
+    """Too many requests are already waiting for a connection"""
+    pass
+
+
+def sized_for_workers(pool_size, max_overflow, max_connections, workers):
+    """
+    Split a server-wide connection budget across worker processes
+
+    Args:
+        pool_size / max_overflow: Requested per-process sizes
+        max_connections: Connections this deployment may open in total (0 = no budget)
+        workers: Worker processes sharing the budget
+
+    Returns:
+        (pool_size, max_overflow) for one process
+    """
+    if max_connections <= 0:
+        return max(1, pool_size), max(0, max_overflow)
+
+    per_worker = max(1, max_connections // max(1, workers))
+    size = max(1, min(pool_size, per_worker))
+    return size, max(0, min(max_overflow, per_worker - size))
+
+
+class PooledConnection:
+    """Connection handed out by the pool; close() returns it instead of closing"""
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+
+    def close(self):
+        if self._raw is not None:
+            raw, self._raw = self._raw, None
+            self._pool._release(raw)
+
+    def __getattr__(self, name):
+        if self._raw is None:
+            raise PoolError("Connection already returned to the pool")
+        return getattr(self._raw, name)
+
+
+class ConnectionPool:
+    """Bounded MySQL pool with overflow, bounded wait queue, pre-ping and recycling"""
+
+    def __init__(self, connect_args, pool_size=None, max_overflow=None, timeout=None,
+                 max_waiters=None, pre_ping=None, recycle_seconds=None):
+        """
+        Args (defaults from Config.DB_POOL_*):
+            connect_args: Keyword arguments for mysql.connector.connect
+            pool_size: Connections kept open when idle
+            max_overflow: Extra connections opened under load, closed on return
+            timeout: Seconds a checkout waits for a free connection
+            max_waiters: Checkouts allowed to wait at once; more fail immediately
+            pre_ping: Check each idle connection before handing it out
+            recycle_seconds: Reconnect connections older than this (0 = never)
+        """
+        self.connect_args = connect_args
+        self.pool_size, self.max_overflow = sized_for_workers(
+            config.DB_POOL_SIZE if pool_size is None else pool_size,
+            config.DB_POOL_MAX_OVERFLOW if max_overflow is None else max_overflow,
+            config.DB_MAX_CONNECTIONS,
+            config.DB_POOL_WORKERS
+        )
+        self.timeout = config.DB_POOL_TIMEOUT if timeout is None else timeout
+        self.max_waiters = config.DB_POOL_MAX_WAITERS if max_waiters is None else max_waiters
+        self.pre_ping = config.DB_POOL_PRE_PING if pre_ping is None else pre_ping
+        self.recycle_seconds = config.DB_POOL_RECYCLE_SECONDS if recycle_seconds is None else recycle_seconds
+
+        self._idle = queue.LifoQueue()
+        self._opened_at = {}  # id(raw connection) -> monotonic open time
+        self._lock = threading.Lock()
+        self._returned = threading.Condition(self._lock)
+
+        self._open = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._max_waiting = 0
+        self._peak_in_use = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._overloaded = 0
+        self._errors = 0
+        self._pings_failed = 0
+        self._recycled = 0
+        self._total_wait_ms = 0.0
+        self._wait_histogram = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    @property
+    def capacity(self):
+        return self.pool_size + self.max_overflow
+
+    def _connect(self):
+        raw = mysql.connector.connect(**self.connect_args)
+        self._opened_at[id(raw)] = time.monotonic()
+        return raw
+
+    def _discard(self, raw):
+        self._opened_at.pop(id(raw), None)
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def _usable(self, raw):
+        """Recycle old connections and ping idle ones; False if raw was discarded"""
+        opened_at = self._opened_at.get(id(raw), 0)
+        if self.recycle_seconds and time.monotonic() - opened_at > self.recycle_seconds:
+            with self._lock:
+                self._recycled += 1
+            self._discard(raw)
+            return False
+
+        if self.pre_ping:
+            try:
+                raw.ping(reconnect=False)
+            except Exception:
+                # e.g. MySQL restarted since the connection went idle
+                with self._lock:
+                    self._pings_failed += 1
+                self._discard(raw)
+                return False
+
+        return True
+
+    def _reserve(self, deadline):
+        """
+        Claim a slot: an idle connection, or permission to open one
+
+        Returns:
+            raw connection, or None when the caller should open a new one
+        """
+        with self._lock:
+            while True:
+                try:
+                    raw = self._idle.get_nowait()
+                    self._in_use += 1
+                    return raw
+                except queue.Empty:
+                    pass
+
+                if self._open < self.capacity:
+                    self._open += 1
+                    self._in_use += 1
+                    return None
+
+                if self._waiting >= self.max_waiters:
+                    self._overloaded += 1
+                    raise PoolOverloaded(
+                        f"{self._waiting} requests already waiting for a database connection"
+                    )
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(
+                        f"No database connection available after {self.timeout}s "
+                        f"(pool size {self.pool_size}, overflow {self.max_overflow})"
+                    )
+
+                self._waiting += 1
+                self._max_waiting = max(self._max_waiting, self._waiting)
+                try:
+                    self._returned.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+    def get_connection(self, timeout=None):
+        """Check out a connection; close() on it returns it to the pool"""
+        started = time.monotonic()
+        deadline = started + (self.timeout if timeout is None else timeout)
+
+        raw = self._reserve(deadline)
+        if raw is not None and not self._usable(raw):
+            # The slot stays reserved: open a replacement in its place
+            raw = None
+
+        if raw is None:
+            try:
+                raw = self._connect()
+            except Exception:
+                with self._lock:
+                    self._open -= 1
+                    self._in_use -= 1
+                    self._errors += 1
+                    self._returned.notify()
+                raise
+
+        waited_ms = (time.monotonic() - started) * 1000
+        with self._lock:
+            self._checkouts += 1
+            self._total_wait_ms += waited_ms
+            self._peak_in_use = max(self._peak_in_use, self._in_use)
+            bucket = next((i for i, bound in enumerate(WAIT_BUCKETS_MS) if waited_ms <= bound), len(WAIT_BUCKETS_MS))
+            self._wait_histogram[bucket] += 1
+
+        return PooledConnection(self, raw)
+
+    def _release(self, raw):
+        # End any transaction still open (a SELECT under autocommit=False
+        # starts one) so the next borrower does not see a stale snapshot
+        healthy = True
+        try:
+            raw.rollback()
+        except Exception:
+            healthy = False
+
+        with self._lock:
+            self._in_use -= 1
+            keep = healthy and self._idle.qsize() < self.pool_size
+            if keep:
+                self._idle.put(raw)
+            else:
+                self._open -= 1
+                if not healthy:
+                    self._errors += 1
+            self._returned.notify()
+
+        if not keep:
+            # Overflow connection (or a broken one): close instead of keeping
+            self._discard(raw)
+
+    def record_error(self):
+        """Count a query error on a pooled connection"""
+        with self._lock:
+            self._errors += 1
+
+    def metrics(self):
+        with self._lock:
+            histogram = {f"<={bound}ms": count for bound, count in zip(WAIT_BUCKETS_MS, self._wait_histogram)}
+            histogram[f">{WAIT_BUCKETS_MS[-1]}ms"] = self._wait_histogram[-1]
+            return {
+                'pool_size': self.pool_size,
+                'max_overflow': self.max_overflow,
+                'timeout_seconds': self.timeout,
+                'max_waiters': self.max_waiters,
+                'pre_ping': self.pre_ping,
+                'recycle_seconds': self.recycle_seconds,
+                'open': self._open,
+                'idle': self._idle.qsize(),
+                'in_use': self._in_use,
+                'peak_in_use': self._peak_in_use,
+                'waiting': self._waiting,
+                'max_waiting': self._max_waiting,
+                'checkouts': self._checkouts,
+                'avg_wait_ms': round(self._total_wait_ms / self._checkouts, 2) if self._checkouts else 0.0,
+                'wait_histogram': histogram,
+                'timeouts': self._timeouts,
+                'overloaded': self._overloaded,
+                'errors': self._errors,
+                'pings_failed': self._pings_failed,
+                'recycled': self._recycled
+            }
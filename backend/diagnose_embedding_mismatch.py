@@ -6,10 +6,7 @@ Identifies if training and inference use different preprocessing
 import numpy as np
 import pickle
 from pathlib import Path
-import torch
 from PIL import Image
-from torchvision import transforms
-from facenet_pytorch import InceptionResnetV1
 import logging
 import sys
 
@@ -132,31 +129,12 @@ def diagnose():
         warnings_found.append("No test images available")
     else:
         try:
-            device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-            facenet = InceptionResnetV1(pretrained='vggface2').eval().to(device)
+            from recognizer.embeddings_facenet import embedding_generator
             
-            transform = transforms.Compose([
-                transforms.Resize((160, 160)),
-                transforms.ToTensor(),
-                transforms.Normalize(mean=[0.5, 0.5, 0.5], std=[0.5, 0.5, 0.5])
-            ])
-            
-            inference_norms = []
-            
-            with torch.no_grad():
-                for img_path in test_images:
-                    img = Image.open(img_path).convert('RGB')
-                    img_tensor = transform(img).unsqueeze(0).to(device)
-                    embedding = facenet(img_tensor).cpu().numpy().flatten()
-                    
-                    # Apply normalization (as in inference)
-                    norm = np.linalg.norm(embedding)
-                    if norm > 0:
-                        embedding = embedding / norm
-                    
-                    inference_norms.append(np.linalg.norm(embedding))
-            
-            inference_norms = np.array(inference_norms)
+            # Same batched path as inference (includes L2 normalization)
+            faces = [np.asarray(Image.open(img_path).convert('RGB')) for img_path in test_images]
+            embeddings = embedding_generator.generate_embeddings(faces, bgr=False)
+            inference_norms = np.linalg.norm(embeddings, axis=1)
             
             logger.info(f"   Tested {len(test_images)} images")
             logger.info(f"   Inference embedding norms:")
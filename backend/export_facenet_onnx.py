@@ -0,0 +1,75 @@
+"""
+Export FaceNet (InceptionResnetV1, vggface2) to ONNX
+One-time step for the ONNX Runtime embedding backend (EMBEDDING_BACKEND=onnx)
+
+Usage:
+    python export_facenet_onnx.py [--output models/facenet_vggface2.onnx]
+"""
+
+import os
+import sys
+import argparse
+
+import torch
+from facenet_pytorch import InceptionResnetV1
+
+from config import config
+
+
+def export(output_path, opset=13):
+    """Export the pretrained model with a dynamic batch dimension"""
+    print("=" * 60)
+    print("EXPORTING FACENET TO ONNX")
+    print("=" * 60)
+
+    model = InceptionResnetV1(pretrained='vggface2').eval()
+    dummy = torch.zeros(1, 3, 160, 160, dtype=torch.float32)
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            dummy,
+            output_path,
+            input_names=['input'],
+            output_names=['embedding'],
+            dynamic_axes={'input': {0: 'batch'}, 'embedding': {0: 'batch'}},
+            opset_version=opset,
+            do_constant_folding=True
+        )
+
+    size_mb = os.path.getsize(output_path) / (1024 * 1024)
+    print(f"✅ Exported: {output_path} ({size_mb:.1f} MB, opset {opset})")
+
+    # Sanity check with ONNX Runtime
+    try:
+        import onnxruntime as ort
+        session = ort.InferenceSession(output_path, providers=['CPUExecutionProvider'])
+        output = session.run(None, {'input': dummy.numpy()})[0]
+        print(f"✅ ONNX Runtime check passed: output shape {output.shape}")
+    except Exception as e:
+        print(f"❌ ONNX Runtime check failed: {e}")
+        return False
+
+    print()
+    print("Next steps:")
+    print("1. Verify parity: python test_onnx_embedder.py")
+    print("2. Enable backend: EMBEDDING_BACKEND=onnx in .env")
+    print("=" * 60)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export FaceNet to ONNX')
+    parser.add_argument('--output', type=str, default=config.ONNX_EMBEDDER_PATH,
+                        help='Path of the exported ONNX model')
+    parser.add_argument('--opset', type=int, default=13,
+                        help='ONNX opset version')
+    args = parser.parse_args()
+
+    sys.exit(0 if export(args.output, args.opset) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -19,7 +19,8 @@ from sklearn.metrics import accuracy_score, classification_report
 
 # Import current recognizer components
 from recognizer.detector import face_detector
-from recognizer.embeddings import embedding_generator
+from recognizer.embeddings_facenet import embedding_generator
+from recognizer.native_model import remove_native
 from config import config
 
 def generate_embeddings_from_images():
@@ -71,7 +72,7 @@ def generate_embeddings_from_images():
     print("🔍 Generating embeddings from face images...")
     print("-" * 70)
     
-    X = []  # Embeddings
+    face_imgs = []  # Aligned face crops, embedded in batches below
     y = []  # Labels
     
     total_images = 0
@@ -106,15 +107,12 @@ def generate_embeddings_from_images():
                 # Extract face
                 face_img = face_detector.extract_face(img, faces[0])
                 
-                # Generate embedding using CURRENT embedding generator
-                embedding = embedding_generator.generate_embedding(face_img)
-                
-                # Add to dataset
-                X.append(embedding)
+                # Queue face for batched embedding
+                face_imgs.append(face_img)
                 y.append(student_id)
                 successful_embeddings += 1
                 
-                print(f"   ✅ {img_file}: embedding shape {embedding.shape}")
+                print(f"   ✅ {img_file}: face extracted {face_img.shape}")
                 
             except Exception as e:
                 print(f"   ❌ Error processing {img_file}: {e}")
@@ -132,8 +130,9 @@ def generate_embeddings_from_images():
         print("❌ Not enough embeddings generated (need at least 2)")
         return False
     
-    # Convert to numpy arrays
-    X = np.array(X)
+    # Generate embeddings using the CURRENT (runtime) embedding generator
+    print(f"🔍 Embedding {len(face_imgs)} faces in batches...")
+    X = embedding_generator.generate_embeddings(face_imgs, batch_size=32)
     y = np.array(y)
     
     print(f"✅ Dataset created:")
@@ -233,6 +232,11 @@ def generate_embeddings_from_images():
     np.save(classes_path, label_encoder.classes_)
     print(f"✅ Saved: {classes_path}")
     
+    # Native files from an earlier conversion no longer match the new pickle
+    removed = remove_native(model_dir)
+    if removed:
+        print(f"🗑️  Removed {len(removed)} stale native files (convert_model_native.py regenerates them)")
+    
     print()
     print("=" * 70)
     print("✅ SUCCESS!")
@@ -26,6 +26,8 @@ from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, classification_report
 import pandas as pd
 
+from recognizer.native_model import remove_native
+
 def rebuild_models():
     """Rebuild model files from dataset"""
     
@@ -255,6 +257,11 @@ def rebuild_models():
         print(f"❌ Error saving label classes: {e}")
         return False
     
+    # Native files from an earlier conversion no longer match the new pickle
+    removed = remove_native(model_dir)
+    if removed:
+        print(f"🗑️  Removed {len(removed)} stale native files (convert_model_native.py regenerates them)")
+    
     print()
     
     # Verify saved models can be loaded
@@ -1,8 +1,11 @@
+import time
 import numpy as np
 from config import config
 from recognizer.loader import model_loader
-from recognizer.detector import face_detector
-from recognizer.embeddings_facenet import embedding_generator  # Use FaceNet embeddings
+from recognizer.detector import face_detector, DetectionResult
+from recognizer.inference_scheduler import inference_scheduler, InferenceTimeout
+from recognizer.quality import quality_gate
+from recognizer.embeddings_backend import embedding_generator  # FaceNet embeddings (torch or ONNX)
 from utils.image_tools import decode_image
 import logging
 
@@ -10,37 +13,36 @@ logger = logging.getLogger(__name__)
 
 class FaceRecognizer:
     def __init__(self):
-        # Override threshold to 0.60 for better recognition
-        # This allows faces with confidence 0.60+ to be recognized
-        self.threshold = 0.60
+        # Single source for the SVC head's acceptance threshold. The
+        # 'threshold' in training_metadata.json is informational only; the
+        # gallery head uses its own similarity threshold.
+        self.threshold = config.RECOGNITION_CONFIDENCE_THRESHOLD
         print(f"🎯 [Classifier] Recognition threshold set to: {self.threshold}")
         
-    def recognize(self, image_data):
+    def recognize(self, image_data, multi_face=False, candidates=None, tracker=None):
         """
         Main recognition pipeline
         
         Args:
             image_data: image bytes, base64, or numpy array
+            multi_face: If True, recognize every detected face in one batch
+                instead of only the first (largest) one
+            candidates: Optional set of student IDs (e.g. the session's
+                section roster); only these students are scored
+            tracker: Optional FaceTracker of the session; faces on tracks that
+                are already recognized skip alignment, FaceNet and
+                classification and reuse the track's result
             
         Returns:
-            dict with recognition results
+            dict with recognition results (with a 'faces' list in multi-face mode)
         """
         try:
             print("🔍 [Classifier] Starting recognition pipeline")
             
             # Check if model is loaded
-            if not model_loader.is_loaded():
-                print("⚠️ [Classifier] Model not loaded, attempting to load...")
-                success = model_loader.load_models()
-                if not success:
-                    print("❌ [Classifier] Model loading failed")
-                    return {
-                        'status': 'error',
-                        'error': 'Recognition model missing',
-                        'requires_model': True,
-                        'message': 'Please ensure model files are in backend/models/Classifier/'
-                    }
-                print("✅ [Classifier] Model loaded successfully")
+            unavailable = self._ensure_model_loaded()
+            if unavailable:
+                return unavailable
             
             # Decode image
             try:
@@ -58,10 +60,15 @@ class FaceRecognizer:
                     'message': 'Invalid image format'
                 }
             
+            if config.INFERENCE_BATCHING:
+                return self._recognize_scheduled(img, multi_face=multi_face, candidates=candidates, tracker=tracker)
+            
             # Detect faces
             try:
                 print("🔍 [Classifier] Detecting faces...")
-                faces = face_detector.detect_faces(img)
+                # detect() keeps no per-call state, so concurrent requests share it
+                detection = face_detector.detect(img)
+                faces = detection.bboxes
                 print(f"✅ [Classifier] Detected {len(faces)} face(s)")
             except Exception as e:
                 print(f"❌ [Classifier] Face detection error: {e}")
@@ -78,13 +85,20 @@ class FaceRecognizer:
                     'message': 'No face detected in image'
                 }
             
+            if tracker is not None:
+                return self._recognize_tracked(img, detection, multi_face=multi_face,
+                                               candidates=candidates, tracker=tracker)
+            
+            if multi_face:
+                return self._recognize_faces(img, detection, candidates=candidates)
+            
             # Use the first (largest) face
             face_bbox = faces[0]
             print(f"✅ [Classifier] Using face at: {face_bbox}")
             
             # Extract face
             try:
-                face_img = face_detector.extract_face(img, face_bbox)
+                face_img = face_detector.extract_face(img, face_bbox, kps=detection.landmarks(0))
                 print(f"✅ [Classifier] Face extracted: {face_img.shape}")
             except Exception as e:
                 print(f"❌ [Classifier] Face extraction error: {e}")
@@ -94,27 +108,18 @@ class FaceRecognizer:
                     'message': 'Failed to extract face region'
                 }
             
+            # Skip FaceNet for faces that would not be recognized anyway
+            rejection = self._quality_rejection(detection, 0, face_img)
+            if rejection is not None:
+                return rejection
+            
             # Generate embedding
             try:
                 print("🔍 [Classifier] Generating embedding...")
                 
-                # Check if embedding generator is available
-                if embedding_generator is None:
-                    print("❌ [Classifier] Embedding generator is None")
-                    return {
-                        'status': 'error',
-                        'error': 'Embedding generator not initialized',
-                        'message': 'Face recognition system not properly initialized'
-                    }
-                
-                # Check if FaceNet is available
-                if not embedding_generator.is_available():
-                    print("❌ [Classifier] FaceNet not available")
-                    return {
-                        'status': 'error',
-                        'error': 'FaceNet not available',
-                        'message': 'Face recognition model not loaded. Install: pip install torch torchvision facenet-pytorch'
-                    }
+                unavailable = self._check_embedding_generator()
+                if unavailable:
+                    return unavailable
                 
                 embedding = embedding_generator.generate_embedding(face_img)
                 print(f"✅ [Classifier] Embedding generated: shape {embedding.shape}")
@@ -150,7 +155,7 @@ class FaceRecognizer:
             # Classify
             try:
                 print("🔍 [Classifier] Classifying...")
-                result = self._classify_embedding(embedding)
+                result = self._classify_embedding(embedding, candidates=candidates)
                 print(f"✅ [Classifier] Classification result: {result['status']}")
                 return result
             except Exception as e:
@@ -171,41 +176,716 @@ class FaceRecognizer:
                 'message': 'Recognition system encountered an unexpected error'
             }
     
-    def _classify_embedding(self, embedding):
+    def _ensure_model_loaded(self):
+        """Load the classifier if needed; return an error dict if that fails, otherwise None"""
+        if model_loader.is_loaded():
+            return None
+        
+        print("⚠️ [Classifier] Model not loaded, attempting to load...")
+        if not model_loader.load_models():
+            print("❌ [Classifier] Model loading failed")
+            return {
+                'status': 'error',
+                'error': 'Recognition model missing',
+                'requires_model': True,
+                'message': 'Please ensure model files are in backend/models/Classifier/'
+            }
+        print("✅ [Classifier] Model loaded successfully")
+        return None
+    
+    def validate_edge_embeddings(self, embeddings, model_tag=None):
         """
-        Classify face embedding using trained classifier
+        Check embeddings computed on an edge device before classifying them
+        
+        They must come from the same FaceNet model (EMBEDDING_MODEL_TAG), be
+        512-d, finite and L2-normalized.
         
         Returns:
-            dict with classification results
+            (N, 512) float32 array
+        
+        Raises:
+            ValueError: describing the first failed check
+        """
+        if model_tag != config.EMBEDDING_MODEL_TAG:
+            raise ValueError(f"Embedding model '{model_tag}' does not match server model "
+                             f"'{config.EMBEDDING_MODEL_TAG}'")
+        
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if embeddings.ndim == 1:
+            embeddings = embeddings.reshape(1, -1)
+        if embeddings.ndim != 2 or embeddings.shape[1] != 512:
+            raise ValueError(f"Expected 512-d embeddings, got shape {embeddings.shape}")
+        if not 0 < len(embeddings) <= config.EDGE_MAX_FACES:
+            raise ValueError(f"Expected 1-{config.EDGE_MAX_FACES} embeddings, got {len(embeddings)}")
+        if not np.all(np.isfinite(embeddings)):
+            raise ValueError("Embeddings contain NaN or infinite values")
+        
+        norms = np.linalg.norm(embeddings, axis=1)
+        if np.any(np.abs(norms - 1.0) > config.EDGE_EMBEDDING_NORM_TOLERANCE):
+            raise ValueError(f"Embeddings must be L2-normalized (norms {norms.min():.3f}-{norms.max():.3f})")
+        
+        return embeddings
+    
+    def _edge_result(self, results, multi_face, boxes):
+        """Single result, or a multi_face response when several faces were sent"""
+        if multi_face or len(results) > 1:
+            return self._multi_face_payload(boxes if boxes is not None else [], results)
+        return results[0]
+    
+    def recognize_embeddings(self, embeddings, model_tag=None, multi_face=False, candidates=None, boxes=None):
+        """
+        Classify embeddings produced by an edge device running the same FaceNet
+        model; no decoding, detection or FaceNet pass on the server
+        
+        Args:
+            embeddings: (N, 512) L2-normalized embeddings
+            model_tag: Embedding model identifier sent by the device
+            boxes: Optional (x, y, w, h) per face, echoed in multi-face results
+        
+        Raises:
+            ValueError: if the embeddings fail validate_edge_embeddings
         """
+        embeddings = self.validate_edge_embeddings(embeddings, model_tag)
+        
+        unavailable = self._ensure_model_loaded()
+        if unavailable:
+            return unavailable
+        
+        print(f"🔍 [Classifier] Classifying {len(embeddings)} edge embedding(s)")
+        if len(embeddings) == 1 and not multi_face:
+            return self._classify_embedding(embeddings[0], candidates=candidates)
+        
+        results = self._classify_embeddings(embeddings, candidates=candidates)
+        return self._edge_result(results, multi_face, boxes)
+    
+    def recognize_crops(self, crops, multi_face=False, candidates=None, boxes=None):
+        """
+        Recognize pre-aligned face crops from an edge device (no detection)
+        
+        Args:
+            crops: list of BGR face crops, aligned to 160x160 like extract_face
+            boxes: Optional (x, y, w, h) per face, echoed in multi-face results
+        """
+        if not 0 < len(crops) <= config.EDGE_MAX_FACES:
+            raise ValueError(f"Expected 1-{config.EDGE_MAX_FACES} face crops, got {len(crops)}")
+        
+        unavailable = self._ensure_model_loaded() or self._check_embedding_generator()
+        if unavailable:
+            return unavailable
+        
+        # Quality gate without size/pose: crops carry no frame box or landmarks
+        kept, kept_crops, rejected = [], [], {}
+        for i, crop in enumerate(crops):
+            rejection = None
+            if config.QUALITY_GATE_ENABLED:
+                rejection = quality_gate.assess(crop, (0, 0, crop.shape[1], crop.shape[0]))
+            if rejection is None:
+                kept.append(i)
+                kept_crops.append(crop)
+            else:
+                rejected[i] = rejection
+        
+        print(f"🔍 [Classifier] Embedding {len(kept_crops)}/{len(crops)} edge crop(s)")
+        embeddings = embedding_generator.generate_embeddings(kept_crops)
+        classified = self._classify_embeddings(embeddings, candidates=candidates) if kept else []
+        
+        fresh = dict(zip(kept, classified))
+        results = [fresh[i] if i in fresh else rejected[i] for i in range(len(crops))]
+        return self._edge_result(results, multi_face, boxes)
+    
+    def _check_embedding_generator(self):
+        """Return an error dict if FaceNet cannot be used, otherwise None"""
+        if embedding_generator is None:
+            print("❌ [Classifier] Embedding generator is None")
+            return {
+                'status': 'error',
+                'error': 'Embedding generator not initialized',
+                'message': 'Face recognition system not properly initialized'
+            }
+        
+        if not embedding_generator.is_available():
+            print("❌ [Classifier] FaceNet not available")
+            if config.EMBEDDING_BACKEND == 'onnx':
+                hint = 'Export the model with: python export_facenet_onnx.py'
+            else:
+                hint = 'Install: pip install torch torchvision facenet-pytorch'
+            return {
+                'status': 'error',
+                'error': 'FaceNet not available',
+                'message': f'Face recognition model not loaded. {hint}'
+            }
+        
+        return None
+    
+    def _recognize_faces(self, img, detection, candidates=None):
+        """
+        Recognize every detected face with one batched FaceNet pass
+        
+        Each face is aligned with its InsightFace landmarks, the crops
+        are embedded together and the whole batch is classified in one call.
+        
+        Returns:
+            dict with status 'multi_face' and one result per face
+        """
+        faces = detection.bboxes
+        print(f"🔍 [Classifier] Multi-face mode: {len(faces)} face(s)")
+        
         try:
-            print("🔍 [Classifier] Getting classifier and encoder...")
-            classifier = model_loader.get_classifier()
-            label_encoder = model_loader.get_label_encoder()
-            scaler = model_loader.get_scaler()
+            face_imgs = [
+                face_detector.extract_face(img, bbox, kps=detection.landmarks(i))
+                for i, bbox in enumerate(faces)
+            ]
+        except Exception as e:
+            print(f"❌ [Classifier] Face extraction error: {e}")
+            return {
+                'status': 'error',
+                'error': f'Face extraction failed: {str(e)}',
+                'message': 'Failed to extract face region'
+            }
+        
+        indices = range(len(faces))
+        kept, face_imgs, rejected = self._gate_crops(detection, indices, face_imgs)
+        
+        unavailable = self._check_embedding_generator()
+        if unavailable:
+            return unavailable
+        
+        try:
+            embeddings = embedding_generator.generate_embeddings(face_imgs)
+            print(f"✅ [Classifier] Batch embeddings generated: shape {embeddings.shape}")
+        except Exception as e:
+            print(f"❌ [Classifier] Batch embedding error: {e}")
+            logger.error(f"Batch embedding error: {e}", exc_info=True)
+            return {
+                'status': 'error',
+                'error': f'Embedding generation failed: {str(e)}',
+                'message': 'Failed to generate face embeddings'
+            }
+        
+        return self._multi_face_result(faces, embeddings, candidates=candidates,
+                                       kept=kept, rejected=rejected, scores=detection.scores)
+    
+    def recognize_photo(self, img, candidates=None, timings=None):
+        """
+        Recognize everyone in one high-resolution classroom photo
+        
+        Detection runs on overlapping tiles in parallel (TiledDetector), then
+        every face is aligned, quality-gated, embedded in one FaceNet batch and
+        classified together.
+        
+        Args:
+            img: Full-resolution BGR image
+            timings: Optional dict filled with per-stage milliseconds and tile stats
+        
+        Returns:
+            dict with status 'multi_face' (or 'no_face' / 'error')
+        """
+        from recognizer.tiled_detection import tiled_detector
+        
+        timings = {} if timings is None else timings
+        
+        def elapsed_ms(started):
+            return round((time.perf_counter() - started) * 1000, 1)
+        
+        unavailable = self._ensure_model_loaded() or self._check_embedding_generator()
+        if unavailable:
+            return unavailable
+        
+        started = time.perf_counter()
+        detection = tiled_detector.detect(img, stats=timings)
+        timings['detect_ms'] = elapsed_ms(started)
+        
+        if detection.num_faces == 0:
+            print("⚠️ [Classifier] No faces found in classroom photo")
+            return {
+                'status': 'no_face',
+                'message': 'No faces detected in the photo'
+            }
+        
+        if detection.num_faces > config.PHOTO_MAX_FACES:
+            # Merged detections are sorted by score: keep the most confident
+            print(f"⚠️ [Classifier] {detection.num_faces} faces found, keeping {config.PHOTO_MAX_FACES}")
+            limit = config.PHOTO_MAX_FACES
+            detection = DetectionResult.build(
+                detection.bboxes[:limit], detection.scores[:limit],
+                None if detection.kps is None else detection.kps[:limit]
+            )
+        
+        print(f"🔍 [Classifier] Classroom photo: {detection.num_faces} face(s) on {timings.get('tiles')} tile(s)")
+        
+        started = time.perf_counter()
+        try:
+            face_imgs = [
+                face_detector.extract_face(img, bbox, kps=detection.landmarks(i))
+                for i, bbox in enumerate(detection.bboxes)
+            ]
+        except Exception as e:
+            print(f"❌ [Classifier] Face extraction error: {e}")
+            return {
+                'status': 'error',
+                'error': f'Face extraction failed: {str(e)}',
+                'message': 'Failed to extract face region'
+            }
+        kept, face_imgs, rejected = self._gate_crops(detection, range(detection.num_faces), face_imgs)
+        timings['align_ms'] = elapsed_ms(started)
+        
+        started = time.perf_counter()
+        try:
+            embeddings = embedding_generator.generate_embeddings(face_imgs) if face_imgs else np.zeros((0, 512))
+        except Exception as e:
+            print(f"❌ [Classifier] Batch embedding error: {e}")
+            logger.error(f"Batch embedding error: {e}", exc_info=True)
+            return {
+                'status': 'error',
+                'error': f'Embedding generation failed: {str(e)}',
+                'message': 'Failed to generate face embeddings'
+            }
+        timings['embed_ms'] = elapsed_ms(started)
+        timings['embedded'] = len(kept)
+        
+        started = time.perf_counter()
+        result = self._multi_face_result(detection.bboxes, embeddings, candidates=candidates,
+                                         kept=kept, rejected=rejected, scores=detection.scores)
+        timings['classify_ms'] = elapsed_ms(started)
+        return result
+    
+    def recognize_batch(self, images, multi_face=False, candidates=None):
+        """
+        Recognize a list of uploaded images in one pass
+        
+        Faces are detected image by image on one pooled detector, then the
+        aligned crops of every image are embedded in FaceNet batches of
+        Config.BATCH_EMBED_SIZE and classified in a single call.
+        
+        Args:
+            images: list of BGR images (None entries are skipped)
+            multi_face: Recognize every face per image instead of the largest
+        
+        Returns:
+            list with one result per image (None for skipped entries), shaped
+            like recognize() results
+        """
+        unavailable = self._ensure_model_loaded() or self._check_embedding_generator()
+        if unavailable:
+            return [unavailable if img is not None else None for img in images]
+        
+        results = [None] * len(images)
+        detections = {}
+        crops = []
+        owners = []  # (image index, face index) of each crop
+        rejected = {}  # image index -> {face index: low_quality result}
+        
+        for n, img in enumerate(images):
+            if img is None:
+                continue
+            try:
+                detection = face_detector.detect(img)
+            except Exception as e:
+                print(f"❌ [Classifier] Face detection error on image {n}: {e}")
+                results[n] = {
+                    'status': 'error',
+                    'error': f'Face detection failed: {str(e)}',
+                    'message': 'Face detection system error'
+                }
+                continue
+        
+            if detection.num_faces == 0:
+                results[n] = {
+                    'status': 'no_face',
+                    'message': 'No face detected in image'
+                }
+                continue
+        
+            detections[n] = detection
+            indices = range(detection.num_faces) if multi_face else [0]
+            face_imgs = [
+                face_detector.extract_face(img, detection.bboxes[i], kps=detection.landmarks(i))
+                for i in indices
+            ]
+            kept, face_imgs, rejected[n] = self._gate_crops(detection, indices, face_imgs)
+            crops.extend(face_imgs)
+            owners.extend((n, i) for i in kept)
+        
+        print(f"🔍 [Classifier] Batch: {len(detections)}/{len(images)} image(s) with faces, embedding {len(crops)} crop(s)")
+        
+        classified = []
+        if crops:
+            try:
+                step = max(1, config.BATCH_EMBED_SIZE)
+                embeddings = np.concatenate([
+                    embedding_generator.generate_embeddings(crops[i:i + step])
+                    for i in range(0, len(crops), step)
+                ])
+                classified = self._classify_embeddings(embeddings, candidates=candidates)
+            except Exception as e:
+                print(f"❌ [Classifier] Batch embedding error: {e}")
+                logger.error(f"Batch embedding error: {e}", exc_info=True)
+                error = {
+                    'status': 'error',
+                    'error': f'Embedding generation failed: {str(e)}',
+                    'message': 'Failed to generate face embeddings'
+                }
+                for n in detections:
+                    results[n] = dict(error)
+                return results
+        
+        per_image = {n: {} for n in detections}
+        for (n, i), result in zip(owners, classified):
+            per_image[n][i] = result
+        
+        for n, detection in detections.items():
+            fresh = {**rejected[n], **per_image[n]}
+            if multi_face:
+                faces = [fresh[i] for i in range(detection.num_faces)]
+                results[n] = self._multi_face_payload(detection.bboxes, faces, scores=detection.scores)
+            else:
+                results[n] = fresh[0]
+        
+        return results
+    
+    def _recognize_scheduled(self, img, multi_face=False, candidates=None, tracker=None):
+        """
+        Recognize via the shared micro-batching scheduler
+        
+        Detection and FaceNet run on the scheduler's worker, batched with
+        frames from other concurrent requests; only classification runs here.
+        With a tracker, only faces on unrecognized tracks are embedded.
+        """
+        unavailable = self._check_embedding_generator()
+        if unavailable:
+            return unavailable
+        
+        track_state = {}
+        select_fn = None
+        if tracker is not None:
+            select_fn = lambda detection: self._select_untracked(detection, multi_face, tracker, track_state)
+        
+        # Quality gate runs on the worker, between alignment and FaceNet
+        rejected = {}
+        gate_fn = None
+        if config.QUALITY_GATE_ENABLED:
+            def gate_fn(detection, index, crop):
+                rejection = self._quality_rejection(detection, index, crop)
+                if rejection is not None:
+                    rejected[index] = rejection
+                return rejection is None
+        
+        try:
+            print("🔍 [Classifier] Queueing frame for batched inference...")
+            detection, embeddings = inference_scheduler.infer(
+                img, max_faces=None if multi_face else 1, select_fn=select_fn, gate_fn=gate_fn
+            )
+            print(f"✅ [Classifier] Detected {detection.num_faces} face(s), {len(embeddings)} embedded")
+        except InferenceTimeout as e:
+            print(f"⚠️ [Classifier] {e}")
+            return {
+                'status': 'error',
+                'error': 'Recognition queue timeout',
+                'message': 'Recognition server is busy, please try again'
+            }
+        except Exception as e:
+            print(f"❌ [Classifier] Batched inference error: {e}")
+            logger.error(f"Batched inference error: {e}", exc_info=True)
+            return {
+                'status': 'error',
+                'error': f'Face recognition failed: {str(e)}',
+                'message': 'Face recognition system error'
+            }
+        
+        if detection.num_faces == 0:
+            print("⚠️ [Classifier] No face detected")
+            return {
+                'status': 'no_face',
+                'message': 'No face detected in image'
+            }
+        
+        try:
+            if tracker is not None:
+                track_state['selected'] = [i for i in track_state['selected'] if i not in rejected]
+                track_state['rejected'] = rejected
+                return self._tracked_result(detection, track_state, embeddings,
+                                            multi_face=multi_face, candidates=candidates)
             
-            if classifier is None:
-                print("❌ [Classifier] Classifier is None")
+            if multi_face:
+                kept = [i for i in range(detection.num_faces) if i not in rejected]
+                return self._multi_face_result(detection.bboxes, embeddings, candidates=candidates,
+                                               kept=kept, rejected=rejected, scores=detection.scores)
+            
+            if 0 in rejected:
+                return rejected[0]
+            
+            result = self._classify_embedding(embeddings[0], candidates=candidates)
+            print(f"✅ [Classifier] Classification result: {result['status']}")
+            return result
+        except Exception as e:
+            print(f"❌ [Classifier] Classification error: {e}")
+            return {
+                'status': 'error',
+                'error': f'Classification failed: {str(e)}',
+                'message': 'Failed to classify face'
+            }
+    
+    def _select_untracked(self, detection, multi_face, tracker, track_state):
+        """
+        Assign detections to tracks and return the face indices that still
+        need FaceNet (all faces in multi-face mode, else only the first)
+        """
+        tracks = tracker.update(detection.bboxes)
+        track_state['tracks'] = tracks
+        
+        indices = range(len(tracks)) if multi_face else range(min(1, len(tracks)))
+        selected = [i for i in indices if not tracks[i].decided()]
+        track_state['selected'] = selected
+        return selected
+    
+    def _recognize_tracked(self, img, detection, multi_face=False, candidates=None, tracker=None):
+        """Inline (non-batched) recognition that skips faces on recognized tracks"""
+        track_state = {}
+        selected = self._select_untracked(detection, multi_face, tracker, track_state)
+        
+        embeddings = np.zeros((0, 512), dtype=np.float32)
+        if selected:
+            unavailable = self._check_embedding_generator()
+            if unavailable:
+                return unavailable
+            
+            try:
+                face_imgs = [
+                    face_detector.extract_face(img, detection.bboxes[i], kps=detection.landmarks(i))
+                    for i in selected
+                ]
+                selected, face_imgs, track_state['rejected'] = self._gate_crops(detection, selected, face_imgs)
+                track_state['selected'] = selected
+                embeddings = embedding_generator.generate_embeddings(face_imgs)
+            except Exception as e:
+                print(f"❌ [Classifier] Embedding error: {e}")
+                logger.error(f"Embedding error: {e}", exc_info=True)
                 return {
                     'status': 'error',
-                    'error': 'Classifier not loaded',
-                    'message': 'Model not properly initialized'
+                    'error': f'Embedding generation failed: {str(e)}',
+                    'message': 'Failed to generate face embeddings'
                 }
+        
+        try:
+            return self._tracked_result(detection, track_state, embeddings,
+                                        multi_face=multi_face, candidates=candidates)
+        except Exception as e:
+            print(f"❌ [Classifier] Classification error: {e}")
+            return {
+                'status': 'error',
+                'error': f'Classification failed: {str(e)}',
+                'message': 'Failed to classify face'
+            }
+    
+    def _head_threshold(self):
+        """Acceptance threshold of the active head (SVC probability or gallery similarity)"""
+        gallery = model_loader.get_gallery()
+        if model_loader.get_head() == 'gallery' and gallery is not None:
+            return gallery.threshold
+        return self.threshold
+    
+    def _tracked_result(self, detection, track_state, embeddings, multi_face=False, candidates=None):
+        """
+        Classify the embedded faces, store the results on their tracks and
+        fill in the remaining faces from their (already decided) tracks
+        
+        Each track's running mean embedding is classified instead of the
+        single frame, so evidence accumulates until the threshold is crossed.
+        A track still far below the threshold after TRACK_REJECT_AFTER_FRAMES
+        frames is rejected and not embedded again for a cooldown.
+        """
+        tracks = track_state['tracks']
+        selected = track_state['selected']
+        rejected = track_state.get('rejected', {})
+        
+        classified = []
+        if selected:
+            aggregated = np.stack([
+                tracks[i].add_embedding(embedding) for i, embedding in zip(selected, embeddings)
+            ])
+            classified = self._classify_embeddings(aggregated, candidates=candidates)
+        
+        reject_below = self._head_threshold() * config.TRACK_REJECT_RATIO
+        for i, result in zip(selected, classified):
+            track = tracks[i]
+            track.result = result
+            result['frames'] = track.frames
+            
+            if (result.get('status') == 'unknown' and track.frames >= config.TRACK_REJECT_AFTER_FRAMES
+                    and result.get('confidence', 0.0) < reject_below):
+                track.reject(config.TRACK_REJECT_COOLDOWN_SECONDS)
+                result['rejected'] = True
+                print(f"⚠️ [Classifier] Track {track.track_id} rejected after {track.frames} frames "
+                      f"(confidence {result.get('confidence', 0.0):.3f} < {reject_below:.3f})")
+        fresh = dict(zip(selected, classified))
+        
+        indices = range(len(tracks)) if multi_face else range(min(1, len(tracks)))
+        results = []
+        for i in indices:
+            if i in fresh:
+                result = dict(fresh[i])
+            elif i in rejected:
+                # Low-quality frame: no evidence added to the track
+                result = dict(rejected[i])
+            else:
+                result = dict(tracks[i].result)
+                result['tracked'] = True
+            result['track_id'] = tracks[i].track_id
+            results.append(result)
+        
+        skipped = len(results) - len(selected) - len(rejected)
+        print(f"✅ [Classifier] Tracking: {len(selected)} face(s) embedded, {skipped} reused from decided tracks, "
+              f"{len(rejected)} low quality")
+        
+        if multi_face:
+            return self._multi_face_payload(detection.bboxes, results, scores=detection.scores)
+        return results[0]
+    
+    def _multi_face_result(self, faces, embeddings, candidates=None, kept=None, rejected=None, scores=None):
+        """
+        Classify a batch of face embeddings and attach their boxes
+        
+        kept/rejected: with the quality gate, the face indices the embeddings
+        belong to and the low_quality results of the others
+        """
+        results = self._classify_embeddings(embeddings, candidates=candidates) if len(embeddings) else []
+        if rejected:
+            fresh = dict(zip(kept, results))
+            results = [fresh[i] if i in fresh else rejected[i] for i in range(len(faces))]
+        return self._multi_face_payload(faces, results, scores=scores)
+    
+    def _quality_rejection(self, detection, index, crop):
+        """low_quality result if the face fails the quality gate, else None"""
+        if not config.QUALITY_GATE_ENABLED:
+            return None
+        
+        rejection = quality_gate.assess(crop, detection.bboxes[index], detection.landmarks(index))
+        if rejection is not None:
+            print(f"⚠️ [Classifier] Face {index} not embedded: {rejection['reason']} {rejection['quality']}")
+        return rejection
+    
+    def _gate_crops(self, detection, indices, crops):
+        """Split aligned crops into (kept indices, kept crops, {index: low_quality result})"""
+        kept, kept_crops, rejected = [], [], {}
+        for i, crop in zip(indices, crops):
+            rejection = self._quality_rejection(detection, i, crop)
+            if rejection is None:
+                kept.append(i)
+                kept_crops.append(crop)
+            else:
+                rejected[i] = rejection
+        return kept, kept_crops, rejected
+    
+    def _multi_face_payload(self, faces, results, scores=None):
+        """Attach boxes (and detection scores) to per-face results and wrap them in a multi_face response"""
+        for i, (bbox, result) in enumerate(zip(faces, results)):
+            x, y, w, h = bbox
+            result['bbox'] = {'x': int(x), 'y': int(y), 'w': int(w), 'h': int(h)}
+            if scores is not None:
+                result['detection_score'] = round(float(scores[i]), 4)
+        
+        recognized = sum(1 for r in results if r.get('status') == 'recognized')
+        print(f"✅ [Classifier] Multi-face result: {recognized}/{len(results)} recognized")
+        
+        return {
+            'status': 'multi_face',
+            'count': len(results),
+            'recognized_count': recognized,
+            'model_version': results[0].get('model_version') if results else model_loader.get_version(),
+            'faces': results
+        }
+    
+    def _classify_embedding(self, embedding, candidates=None):
+        """
+        Classify a single face embedding using trained classifier
+        
+        Returns:
+            dict with classification results
+        """
+        return self._classify_embeddings(np.asarray(embedding).reshape(1, -1), candidates=candidates)[0]
+    
+    def _classify_embeddings(self, embeddings, candidates=None):
+        """
+        Classify a batch of face embeddings in one vectorized call
+        
+        The active model bundle is read once, so the whole batch is scored by
+        one model version even if a hot-swap happens meanwhile; that version
+        is reported as 'model_version' in every result.
+        
+        Args:
+            embeddings: numpy array of shape (N, 512)
+            candidates: Optional set of student IDs to restrict scoring to
+        
+        Returns:
+            list of N dicts with classification results
+        """
+        bundle = model_loader.get_bundle()
+        if bundle is None:
+            return [{
+                'status': 'error',
+                'error': 'Recognition model missing',
+                'message': 'Model not properly initialized'
+            } for _ in range(np.asarray(embeddings).shape[0])]
+        
+        results = self._classify_with_bundle(bundle, embeddings, candidates=candidates)
+        for result in results:
+            result['model_version'] = bundle.version
+        return results
+    
+    def _classify_with_bundle(self, bundle, embeddings, candidates=None):
+        """Classify embeddings with one specific model bundle (see _classify_embeddings)"""
+        embeddings = np.asarray(embeddings)
+        num_faces = embeddings.shape[0]
+        
+        def error_results(error, message):
+            return [{'status': 'error', 'error': error, 'message': message} for _ in range(num_faces)]
+        
+        def no_candidate_results():
+            return [{
+                'status': 'unknown',
+                'message': 'No students of this section are enrolled in the model',
+                'confidence': 0.0
+            } for _ in range(num_faces)]
+        
+        try:
+            if bundle.get_head() == 'gallery':
+                gallery = bundle.get_gallery()
+                if gallery is None:
+                    print("❌ [Classifier] Gallery is None")
+                    return error_results('Gallery not loaded', 'Model not properly initialized')
+                
+                if candidates is not None:
+                    gallery = bundle.candidate_view('gallery', candidates, lambda: gallery.restrict(candidates))
+                    if gallery is None:
+                        print("⚠️ [Classifier] No candidate students in gallery")
+                        return no_candidate_results()
+                
+                print(f"🔍 [Classifier] Matching {num_faces} embedding(s) against gallery ({len(gallery)} students)...")
+                results = gallery.match_batch(embeddings)
+                for i, result in enumerate(results):
+                    print(f"🔍 [Classifier] Face {i}: {result['status']} " + ", ".join(
+                        f"{c['student_id']}={c['similarity']:.4f}" for c in result['top_k']))
+                return results
             
-            print(f"✅ [Classifier] Classifier loaded, embedding shape: {embedding.shape}")
+            print("🔍 [Classifier] Getting classifier and encoder...")
+            classifier = bundle.get_classifier()
+            label_encoder = bundle.get_label_encoder()
+            scaler = bundle.get_scaler()
+            
+            if classifier is None:
+                print("❌ [Classifier] Classifier is None")
+                return error_results('Classifier not loaded', 'Model not properly initialized')
             
-            # Reshape embedding for prediction
-            embedding = embedding.reshape(1, -1)
-            print(f"✅ [Classifier] Embedding reshaped: {embedding.shape}")
+            print(f"✅ [Classifier] Classifier loaded, embeddings shape: {embeddings.shape}")
 
             # Apply scaler if it exists
             # NOTE: Embeddings are already L2-normalized by embeddings_facenet.py
             # We should NOT normalize again after scaling!
             if scaler is not None:
                 try:
-                    print("🔍 [Classifier] Scaling embedding with saved scaler...")
-                    embedding = scaler.transform(embedding)
-                    print(f"✅ [Classifier] Embedding scaled")
+                    print("🔍 [Classifier] Scaling embeddings with saved scaler...")
+                    embeddings = scaler.transform(embeddings)
+                    print(f"✅ [Classifier] Embeddings scaled")
                 except Exception as e:
                     print(f"⚠️ [Classifier] Scaler transform failed: {e}. Proceeding without scaler.")
             
@@ -213,7 +893,7 @@ class FaceRecognizer:
             # Embeddings are already normalized before scaling during training
             # Normalizing again after scaling breaks the distribution
             
-            # Get prediction probabilities
+            # Get prediction probabilities for the whole batch
             try:
                 # Check if classifier is a dict (new model format)
                 if isinstance(classifier, dict):
@@ -221,94 +901,98 @@ class FaceRecognizer:
                     actual_classifier = classifier.get('classifier')
                     if actual_classifier is None:
                         print("❌ [Classifier] No 'classifier' key in dict")
-                        return {
-                            'status': 'error',
-                            'error': 'Invalid model format',
-                            'message': 'Model file is corrupted'
-                        }
+                        return error_results('Invalid model format', 'Model file is corrupted')
                     classifier = actual_classifier
                 
+                # Columns of the probability matrix that belong to candidates
+                candidate_idx = None
+                if candidates is not None:
+                    classes = label_encoder.classes_ if label_encoder else bundle.get_classes()
+                    if classes is not None:
+                        candidate_idx = bundle.candidate_view(
+                            'classes', candidates,
+                            lambda: np.where(np.isin(np.asarray(classes).astype(str), [str(c) for c in candidates]))[0]
+                        )
+                        if len(candidate_idx) == 0:
+                            print("⚠️ [Classifier] No candidate students in classifier")
+                            return no_candidate_results()
+                
                 if hasattr(classifier, 'predict_proba'):
                     print("🔍 [Classifier] Using predict_proba...")
-                    probabilities = classifier.predict_proba(embedding)[0]
-                    max_prob_idx = np.argmax(probabilities)
-                    confidence = probabilities[max_prob_idx]
-                    print(f"✅ [Classifier] Prediction: class {max_prob_idx}, confidence {confidence:.3f}")
+                    probabilities = classifier.predict_proba(embeddings)
+                    if candidate_idx is not None:
+                        # Only the section's students can win
+                        print(f"🔍 [Classifier] Restricting to {len(candidate_idx)} candidate class(es)")
+                        best = np.argmax(probabilities[:, candidate_idx], axis=1)
+                        max_prob_idx = candidate_idx[best]
+                    else:
+                        max_prob_idx = np.argmax(probabilities, axis=1)
+                    confidences = probabilities[np.arange(num_faces), max_prob_idx]
                 else:
                     print("🔍 [Classifier] Using predict (no probabilities)...")
-                    prediction = classifier.predict(embedding)[0]
-                    confidence = 1.0
-                    max_prob_idx = int(prediction)
-                    print(f"✅ [Classifier] Prediction: class {max_prob_idx}")
+                    probabilities = None
+                    max_prob_idx = np.asarray(classifier.predict(embeddings)).astype(int)
+                    confidences = np.ones(num_faces)
+                    if candidate_idx is not None:
+                        # Without probabilities, reject predictions outside the candidate set
+                        confidences[~np.isin(max_prob_idx, candidate_idx)] = 0.0
             except Exception as e:
                 print(f"❌ [Classifier] Prediction error: {e}")
                 import traceback
                 traceback.print_exc()
-                return {
-                    'status': 'error',
-                    'error': f'Prediction failed: {str(e)}',
-                    'message': 'Model prediction error'
-                }
+                return error_results(f'Prediction failed: {str(e)}', 'Model prediction error')
             
-            # Use production threshold (0.75) - increased for better accuracy
-            # Faces with confidence >= 0.75 will be recognized
-            NEW_THRESHOLD = 0.75
-            print(f"🎯 [Classifier] Using threshold: {NEW_THRESHOLD}")
-            print(f"🔍 [Classifier] Checking: confidence {confidence:.3f} >= threshold {NEW_THRESHOLD}")
-            print(f"🔍 [Classifier] Top 3 predictions:")
-            top_3_indices = np.argsort(probabilities)[-3:][::-1]
-            for i, idx in enumerate(top_3_indices, 1):
-                prob = probabilities[idx]
+            # Decode all predicted labels at once
+            try:
                 if label_encoder:
-                    lbl = label_encoder.inverse_transform([idx])[0]
-                elif model_loader.get_classes() is not None:
-                    lbl = model_loader.get_classes()[idx]
+                    predicted_labels = label_encoder.inverse_transform(max_prob_idx)
                 else:
-                    lbl = f"CLASS_{idx}"
-                print(f"    {i}. {lbl}: {prob:.4f}")
+                    classes = bundle.get_classes()
+                    predicted_labels = [
+                        classes[idx] if classes is not None and idx < len(classes) else str(idx)
+                        for idx in max_prob_idx
+                    ]
+            except Exception as e:
+                print(f"❌ [Classifier] Label decoding error: {e}")
+                predicted_labels = [f"CLASS_{idx}" for idx in max_prob_idx]
             
-            if confidence < NEW_THRESHOLD:
-                print(f"⚠️ [Classifier] Low confidence: {confidence:.3f} < {NEW_THRESHOLD}")
-                return {
-                    'status': 'unknown',
-                    'message': 'Face not recognized (low confidence)',
-                    'confidence': float(confidence),
-                    'top_prediction': str(predicted_label) if 'predicted_label' in locals() else 'unknown'
-                }
+            print(f"🎯 [Classifier] Using threshold: {self.threshold}")
             
-            # Decode label
-            try:
-                if label_encoder:
-                    print("🔍 [Classifier] Using label encoder...")
-                    predicted_label = label_encoder.inverse_transform([max_prob_idx])[0]
-                else:
-                    print("🔍 [Classifier] Using class array...")
-                    classes = model_loader.get_classes()
-                    if classes is not None and max_prob_idx < len(classes):
-                        predicted_label = classes[max_prob_idx]
-                    else:
-                        predicted_label = str(max_prob_idx)
+            results = []
+            for i in range(num_faces):
+                confidence = float(confidences[i])
+                predicted_label = str(predicted_labels[i])
+                print(f"🔍 [Classifier] Face {i}: {predicted_label} confidence {confidence:.3f}")
+                
+                if probabilities is not None:
+                    top_3_indices = np.argsort(probabilities[i])[-3:][::-1]
+                    print(f"🔍 [Classifier] Top 3 predictions: " + ", ".join(
+                        f"{idx}={probabilities[i][idx]:.4f}" for idx in top_3_indices))
+                
+                if confidence < self.threshold:
+                    print(f"⚠️ [Classifier] Low confidence: {confidence:.3f} < {self.threshold}")
+                    results.append({
+                        'status': 'unknown',
+                        'message': 'Face not recognized (low confidence)',
+                        'confidence': confidence,
+                        'top_prediction': predicted_label
+                    })
+                    continue
                 
                 print(f"✅ [Classifier] Predicted label: {predicted_label}")
-            except Exception as e:
-                print(f"❌ [Classifier] Label decoding error: {e}")
-                predicted_label = f"CLASS_{max_prob_idx}"
+                results.append({
+                    'status': 'recognized',
+                    'student_id': predicted_label,
+                    'confidence': confidence
+                })
             
-            return {
-                'status': 'recognized',
-                'student_id': str(predicted_label),
-                'confidence': float(confidence)
-            }
+            return results
             
         except Exception as e:
             print(f"❌ [Classifier] Classification error: {e}")
             import traceback
             traceback.print_exc()
-            return {
-                'status': 'error',
-                'error': f'Classification error: {str(e)}',
-                'message': 'Failed to classify embedding'
-            }
+            return error_results(f'Classification error: {str(e)}', 'Failed to classify embedding')
 
 # Global recognizer instance
 face_recognizer = FaceRecognizer()
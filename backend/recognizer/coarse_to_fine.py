@@ -0,0 +1,167 @@
+"""
+Coarse-to-fine face detection
+A low-resolution pass over the whole frame proposes face regions; a second
+pass runs only on expanded crops around those proposals, where the face
+covers a larger share of the detector input. Boxes, scores and landmarks
+come from the crop pass, mapped back to frame coordinates. Small faces at the
+back of a classroom keep near-640 accuracy at a cost close to the coarse pass.
+"""
+
+import logging
+
+import cv2
+import numpy as np
+
+from config import config
+from recognizer.detector import DetectionResult
+from recognizer.model_registry import model_registry
+from recognizer.tracker import iou_matrix
+
+logger = logging.getLogger(__name__)
+
+NMS_IOU = 0.4  # Crops may overlap; duplicates above this IoU are merged
+
+
+def _merge_regions(regions, max_side=None):
+    """
+    Union overlapping (x1, y1, x2, y2) regions until none overlap
+
+    With max_side, two regions are only merged if the union's longer side
+    stays within it. Without the cap a crowded frame collapses into one
+    near-full-frame crop that the fine pass sees at a lower resolution than
+    the coarse pass did.
+    """
+    regions = [list(r) for r in regions]
+    merged = True
+    while merged and len(regions) > 1:
+        merged = False
+        for i in range(len(regions)):
+            for j in range(i + 1, len(regions)):
+                a, b = regions[i], regions[j]
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    union = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+                    if max_side and max(union[2] - union[0], union[3] - union[1]) > max_side:
+                        continue
+                    regions[i] = union
+                    del regions[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return regions
+
+
+def _nms(boxes, scores, iou_threshold=NMS_IOU):
+    """Indices of (x, y, w, h) boxes kept by greedy non-maximum suppression"""
+    order = np.argsort(-scores)
+    ious = iou_matrix(boxes, boxes)
+    keep = []
+    suppressed = np.zeros(len(boxes), dtype=bool)
+    for i in order:
+        if suppressed[i]:
+            continue
+        keep.append(i)
+        suppressed |= ious[i] > iou_threshold
+    return np.array(keep, dtype=int)
+
+
+class CoarseToFineDetector:
+    """Two-stage SCRFD detection on the shared buffalo_l model"""
+
+    def __init__(self, coarse_size=None, fine_size=None, crop_expand=None, max_crops=None,
+                 max_region_scale=None, det_thresh=0.5):
+        """
+        Args:
+            coarse_size: Detector input size of the full-frame pass (Config.CTF_COARSE_SIZE)
+            fine_size: Detector input size of each crop pass (Config.CTF_FINE_SIZE)
+            crop_expand: Context added around each proposal, as a multiple of
+                its width/height on every side (Config.CTF_CROP_EXPAND)
+            max_crops: Above this many regions, fall back to one full-frame
+                pass at 640 (Config.CTF_MAX_CROPS)
+            max_region_scale: Merged regions stay within this multiple of
+                fine_size per side, so a crowd splits into several crops
+                (and trips max_crops) instead of one large, downscaled crop
+                (Config.CTF_MAX_REGION_SCALE)
+            det_thresh: Default minimum score of the final detections
+        """
+        coarse = coarse_size or config.CTF_COARSE_SIZE
+        fine = fine_size or config.CTF_FINE_SIZE
+        self.coarse_size = (coarse, coarse)
+        self.fine_size = (fine, fine)
+        self.crop_expand = config.CTF_CROP_EXPAND if crop_expand is None else crop_expand
+        self.max_crops = max_crops or config.CTF_MAX_CROPS
+        scale = config.CTF_MAX_REGION_SCALE if max_region_scale is None else max_region_scale
+        self.max_region_side = int(fine * scale)
+        self.det_thresh = det_thresh
+
+    def regions(self, dets, img_shape):
+        """Expanded, merged crop regions (x1, y1, x2, y2) around coarse proposals"""
+        img_h, img_w = img_shape[:2]
+        regions = []
+        for x1, y1, x2, y2 in dets[:, :4]:
+            pad_w = (x2 - x1) * self.crop_expand
+            pad_h = (y2 - y1) * self.crop_expand
+            regions.append([
+                int(max(0, x1 - pad_w)), int(max(0, y1 - pad_h)),
+                int(min(img_w, x2 + pad_w)), int(min(img_h, y2 + pad_h))
+            ])
+        return _merge_regions(regions, max_side=self.max_region_side)
+
+    def detect(self, img, det_thresh=None):
+        """
+        Detect faces in two passes
+
+        Args:
+            img: BGR image
+            det_thresh: Minimum score of the final detections
+
+        Returns:
+            DetectionResult with bboxes (x, y, w, h), scores and kps from the crop pass
+        """
+        det_thresh = self.det_thresh if det_thresh is None else det_thresh
+        rgb_img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+        # Stage 1: proposals at the base (lowest) threshold so that weak,
+        # small faces still get a crop
+        dets, _ = model_registry.detect(rgb_img, self.coarse_size)
+        if len(dets) == 0:
+            return DetectionResult.empty()
+
+        regions = self.regions(dets, img.shape)
+        if len(regions) > self.max_crops:
+            # Crowded frame: one full-resolution pass is cheaper than many crops
+            dets, kpss = model_registry.detect(rgb_img, (640, 640), det_thresh)
+            return DetectionResult.from_xyxy(dets[:, :4], dets[:, 4], kpss)
+
+        # Stage 2: refine on each crop and map back to frame coordinates
+        all_dets, all_kps = [], []
+        for x1, y1, x2, y2 in regions:
+            crop = np.ascontiguousarray(rgb_img[y1:y2, x1:x2])
+            if crop.shape[0] < 8 or crop.shape[1] < 8:
+                continue
+
+            crop_dets, crop_kps = model_registry.detect(crop, self.fine_size, det_thresh)
+            if len(crop_dets) == 0:
+                continue
+
+            offset = np.array([x1, y1], dtype=np.float32)
+            crop_dets = crop_dets.copy()
+            crop_dets[:, 0:2] += offset
+            crop_dets[:, 2:4] += offset
+            all_dets.append(crop_dets)
+            if crop_kps is not None:
+                all_kps.append(crop_kps + offset)
+
+        if not all_dets:
+            return DetectionResult.empty()
+
+        dets = np.concatenate(all_dets)
+        kpss = np.concatenate(all_kps) if len(all_kps) == len(all_dets) else None
+
+        # Overlapping crops can report the same face twice
+        xywh = np.column_stack([dets[:, :2], dets[:, 2:4] - dets[:, :2]])
+        keep = _nms(xywh, dets[:, 4])
+        dets = dets[keep]
+        kpss = kpss[keep] if kpss is not None else None
+
+        return DetectionResult.from_xyxy(dets[:, :4], dets[:, 4], kpss)
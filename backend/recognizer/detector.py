@@ -1,9 +1,62 @@
 import cv2
 import numpy as np
 import logging
+from typing import NamedTuple, Optional
+
+from config import config
+from recognizer.model_registry import model_registry
 
 logger = logging.getLogger(__name__)
 
+
+def _frozen(values, dtype, shape):
+    """Return a read-only contiguous copy of values with the given trailing shape"""
+    arr = np.array(values, dtype=dtype).reshape(shape)
+    arr.setflags(write=False)
+    return arr
+
+
+class DetectionResult(NamedTuple):
+    """
+    Immutable result of a single detection call
+    
+    bboxes: (N, 4) int array of (x, y, w, h)
+    scores: (N,) float array of detection scores
+    kps: (N, 5, 2) float array of 5-point landmarks, or None if unavailable
+    """
+    bboxes: np.ndarray
+    scores: np.ndarray
+    kps: Optional[np.ndarray] = None
+    
+    @classmethod
+    def build(cls, bboxes, scores, kps=None):
+        """Create a result from (x, y, w, h) boxes"""
+        bboxes = _frozen(bboxes, np.int32, (-1, 4))
+        scores = _frozen(scores, np.float32, (-1,))
+        if kps is not None:
+            kps = _frozen(kps, np.float32, (-1, 5, 2))
+        return cls(bboxes, scores, kps)
+    
+    @classmethod
+    def from_xyxy(cls, boxes, scores, kps=None):
+        """Create a result from (x1, y1, x2, y2) boxes"""
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4).astype(int)
+        xywh = np.column_stack([boxes[:, :2], boxes[:, 2:] - boxes[:, :2]])
+        return cls.build(xywh, scores, kps)
+    
+    @classmethod
+    def empty(cls):
+        return cls.build(np.zeros((0, 4)), np.zeros(0))
+    
+    @property
+    def num_faces(self):
+        return len(self.bboxes)
+    
+    def landmarks(self, index):
+        """5-point landmarks of one face, or None"""
+        return None if self.kps is None else self.kps[index]
+
+
 class FaceDetector:
     def __init__(self, method='insightface'):
         """
@@ -12,22 +65,28 @@ class FaceDetector:
         """
         self.method = method
         self.detector = None
-        self.faces_cache = []  # Cache for faces with landmarks
+        self.last_detection = None  # Only used by the legacy detect_faces()
+        self.coarse_to_fine = None  # Set when DETECTION_MODE=coarse_to_fine
         self._init_detector()
     
     def _init_detector(self):
         """Initialize the selected detector"""
         try:
             if self.method == 'insightface':
-                from insightface.app import FaceAnalysis
                 logger.info("Initializing InsightFace detector...")
-                self.detector = FaceAnalysis(
-                    providers=['CPUExecutionProvider'],
-                    allowed_modules=['detection']  # Only detection, not recognition
-                )
-                self.detector.prepare(ctx_id=-1, det_size=(640, 640))
+                # Shared model; size and threshold are applied per call
+                self.detector = model_registry.get_face_analysis('buffalo_l')
+                self.det_size = (640, 640)
+                self.det_thresh = 0.5
                 print("✅ InsightFace detector initialized (det_size=640x640)")
                 
+                if config.DETECTION_MODE == 'coarse_to_fine':
+                    # Imported here: coarse_to_fine depends on DetectionResult
+                    from recognizer.coarse_to_fine import CoarseToFineDetector
+                    self.coarse_to_fine = CoarseToFineDetector(det_thresh=self.det_thresh)
+                    print(f"✅ Coarse-to-fine detection enabled "
+                          f"(coarse={config.CTF_COARSE_SIZE}, fine={config.CTF_FINE_SIZE})")
+                
             elif self.method == 'opencv':
                 # Use OpenCV Haar Cascade (fallback)
                 cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
@@ -47,34 +106,37 @@ class FaceDetector:
             self.detector = cv2.CascadeClassifier(cascade_path)
             self.method = 'opencv'
     
-    def detect_faces(self, img):
+    def detect(self, img, det_thresh=None):
         """
-        Detect faces in image
-        Returns: list of face bounding boxes [(x, y, w, h), ...]
+        Detect faces without touching any instance state
+        
+        Safe to call from several threads on one instance; per-call settings
+        are passed as arguments instead of being stored on the detector.
+        
+        Args:
+            img: BGR image
+            det_thresh: Optional minimum detection score for this call
+        
+        Returns:
+            DetectionResult with bboxes (x, y, w, h), scores and kps
         """
         if self.detector is None:
-            return []
+            return DetectionResult.empty()
         
         try:
             if self.method == 'insightface':
+                if self.coarse_to_fine is not None:
+                    return self.coarse_to_fine.detect(img, det_thresh)
+                
                 # InsightFace expects RGB
                 rgb_img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
                 
-                # Detect faces and cache full data
-                self.faces_cache = self.detector.get(rgb_img)
-                
-                if len(self.faces_cache) == 0:
-                    return []
-                
-                # Convert bboxes to OpenCV format (x, y, w, h)
-                faces = []
-                for face in self.faces_cache:
-                    bbox = face.bbox.astype(int)
-                    x1, y1, x2, y2 = bbox
-                    x, y, w, h = x1, y1, x2 - x1, y2 - y1
-                    faces.append((x, y, w, h))
+                # Raw detector output: (N, 5) [x1, y1, x2, y2, score] and (N, 5, 2) kps
+                dets, kpss = model_registry.detect(
+                    rgb_img, self.det_size, self.det_thresh if det_thresh is None else det_thresh
+                )
                 
-                return np.array(faces) if faces else []
+                return DetectionResult.from_xyxy(dets[:, :4], dets[:, 4], kpss)
             
             elif self.method == 'opencv':
                 gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
@@ -88,45 +150,60 @@ class FaceDetector:
                     minSize=(20, 20),  # Smaller minimum (was 30x30)
                     flags=cv2.CASCADE_SCALE_IMAGE
                 )
-                self.faces_cache = []  # No landmarks for OpenCV
-                return faces
+                # No scores or landmarks for OpenCV
+                return DetectionResult.build(faces, np.ones(len(faces)))
                 
             elif self.method == 'mtcnn':
                 rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
                 detections = self.detector.detect_faces(rgb)
-                faces = []
-                for det in detections:
-                    x, y, w, h = det['box']
-                    faces.append((x, y, w, h))
-                self.faces_cache = []  # No landmarks cached for MTCNN
-                return np.array(faces)
+                if det_thresh is not None:
+                    detections = [d for d in detections if d['confidence'] >= det_thresh]
+                faces = [det['box'] for det in detections]
+                scores = [det['confidence'] for det in detections]
+                return DetectionResult.build(faces, scores)  # No landmarks kept for MTCNN
                 
         except Exception as e:
             logger.error(f"Error detecting faces: {e}")
             print(f"Error detecting faces: {e}")
+        
+        return DetectionResult.empty()
+    
+    def detect_faces(self, img):
+        """
+        Detect faces in image (legacy single-threaded API)
+        
+        Remembers the result so extract_face(..., face_index=i) can align
+        with its landmarks. Server code should use detect() instead.
+        
+        Returns: list of face bounding boxes [(x, y, w, h), ...]
+        """
+        self.last_detection = self.detect(img)
+        
+        if self.last_detection.num_faces == 0:
             return []
+        
+        return np.array(self.last_detection.bboxes)
     
-    def extract_face(self, img, bbox, face_index=0, margin=20):
+    def extract_face(self, img, bbox, face_index=0, margin=20, kps=None):
         """
         Extract and align face from image
         bbox: (x, y, w, h)
-        face_index: Index of face in faces_cache (for InsightFace alignment)
+        face_index: Index of face in the last detect_faces() result (legacy)
+        kps: 5-point landmarks for this face (preferred, e.g. from detect())
         Returns: face image (aligned and cropped to 160x160)
         """
         try:
-            # If using InsightFace and we have cached face data with landmarks
-            if self.method == 'insightface' and len(self.faces_cache) > face_index:
-                face_data = self.faces_cache[face_index]
+            # Fall back to landmarks remembered by the legacy detect_faces()
+            if kps is None and self.last_detection is not None \
+                    and face_index < self.last_detection.num_faces:
+                kps = self.last_detection.landmarks(face_index)
+            
+            if kps is not None:
+                # Align face using landmarks
+                aligned_face = self._align_face_with_landmarks(img, np.asarray(kps, dtype=np.float32))
                 
-                # Check if landmarks are available
-                if hasattr(face_data, 'kps') and face_data.kps is not None:
-                    landmarks = face_data.kps.astype(np.float32)
-                    
-                    # Align face using landmarks
-                    aligned_face = self._align_face_with_landmarks(img, landmarks)
-                    
-                    if aligned_face is not None and aligned_face.size > 0:
-                        return aligned_face
+                if aligned_face is not None and aligned_face.size > 0:
+                    return aligned_face
             
             # Fallback: Use bbox-based extraction (works for all methods)
             return self._extract_face_bbox(img, bbox, margin)
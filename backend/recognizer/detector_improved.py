@@ -12,6 +12,10 @@ import logging
 from collections import deque
 from typing import List, Tuple, Optional
 
+from recognizer.detector import DetectionResult
+from recognizer.model_registry import model_registry, BASE_DET_THRESH
+from recognizer.tracker import iou_matrix
+
 logger = logging.getLogger(__name__)
 
 class ImprovedFaceDetector:
@@ -39,30 +43,22 @@ class ImprovedFaceDetector:
         """Initialize the detector with optimal settings"""
         try:
             if self.method == 'insightface':
-                from insightface.app import FaceAnalysis
                 logger.info("🔧 Initializing Improved InsightFace detector...")
                 
-                self.detector = FaceAnalysis(
-                    name='buffalo_l',  # Use buffalo_l model for better accuracy
-                    providers=['CPUExecutionProvider'],
-                    allowed_modules=['detection']
-                )
+                # Shares the buffalo_l detection model with the recognition
+                # detector; only the input size differs
+                self.detector = model_registry.get_face_analysis('buffalo_l')
                 
-                # Prepare with ULTRA-FAST detection size for maximum speed
-                # Optimized for lightning-fast face detection
-                self.detector.prepare(
-                    ctx_id=-1, 
-                    det_size=(160, 160),  # Ultra-small for maximum speed
-                    det_thresh=0.4  # Higher threshold for faster processing
-                )
+                # ULTRA-FAST detection size for maximum speed
+                self.det_size = (160, 160)
                 
                 # Update minimum confidence for filtering
-                self.min_detection_confidence = 0.3  # Higher for faster processing
+                self.min_detection_confidence = 0.5  # Default for detect_faces()
                 
                 print("✅ LIGHTNING-FAST InsightFace detector initialized")
                 print("   Model: buffalo_l")
                 print("   Detection size: 160x160 (ULTRA-FAST)")
-                print("   Threshold: 0.4 (MAXIMUM SPEED)")
+                print(f"   Base threshold: {BASE_DET_THRESH} (filtered per request)")
                 print("   Status: Ready for LIGHTNING-FAST face detection")
                 
             elif self.method == 'opencv':
@@ -89,24 +85,7 @@ class ImprovedFaceDetector:
     
     def _calculate_iou(self, box1, box2):
         """Calculate Intersection over Union for two bounding boxes"""
-        x1, y1, w1, h1 = box1
-        x2, y2, w2, h2 = box2
-        
-        # Calculate intersection
-        x_left = max(x1, x2)
-        y_top = max(y1, y2)
-        x_right = min(x1 + w1, x2 + w2)
-        y_bottom = min(y1 + h1, y2 + h2)
-        
-        if x_right < x_left or y_bottom < y_top:
-            return 0.0
-        
-        intersection = (x_right - x_left) * (y_bottom - y_top)
-        area1 = w1 * h1
-        area2 = w2 * h2
-        union = area1 + area2 - intersection
-        
-        return intersection / union if union > 0 else 0.0
+        return float(iou_matrix([box1], [box2])[0, 0])
     
     def _smooth_bbox(self, current_bbox, history_weight=0.7):
         """Smooth bounding box using temporal history"""
@@ -126,122 +105,81 @@ class ImprovedFaceDetector:
         
         return (x, y, w, h)
     
+    def _expand_bboxes(self, bboxes, img_shape, expand_ratio=0.15):
+        """Expand (N, 4) bounding boxes slightly for better face capture"""
+        boxes = np.asarray(bboxes, dtype=int).reshape(-1, 4)
+        img_h, img_w = img_shape[:2]
+        
+        # Expand by ratio
+        expand_w = (boxes[:, 2] * expand_ratio).astype(int)
+        expand_h = (boxes[:, 3] * expand_ratio).astype(int)
+        
+        x = np.maximum(0, boxes[:, 0] - expand_w)
+        y = np.maximum(0, boxes[:, 1] - expand_h)
+        w = np.minimum(img_w - x, boxes[:, 2] + 2 * expand_w)
+        h = np.minimum(img_h - y, boxes[:, 3] + 2 * expand_h)
+        
+        return np.column_stack([x, y, w, h])
+    
     def _expand_bbox(self, bbox, img_shape, expand_ratio=0.15):
         """Expand bounding box slightly for better face capture"""
-        x, y, w, h = bbox
+        return tuple(int(v) for v in self._expand_bboxes([bbox], img_shape, expand_ratio)[0])
+    
+    def _false_positive_mask(self, bboxes, img_shape):
+        """Boolean mask of (N, 4) boxes that pass the false-positive checks"""
+        boxes = np.asarray(bboxes, dtype=np.float32).reshape(-1, 4)
+        w, h = boxes[:, 2], boxes[:, 3]
         img_h, img_w = img_shape[:2]
         
-        # Expand by ratio
-        expand_w = int(w * expand_ratio)
-        expand_h = int(h * expand_ratio)
+        # Check 1: Reasonable aspect ratio (very lenient for side faces, 0.3 to 3.0)
+        aspect_ratio = np.where(h > 0, w / np.maximum(h, 1e-9), 0)
+        keep = (aspect_ratio >= 0.3) & (aspect_ratio <= 3.0)
         
-        x = max(0, x - expand_w)
-        y = max(0, y - expand_h)
-        w = min(img_w - x, w + 2 * expand_w)
-        h = min(img_h - y, h + 2 * expand_h)
+        # Check 2: Minimum size (too small = likely false positive)
+        keep &= (w >= 20) & (h >= 20)  # Very small minimum for distant side faces
         
-        return (x, y, w, h)
+        # Check 3: Not too large (entire image = likely error)
+        keep &= (w <= img_w * 0.9) & (h <= img_h * 0.9)
+        
+        return keep
     
     def _filter_false_positives(self, faces, img):
         """Filter out false positives using additional checks"""
         if len(faces) == 0:
             return faces
         
-        filtered_faces = []
-        
-        for face in faces:
-            x, y, w, h = face
-            
-            # Check 1: Reasonable aspect ratio (very lenient for side faces)
-            aspect_ratio = w / h if h > 0 else 0
-            # Side faces can be much narrower, so allow 0.3 to 3.0
-            if aspect_ratio < 0.3 or aspect_ratio > 3.0:
-                continue
-            
-            # Check 2: Minimum size (too small = likely false positive)
-            if w < 20 or h < 20:  # Very small minimum for distant side faces
-                continue
-            
-            # Check 3: Not too large (entire image = likely error)
-            img_h, img_w = img.shape[:2]
-            if w > img_w * 0.9 or h > img_h * 0.9:
-                continue
-            
-            filtered_faces.append(face)
-        
-        return filtered_faces
+        keep = self._false_positive_mask(faces, img.shape)
+        return [face for face, ok in zip(faces, keep) if ok]
     
-    def detect_faces(self, img, return_confidence=False):
+    def detect(self, img, min_confidence=0.5):
         """
-        Detect faces with improved accuracy and tracking
+        Detect faces without touching any instance state
+        
+        Safe to call from several threads on one instance. Unlike
+        detect_faces() no temporal smoothing is applied, since that needs
+        per-stream history.
         
         Args:
             img: Input image (BGR format)
-            return_confidence: If True, return confidence scores
+            min_confidence: Minimum detection score for this call
             
         Returns:
-            List of face bounding boxes [(x, y, w, h), ...]
-            If return_confidence=True: List of (bbox, confidence) tuples
+            DetectionResult with expanded, filtered (x, y, w, h) boxes
         """
         if self.detector is None:
-            return []
-        
-        self.frame_count += 1
+            return DetectionResult.empty()
         
         try:
             if self.method == 'insightface':
                 # Convert to RGB for InsightFace
                 rgb_img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
                 
-                # Detect faces
-                self.faces_cache = self.detector.get(rgb_img)
-                
-                if len(self.faces_cache) == 0:
-                    return []
+                # Raw detector output: (N, 5) [x1, y1, x2, y2, score] and (N, 5, 2) kps
+                dets, kpss = model_registry.detect(rgb_img, self.det_size, min_confidence)
                 
-                # Convert to OpenCV format with confidence
-                faces = []
-                confidences = []
+                detection = DetectionResult.from_xyxy(dets[:, :4], dets[:, 4], kpss)
+                bboxes = self._expand_bboxes(detection.bboxes, img.shape)
                 
-                for face in self.faces_cache:
-                    # Get bounding box
-                    bbox = face.bbox.astype(int)
-                    x1, y1, x2, y2 = bbox
-                    x, y, w, h = x1, y1, x2 - x1, y2 - y1
-                    
-                    # Get confidence score
-                    confidence = float(face.det_score)
-                    
-                    # Filter by confidence (ULTRA-HIGH threshold for maximum speed)
-                    if confidence < 0.5:  # Ultra-high threshold for lightning-fast performance
-                        continue
-                    
-                    # Expand bbox slightly
-                    bbox_expanded = self._expand_bbox((x, y, w, h), img.shape)
-                    
-                    faces.append(bbox_expanded)
-                    confidences.append(confidence)
-                
-                # Filter false positives
-                faces = self._filter_false_positives(faces, img)
-                
-                # Apply temporal smoothing for the primary face
-                if len(faces) > 0:
-                    # Use the face with highest confidence
-                    if len(confidences) > 0:
-                        best_idx = np.argmax(confidences)
-                        best_face = faces[best_idx]
-                        
-                        # Smooth with history
-                        smoothed_face = self._smooth_bbox(best_face)
-                        self.face_history.append(smoothed_face)
-                        faces[best_idx] = smoothed_face
-                
-                if return_confidence:
-                    return list(zip(faces, confidences))
-                
-                return np.array(faces) if faces else []
-            
             elif self.method == 'opencv':
                 # Preprocess image
                 gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
@@ -264,33 +202,66 @@ class ImprovedFaceDetector:
                     flags=cv2.CASCADE_SCALE_IMAGE
                 )
                 
-                # Filter false positives
-                faces = self._filter_false_positives(faces, img)
-                
-                # Apply temporal smoothing
-                if len(faces) > 0:
-                    smoothed_face = self._smooth_bbox(faces[0])
-                    self.face_history.append(smoothed_face)
-                    faces[0] = smoothed_face
-                
-                self.faces_cache = []
-                
-                if return_confidence:
-                    # OpenCV doesn't provide confidence, use 1.0
-                    return [(face, 1.0) for face in faces]
-                
-                return faces
+                # OpenCV doesn't provide confidence, use 1.0
+                detection = DetectionResult.build(faces, np.ones(len(faces)))
+                bboxes = detection.bboxes
                 
+            else:
+                return DetectionResult.empty()
+            
+            # Filter false positives, keeping scores and landmarks aligned
+            keep = self._false_positive_mask(bboxes, img.shape)
+            
+            return DetectionResult.build(
+                bboxes[keep],
+                detection.scores[keep],
+                detection.kps[keep] if detection.kps is not None else None
+            )
+            
         except Exception as e:
             logger.error(f"Error detecting faces: {e}")
-            return []
+            return DetectionResult.empty()
+    
+    def detect_faces(self, img, return_confidence=False):
+        """
+        Detect faces with improved accuracy and tracking
+        
+        Stateful: smooths the primary face against previous frames, so only
+        use it for a single video stream. Shared server code should use
+        detect() instead.
+        
+        Args:
+            img: Input image (BGR format)
+            return_confidence: If True, return confidence scores
+            
+        Returns:
+            List of face bounding boxes [(x, y, w, h), ...]
+            If return_confidence=True: List of (bbox, confidence) tuples
+        """
+        self.frame_count += 1
+        
+        detection = self.detect(img, min_confidence=self.min_detection_confidence)
+        self.faces_cache = detection
+        
+        faces = [tuple(int(v) for v in bbox) for bbox in detection.bboxes]
+        confidences = [float(score) for score in detection.scores]
+        
+        # Apply temporal smoothing for the primary face (highest confidence)
+        if len(faces) > 0:
+            best_idx = int(np.argmax(confidences))
+            smoothed_face = self._smooth_bbox(faces[best_idx])
+            self.face_history.append(smoothed_face)
+            faces[best_idx] = smoothed_face
+        
+        if return_confidence:
+            return list(zip(faces, confidences))
+        
+        return np.array(faces) if faces else []
     
     def get_face_landmarks(self, face_idx=0):
         """Get facial landmarks for detected face"""
-        if self.method == 'insightface' and len(self.faces_cache) > face_idx:
-            face = self.faces_cache[face_idx]
-            if hasattr(face, 'kps'):
-                return face.kps
+        if isinstance(self.faces_cache, DetectionResult) and self.faces_cache.num_faces > face_idx:
+            return self.faces_cache.landmarks(face_idx)
         return None
     
     def reset_tracking(self):
@@ -5,9 +5,10 @@ Replaces OpenCV Haar Cascade for better detection accuracy
 
 import cv2
 import numpy as np
-from insightface.app import FaceAnalysis
 import logging
 
+from recognizer.model_registry import model_registry
+
 logger = logging.getLogger(__name__)
 
 
@@ -29,21 +30,13 @@ class InsightFaceDetector:
         self._init_detector()
     
     def _init_detector(self):
-        """Initialize InsightFace FaceAnalysis"""
+        """Attach to the shared InsightFace detection model"""
         try:
             logger.info("Initializing InsightFace detector...")
             
-            # Initialize FaceAnalysis with CPU provider
-            self.detector = FaceAnalysis(
-                providers=['CPUExecutionProvider'],
-                allowed_modules=['detection']  # Only use detection, not recognition
-            )
-            
-            # Prepare detector with specified size
-            self.detector.prepare(
-                ctx_id=-1,  # CPU
-                det_size=self.det_size
-            )
+            # Shared FaceAnalysis from the model registry; det_size is
+            # applied per call in _get_faces
+            self.detector = model_registry.get_face_analysis('buffalo_l')
             
             logger.info(f"✅ InsightFace detector initialized (det_size={self.det_size})")
             
@@ -51,6 +44,10 @@ class InsightFaceDetector:
             logger.error(f"❌ Failed to initialize InsightFace detector: {e}")
             raise
     
+    def _get_faces(self, rgb_img):
+        """FaceAnalysis.get() at this detector's det_size (InsightFace default 0.5 threshold)"""
+        return model_registry.get_faces(rgb_img, self.det_size, det_thresh=0.5)
+    
     def detect_faces(self, img):
         """
         Detect faces in image using InsightFace
@@ -70,7 +67,7 @@ class InsightFaceDetector:
             rgb_img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
             
             # Detect faces
-            faces = self.detector.get(rgb_img)
+            faces = self._get_faces(rgb_img)
             
             if len(faces) == 0:
                 return []
@@ -108,7 +105,7 @@ class InsightFaceDetector:
             rgb_img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
             
             # Detect faces with full data
-            faces = self.detector.get(rgb_img)
+            faces = self._get_faces(rgb_img)
             
             return faces
             
@@ -0,0 +1,12 @@
+"""
+Embedding backend selection
+Picks the FaceNet embedder configured by Config.EMBEDDING_BACKEND so that
+the ONNX backend never has to import torch
+"""
+
+from config import config
+
+if config.EMBEDDING_BACKEND == 'onnx':
+    from recognizer.embeddings_onnx import embedding_generator
+else:
+    from recognizer.embeddings_facenet import embedding_generator
@@ -5,9 +5,10 @@ Uses facenet-pytorch for production-quality embeddings
 
 import torch
 import numpy as np
-from PIL import Image
 import logging
 
+from utils.image_tools import stack_face_batch
+
 logger = logging.getLogger(__name__)
 
 class FaceNetEmbeddingGenerator:
@@ -16,7 +17,6 @@ class FaceNetEmbeddingGenerator:
     def __init__(self):
         self.device = None
         self.facenet = None
-        self.transform = None
         self._initialized = False
         self._init_error = None
         
@@ -34,7 +34,6 @@ class FaceNetEmbeddingGenerator:
             
             # Import here to avoid loading on module import
             from facenet_pytorch import InceptionResnetV1
-            from torchvision import transforms
             
             # Setup device
             self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
@@ -44,13 +43,6 @@ class FaceNetEmbeddingGenerator:
             self.facenet = InceptionResnetV1(pretrained='vggface2').eval().to(self.device)
             logger.info("✅ FaceNet model loaded (vggface2)")
             
-            # Setup transform
-            self.transform = transforms.Compose([
-                transforms.Resize((160, 160)),
-                transforms.ToTensor(),
-                transforms.Normalize(mean=[0.5, 0.5, 0.5], std=[0.5, 0.5, 0.5])
-            ])
-            
             self._initialized = True
             logger.info("✅ FaceNet embedding generator initialized")
             return True
@@ -78,46 +70,60 @@ class FaceNetEmbeddingGenerator:
         Returns:
             numpy array of shape (512,) or None if failed
         """
-        # Lazy initialization
+        return self.generate_embeddings([face_img], batch_size=1)[0]
+
+    def generate_embeddings(self, faces, batch_size=32, bgr=True):
+        """
+        Generate embeddings for many faces with batched forward passes
+
+        Preprocessing is vectorized: the uint8 batch is moved to a tensor,
+        permuted to NCHW and scaled to [-1, 1] in one step (identical to
+        ToTensor + Normalize(0.5, 0.5)), with no per-image PIL conversion.
+
+        Args:
+            faces: list of face images or an (N, 160, 160, 3) uint8 array
+            batch_size: Maximum number of faces per forward pass
+            bgr: Whether numpy inputs are BGR (OpenCV) rather than RGB
+
+        Returns:
+            numpy float32 array of shape (N, 512), L2-normalized row by row
+        """
         if not self._lazy_init():
-            logger.error("FaceNet not initialized, cannot generate embedding")
+            logger.error("FaceNet not initialized, cannot generate embeddings")
             raise RuntimeError(f"FaceNet initialization failed: {self._init_error}")
-        
+
+        if len(faces) == 0:
+            return np.zeros((0, 512), dtype=np.float32)
+
         try:
-            # Convert numpy array to PIL Image if needed
-            if isinstance(face_img, np.ndarray):
-                # OpenCV uses BGR, PIL uses RGB
-                if len(face_img.shape) == 3 and face_img.shape[2] == 3:
-                    import cv2
-                    face_img = cv2.cvtColor(face_img, cv2.COLOR_BGR2RGB)
-                face_img = Image.fromarray(face_img)
-            
-            # Transform image (already resized by detector)
-            face_tensor = self.transform(face_img).unsqueeze(0).to(self.device)
+            batch = stack_face_batch(faces, bgr=bgr)
+            embeddings = np.empty((batch.shape[0], 512), dtype=np.float32)
 
-            # Generate embedding
             with torch.no_grad():
-                embedding = self.facenet(face_tensor).cpu().numpy().flatten()
+                for start in range(0, batch.shape[0], batch_size):
+                    chunk = torch.from_numpy(batch[start:start + batch_size]).to(self.device)
+                    chunk = chunk.permute(0, 3, 1, 2).float().sub_(127.5).div_(127.5)
+                    output = self.facenet(chunk).cpu().numpy()
+
+                    if output.shape[1] != 512:
+                        logger.error(f"Invalid embedding dimension: {output.shape[1]}, expected 512")
+                        raise ValueError(f"Invalid embedding dimension: {output.shape[1]}")
 
-            # L2-normalize the embedding to unit length. This is standard for
+                    embeddings[start:start + batch_size] = output
+
+            # L2-normalize every embedding to unit length. This is standard for
             # FaceNet embeddings and improves cosine-similarity based comparisons
             # and makes downstream classifiers more stable if trained with
             # normalized vectors.
-            norm = np.linalg.norm(embedding)
-            if norm > 0:
-                embedding = embedding / norm
-            
-            # Verify dimension
-            if embedding.shape[0] != 512:
-                logger.error(f"Invalid embedding dimension: {embedding.shape[0]}, expected 512")
-                raise ValueError(f"Invalid embedding dimension: {embedding.shape[0]}")
-            
-            return embedding
-            
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            np.divide(embeddings, norms, out=embeddings, where=norms > 0)
+
+            return embeddings
+
         except Exception as e:
-            logger.error(f"Error generating embedding: {e}")
+            logger.error(f"Error generating embeddings: {e}")
             raise
-    
+
     def is_available(self):
         """Check if FaceNet is available"""
         return self._lazy_init()
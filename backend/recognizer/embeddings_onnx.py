@@ -0,0 +1,150 @@
+"""
+FaceNet Embedding Generator on ONNX Runtime
+Serves the same interface as FaceNetEmbeddingGenerator without importing torch
+"""
+
+import os
+import numpy as np
+import logging
+
+from config import config
+from utils.image_tools import stack_face_batch
+
+logger = logging.getLogger(__name__)
+
+class OnnxEmbeddingGenerator:
+    """Generate 512-dimensional embeddings with an exported InceptionResnetV1"""
+
+    def __init__(self, model_path=None, intra_op_threads=None):
+        """
+        Args:
+            model_path: Path to the exported ONNX model (see export_facenet_onnx.py)
+            intra_op_threads: ONNX Runtime intra-op thread count (0 = runtime default)
+        """
+        self.model_path = model_path or config.ONNX_EMBEDDER_PATH
+        self.intra_op_threads = config.ONNX_INTRA_OP_THREADS if intra_op_threads is None else intra_op_threads
+        self.session = None
+        self.input_name = None
+        self._initialized = False
+        self._init_error = None
+
+    def _lazy_init(self):
+        """Lazy initialization - only create the ONNX session when first needed"""
+        if self._initialized:
+            return True
+
+        if self._init_error:
+            logger.error(f"Previous initialization failed: {self._init_error}")
+            return False
+
+        try:
+            logger.info("Initializing ONNX FaceNet embedding generator...")
+
+            import onnxruntime as ort
+
+            if not os.path.exists(self.model_path):
+                self._init_error = f"ONNX model not found: {self.model_path}"
+                logger.error(f"❌ {self._init_error}")
+                logger.error("Export it once with: python export_facenet_onnx.py")
+                return False
+
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+            options.intra_op_num_threads = self.intra_op_threads
+            options.inter_op_num_threads = 1
+
+            self.session = ort.InferenceSession(
+                self.model_path,
+                sess_options=options,
+                providers=['CPUExecutionProvider']
+            )
+            self.input_name = self.session.get_inputs()[0].name
+
+            self._initialized = True
+            logger.info(f"✅ ONNX FaceNet embedding generator initialized ({self.model_path}, "
+                        f"intra_op_threads={self.intra_op_threads or 'auto'})")
+            return True
+
+        except ImportError as e:
+            self._init_error = f"Missing dependencies: {e}"
+            logger.error(f"❌ {self._init_error}")
+            logger.error("Install with: pip install onnxruntime")
+            return False
+
+        except Exception as e:
+            self._init_error = f"Initialization failed: {e}"
+            logger.error(f"❌ {self._init_error}")
+            import traceback
+            traceback.print_exc()
+            return False
+
+    def generate_embedding(self, face_img):
+        """
+        Generate 512-dimensional embedding from face image
+
+        Args:
+            face_img: numpy array (BGR) or PIL Image
+
+        Returns:
+            numpy array of shape (512,)
+        """
+        return self.generate_embeddings([face_img], batch_size=1)[0]
+
+    def generate_embeddings(self, faces, batch_size=32, bgr=True):
+        """
+        Generate embeddings for many faces with batched ONNX Runtime calls
+
+        Args:
+            faces: list of face images or an (N, 160, 160, 3) uint8 array
+            batch_size: Maximum number of faces per session run
+            bgr: Whether numpy inputs are BGR (OpenCV) rather than RGB
+
+        Returns:
+            numpy float32 array of shape (N, 512), L2-normalized row by row
+        """
+        if not self._lazy_init():
+            logger.error("ONNX FaceNet not initialized, cannot generate embeddings")
+            raise RuntimeError(f"ONNX FaceNet initialization failed: {self._init_error}")
+
+        if len(faces) == 0:
+            return np.zeros((0, 512), dtype=np.float32)
+
+        try:
+            batch = stack_face_batch(faces, bgr=bgr)
+            embeddings = np.empty((batch.shape[0], 512), dtype=np.float32)
+
+            for start in range(0, batch.shape[0], batch_size):
+                # Same scaling as ToTensor + Normalize(0.5, 0.5), in NCHW order
+                chunk = batch[start:start + batch_size].transpose(0, 3, 1, 2).astype(np.float32)
+                chunk -= 127.5
+                chunk /= 127.5
+                output = self.session.run(None, {self.input_name: chunk})[0]
+
+                if output.shape[1] != 512:
+                    logger.error(f"Invalid embedding dimension: {output.shape[1]}, expected 512")
+                    raise ValueError(f"Invalid embedding dimension: {output.shape[1]}")
+
+                embeddings[start:start + batch_size] = output
+
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            np.divide(embeddings, norms, out=embeddings, where=norms > 0)
+
+            return embeddings
+
+        except Exception as e:
+            logger.error(f"Error generating ONNX embeddings: {e}")
+            raise
+
+    def is_available(self):
+        """Check if the ONNX model can be used"""
+        return self._lazy_init()
+
+
+# Global instance
+try:
+    embedding_generator = OnnxEmbeddingGenerator()
+    logger.info("ONNX FaceNet embedding generator created")
+except Exception as e:
+    logger.error(f"Failed to create ONNX FaceNet embedding generator: {e}")
+    embedding_generator = None
@@ -0,0 +1,170 @@
+"""
+Cosine-similarity gallery matcher
+Alternative classification head to the SVC: matches a normalized FaceNet
+embedding against per-student templates with one matrix-vector product
+"""
+
+import os
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+class GalleryMatcher:
+    """
+    Open-set face matcher over enrollment embeddings
+
+    Templates are stored as rows of one contiguous float32 matrix, sorted by
+    class so that per-student scores can be reduced with np.maximum.reduceat.
+    In 'centroid' mode each student has exactly one (normalized mean) row.
+    """
+
+    def __init__(self, templates, template_classes, classes, threshold=0.65, mode='centroid'):
+        """
+        Args:
+            templates: (M, 512) array of L2-normalized template embeddings
+            template_classes: (M,) class index of each template row
+            classes: array of student IDs indexed by class index
+            threshold: Minimum cosine similarity to accept a match
+            mode: 'centroid' or 'templates' (how the gallery was built)
+        """
+        self.classes = np.asarray(classes)
+        self.threshold = float(threshold)
+        self.mode = mode
+        self._set_templates(templates, template_classes)
+
+    def _set_templates(self, templates, template_classes):
+        """Store templates sorted by class in one contiguous matrix"""
+        order = np.argsort(template_classes, kind='stable')
+        self.matrix = np.ascontiguousarray(np.asarray(templates)[order], dtype=np.float32)
+        self.template_classes = np.asarray(template_classes)[order]
+
+        # First row of every class block, for per-class max reduction
+        self.class_ids, self.class_starts = np.unique(self.template_classes, return_index=True)
+
+    @staticmethod
+    def _normalize(embeddings):
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=-1, keepdims=True)
+        return embeddings / np.maximum(norms, 1e-12)
+
+    @classmethod
+    def from_embeddings(cls, X, y, classes, threshold=0.65, mode='centroid'):
+        """
+        Build a gallery from enrollment embeddings
+
+        Args:
+            X: (N, 512) enrollment embeddings
+            y: (N,) encoded class index of each embedding
+            classes: array of student IDs indexed by class index
+        """
+        X = cls._normalize(X)
+        y = np.asarray(y).astype(int)
+
+        if mode == 'centroid':
+            class_ids = np.unique(y)
+            sums = np.zeros((len(classes), X.shape[1]), dtype=np.float32)
+            np.add.at(sums, y, X)
+            templates = cls._normalize(sums[class_ids])
+            return cls(templates, class_ids, classes, threshold=threshold, mode=mode)
+
+        if mode == 'templates':
+            return cls(X, y, classes, threshold=threshold, mode=mode)
+
+        raise ValueError(f"Unknown gallery mode: {mode}")
+
+    @classmethod
+    def from_model_dir(cls, model_path, classes=None, threshold=0.65, mode='centroid'):
+        """Build a gallery from the X.npy / y.npy written by the trainers"""
+        X = np.load(os.path.join(model_path, 'X.npy'))
+        y = np.load(os.path.join(model_path, 'y.npy'))
+
+        if classes is None:
+            classes = np.load(os.path.join(model_path, 'label_encoder_classes.npy'), allow_pickle=True)
+
+        return cls.from_embeddings(X, y, classes, threshold=threshold, mode=mode)
+
+    def __len__(self):
+        return len(self.class_ids)
+
+    def restrict(self, student_ids):
+        """
+        Build a sub-gallery containing only the given students
+
+        Returns:
+            GalleryMatcher over the matching template rows, or None if none
+            of the students are enrolled
+        """
+        # Labels may be stored as ints or strings; compare both as str
+        wanted = [str(student_id) for student_id in student_ids]
+        class_idx = np.where(np.isin(self.classes.astype(str), wanted))[0]
+        keep = np.isin(self.template_classes, class_idx)
+
+        if not keep.any():
+            return None
+
+        return GalleryMatcher(
+            self.matrix[keep], self.template_classes[keep], self.classes,
+            threshold=self.threshold, mode=self.mode
+        )
+
+    def class_scores(self, embeddings):
+        """
+        Cosine similarity of each query to each enrolled student
+
+        Returns:
+            (Q, C) similarity matrix; column j belongs to self.class_ids[j]
+        """
+        sims = self._normalize(np.atleast_2d(embeddings)) @ self.matrix.T
+
+        if self.mode == 'centroid':
+            return sims
+
+        return np.maximum.reduceat(sims, self.class_starts, axis=1)
+
+    def match(self, embedding, top_k=3):
+        """Match a single embedding; see match_batch"""
+        return self.match_batch(np.asarray(embedding).reshape(1, -1), top_k=top_k)[0]
+
+    def match_batch(self, embeddings, top_k=3):
+        """
+        Match query embeddings against the gallery
+
+        Returns:
+            list of dicts in the same format as the SVC head, plus 'top_k'
+        """
+        scores = self.class_scores(embeddings)
+        k = min(top_k, scores.shape[1])
+
+        # Top-k per row without a full sort
+        top_idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top_idx, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top_idx = np.take_along_axis(top_idx, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        results = []
+        for row_idx, row_scores in zip(top_idx, top_scores):
+            candidates = [
+                {'student_id': str(self.classes[self.class_ids[idx]]), 'similarity': float(score)}
+                for idx, score in zip(row_idx, row_scores)
+            ]
+            best = candidates[0]
+
+            if best['similarity'] < self.threshold:
+                results.append({
+                    'status': 'unknown',
+                    'message': 'Face not recognized (low similarity)',
+                    'confidence': best['similarity'],
+                    'top_prediction': best['student_id'],
+                    'top_k': candidates
+                })
+            else:
+                results.append({
+                    'status': 'recognized',
+                    'student_id': best['student_id'],
+                    'confidence': best['similarity'],
+                    'top_k': candidates
+                })
+
+        return results
@@ -0,0 +1,295 @@
+"""
+Dynamic micro-batching inference scheduler
+Recognition requests enqueue decoded frames; a worker thread collects up
+to max_batch_size frames (or waits max_wait_ms), runs detection on each and
+embeds every face of the batch in a single FaceNet call, then resolves each
+caller's future
+
+Detection runs per frame on the worker, so a single worker serializes it.
+More workers (Config.INFERENCE_WORKERS) detect in parallel, since ONNX
+Runtime releases the GIL, at the cost of smaller FaceNet batches: each
+worker drains the shared queue on its own.
+"""
+
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+import numpy as np
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceTimeout(Exception):
+    """Raised when a frame waited in the queue (or for its result) past its deadline"""
+    pass
+
+
+class _Job:
+    """One queued frame"""
+    __slots__ = ('img', 'detect_fn', 'select_fn', 'gate_fn', 'max_faces', 'embed', 'enqueued_at', 'deadline', 'future')
+
+    def __init__(self, img, detect_fn, select_fn, max_faces, embed, deadline_ms, gate_fn=None):
+        self.img = img
+        self.detect_fn = detect_fn
+        self.select_fn = select_fn
+        self.gate_fn = gate_fn
+        self.max_faces = max_faces
+        self.embed = embed
+        self.enqueued_at = time.monotonic()
+        self.deadline = self.enqueued_at + deadline_ms / 1000.0
+        self.future = Future()
+
+
+class InferenceScheduler:
+    """In-process batching front-end for face detection and FaceNet"""
+
+    def __init__(self, detector, embedder, max_batch_size=None, max_wait_ms=None, deadline_ms=None, workers=None):
+        """
+        Args:
+            detector: Detector with a stateless detect(img) method
+            embedder: Embedding generator with generate_embeddings(faces)
+            max_batch_size: Maximum frames per batch (Config.INFERENCE_MAX_BATCH_SIZE)
+            max_wait_ms: How long to wait for a batch to fill (Config.INFERENCE_MAX_WAIT_MS)
+            deadline_ms: Frames older than this are dropped (Config.INFERENCE_DEADLINE_MS)
+            workers: Worker threads draining the queue (Config.INFERENCE_WORKERS)
+        """
+        self.detector = detector
+        self.embedder = embedder
+        self.max_batch_size = max(1, max_batch_size or config.INFERENCE_MAX_BATCH_SIZE)
+        self.max_wait_ms = config.INFERENCE_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms
+        self.deadline_ms = deadline_ms or config.INFERENCE_DEADLINE_MS
+        self.workers = max(1, workers or config.INFERENCE_WORKERS)
+
+        self._queue = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+        # Metrics
+        self._batches = 0
+        self._frames = 0
+        self._faces = 0
+        self._dropped = 0
+        self._errors = 0
+        self._gated = 0
+        self._max_queue_depth = 0
+        self._last_batch_size = 0
+        self._last_batch_ms = 0.0
+        self._total_wait_ms = 0.0
+
+    def _alive_workers(self):
+        return sum(1 for worker in self._workers if worker.is_alive())
+
+    def _ensure_worker(self):
+        """Start (or restart) the worker threads on first use"""
+        if self._alive_workers() == self.workers:
+            return
+
+        with self._lock:
+            self._workers = [worker for worker in self._workers if worker.is_alive()]
+            while len(self._workers) < self.workers:
+                worker = threading.Thread(target=self._run, name=f'inference-scheduler-{len(self._workers)}', daemon=True)
+                worker.start()
+                self._workers.append(worker)
+                print(f"✅ [Scheduler] Inference worker started (batch={self.max_batch_size}, "
+                      f"wait={self.max_wait_ms}ms, deadline={self.deadline_ms}ms)")
+
+    def submit(self, img, max_faces=None, embed=True, detect_fn=None, select_fn=None, gate_fn=None):
+        """
+        Queue one frame for detection (and embedding)
+
+        Args:
+            img: Decoded BGR image
+            max_faces: Embed at most this many faces (highest score first); None = all
+            embed: If False, only run detection
+            detect_fn: Optional callable img -> DetectionResult replacing the
+                default detector (e.g. the /detect-face front-end)
+            select_fn: Optional callable DetectionResult -> face indices to
+                embed (e.g. only faces not yet recognized by a tracker);
+                overrides max_faces. Runs on a worker thread.
+            gate_fn: Optional callable (DetectionResult, index, crop) -> bool;
+                crops it returns False for are not embedded (quality gate).
+                Runs on a worker thread.
+
+        Returns:
+            Future resolving to (DetectionResult, embeddings or None); the
+            embeddings follow the order of the selected faces that passed gate_fn
+        """
+        self._ensure_worker()
+
+        job = _Job(img, detect_fn or self.detector.detect, select_fn, max_faces, embed, self.deadline_ms, gate_fn=gate_fn)
+        self._queue.put(job)
+
+        depth = self._queue.qsize()
+        if depth > self._max_queue_depth:
+            self._max_queue_depth = depth
+
+        return job.future
+
+    def infer(self, img, max_faces=None, embed=True, detect_fn=None, select_fn=None, gate_fn=None):
+        """Submit a frame and block until its result is ready (see submit)"""
+        future = self.submit(img, max_faces=max_faces, embed=embed, detect_fn=detect_fn,
+                             select_fn=select_fn, gate_fn=gate_fn)
+        # The worker fails the future once the deadline passes; the extra
+        # second only covers a batch that is already running
+        try:
+            return future.result(timeout=self.deadline_ms / 1000.0 + 1.0)
+        except FutureTimeout:
+            future.cancel()
+            with self._stats_lock:
+                self._dropped += 1
+            raise InferenceTimeout(f"No inference result within {self.deadline_ms / 1000.0 + 1.0:.1f}s")
+
+    def _collect(self):
+        """Block for the first job, then gather more until full or max_wait elapses"""
+        jobs = [self._queue.get()]
+        flush_at = time.monotonic() + self.max_wait_ms / 1000.0
+
+        while len(jobs) < self.max_batch_size:
+            remaining = flush_at - time.monotonic()
+            try:
+                if remaining <= 0:
+                    jobs.append(self._queue.get_nowait())
+                else:
+                    jobs.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return jobs
+
+    def _run(self):
+        while True:
+            jobs = self._collect()
+            try:
+                self._run_batch(jobs)
+            except Exception as e:
+                # Never let one bad batch kill the worker
+                logger.error(f"Inference batch failed: {e}", exc_info=True)
+                with self._stats_lock:
+                    self._errors += 1
+                for job in jobs:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+
+    def _run_batch(self, jobs):
+        started = time.monotonic()
+
+        # Drop frames that already waited past their deadline
+        live = []
+        dropped = 0
+        waited_ms = 0.0
+        for job in jobs:
+            if started > job.deadline:
+                dropped += 1
+                if job.future.set_running_or_notify_cancel():
+                    job.future.set_exception(InferenceTimeout(
+                        f"Frame dropped after waiting {(started - job.enqueued_at) * 1000:.0f}ms"
+                    ))
+            elif job.future.set_running_or_notify_cancel():
+                waited_ms += (started - job.enqueued_at) * 1000
+                live.append(job)
+
+        with self._stats_lock:
+            self._dropped += dropped
+            self._total_wait_ms += waited_ms
+
+        if not live:
+            return
+
+        # Detection runs per frame; crops from every frame are embedded together.
+        # Anything that fails for one frame fails only that frame's future.
+        detections = []
+        crops = []
+        spans = []
+        gated = 0
+        for job in live:
+            job_crops = []
+            job_gated = 0
+            try:
+                detection = job.detect_fn(job.img)
+                if job.select_fn is not None:
+                    indices = list(job.select_fn(detection))
+                else:
+                    count = detection.num_faces if job.max_faces is None else min(job.max_faces, detection.num_faces)
+                    indices = range(count)
+
+                if job.embed:
+                    for i in indices:
+                        crop = self.detector.extract_face(job.img, detection.bboxes[i], kps=detection.landmarks(i))
+                        if job.gate_fn is not None and not job.gate_fn(detection, i, crop):
+                            job_gated += 1
+                            continue
+                        job_crops.append(crop)
+            except Exception as e:
+                job.future.set_exception(e)
+                detections.append(None)
+                spans.append((0, 0))
+                continue
+
+            start = len(crops)
+            crops.extend(job_crops)
+            gated += job_gated
+            detections.append(detection)
+            spans.append((start, len(crops)))
+
+        embeddings = None
+        if crops:
+            try:
+                embeddings = self.embedder.generate_embeddings(crops)
+            except Exception as e:
+                for job, detection in zip(live, detections):
+                    if detection is not None and job.embed:
+                        job.future.set_exception(e)
+                raise
+
+        for job, detection, (start, end) in zip(live, detections, spans):
+            if detection is None or job.future.done():
+                continue
+            if not job.embed:
+                job.future.set_result((detection, None))
+            elif embeddings is None:
+                job.future.set_result((detection, np.zeros((0, 512), dtype=np.float32)))
+            else:
+                job.future.set_result((detection, embeddings[start:end]))
+
+        with self._stats_lock:
+            self._batches += 1
+            self._frames += len(live)
+            self._faces += len(crops)
+            self._gated += gated
+            self._last_batch_size = len(live)
+            self._last_batch_ms = (time.monotonic() - started) * 1000
+
+    def metrics(self):
+        """Queue depth and throughput counters"""
+        return {
+            'queue_depth': self._queue.qsize(),
+            'max_queue_depth': self._max_queue_depth,
+            'workers': self.workers,
+            'workers_alive': self._alive_workers(),
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait_ms,
+            'deadline_ms': self.deadline_ms,
+            'batches': self._batches,
+            'frames': self._frames,
+            'faces': self._faces,
+            'dropped': self._dropped,
+            'gated': self._gated,
+            'errors': self._errors,
+            'avg_batch_size': round(self._frames / self._batches, 2) if self._batches else 0.0,
+            'avg_queue_wait_ms': round(self._total_wait_ms / self._frames, 2) if self._frames else 0.0,
+            'last_batch_size': self._last_batch_size,
+            'last_batch_ms': round(self._last_batch_ms, 2)
+        }
+
+
+# Global instance wrapping the shared detector and FaceNet singletons
+from recognizer.detector import face_detector
+from recognizer.embeddings_backend import embedding_generator
+
+inference_scheduler = InferenceScheduler(face_detector, embedding_generator)
@@ -1,22 +1,322 @@
 import os
+import json
 import pickle
+import shutil
+import threading
 import numpy as np
+from datetime import datetime
 from config import config
+from recognizer.gallery import GalleryMatcher
+from recognizer.native_model import (
+    NATIVE_FILES, SOURCE_FILES, file_sha256, has_native, native_matches_sources, load_native
+)
+
+# Artifacts that make up one model version (all optional except the head's own files)
+MODEL_FILES = (
+    'face_classifier_v1.pkl',
+    'label_encoder.pkl',
+    'label_encoder_classes.npy',
+    'training_metadata.json',
+    'X.npy',
+    'y.npy'
+) + NATIVE_FILES
+MANIFEST_NAME = 'manifest.json'
+CURRENT_NAME = 'CURRENT'  # Text file naming the active version
+LEGACY_VERSION = 'legacy'  # Files directly in MODEL_PATH (no versions/ directory)
+
+
+def _creation_order(manifest):
+    """
+    Sort key for version manifests: created_at, then the numeric suffix of
+    versions created within the same second ('v...-10' after 'v...-2')
+    """
+    name = manifest.get('version', '')
+    parts = name.split('-')
+    suffix = int(parts[-1]) if len(parts) > 2 and parts[-1].isdigit() else 1
+    return manifest.get('created_at', ''), suffix
+
+
+class ModelBundle:
+    """
+    Everything one classification needs, for one model version
+    
+    Bundles are never modified after they are built; a reload builds a new
+    bundle and publishes it with a single reference swap, so a request that
+    already holds a bundle finishes on that version.
+    """
+    
+    def __init__(self, version, head='svc', classifier=None, scaler=None, label_encoder=None,
+                 label_classes=None, gallery=None, metadata=None, manifest=None):
+        self.version = version
+        self.head = head
+        self.classifier = classifier
+        self.scaler = scaler
+        self.label_encoder = label_encoder
+        self.label_classes = label_classes
+        self.gallery = gallery
+        self.metadata = metadata or {}
+        self.manifest = manifest or {}
+        
+        # Derived per-candidate-set views (restricted gallery / class columns);
+        # they live and die with this bundle, so a hot-swap can never serve
+        # another version's view
+        self._candidate_views = {}
+        self._candidate_lock = threading.Lock()
+    
+    def candidate_view(self, kind, candidates, build):
+        """Return build() for this bundle and candidate set, computing it once"""
+        key = (kind, frozenset(str(c) for c in candidates))
+        with self._candidate_lock:
+            if key not in self._candidate_views:
+                if len(self._candidate_views) >= 64:
+                    self._candidate_views.clear()
+                self._candidate_views[key] = build()
+            return self._candidate_views[key]
+    
+    def get_classifier(self):
+        return self.classifier
+    
+    def get_label_encoder(self):
+        return self.label_encoder
+    
+    def get_classes(self):
+        return self.label_classes
+    
+    def get_head(self):
+        return self.head
+    
+    def get_gallery(self):
+        return self.gallery
+    
+    def get_scaler(self):
+        return self.scaler
+    
+    def get_metadata(self):
+        return self.metadata
+    
+    def get_threshold(self):
+        """Get confidence threshold"""
+        # Load threshold from model metadata when available, but validate it
+        raw = self.metadata.get('threshold', None)
+        try:
+            if raw is None:
+                return float(config.RECOGNITION_CONFIDENCE_THRESHOLD)
+            t = float(raw)
+        except Exception:
+            # Fallback to configured threshold on parse error
+            return float(config.RECOGNITION_CONFIDENCE_THRESHOLD)
+        
+        # Sanity-check the threshold. Extremely high or low thresholds are likely
+        # to be the result of brittle heuristics during training. If the loaded
+        # threshold is outside sensible bounds, fall back to the configured value.
+        if t < 0.05 or t > 0.95:
+            print(f"⚠️ [Loader] Loaded threshold {t:.4f} looks suspicious; using config threshold {config.RECOGNITION_CONFIDENCE_THRESHOLD:.4f} instead")
+            return float(config.RECOGNITION_CONFIDENCE_THRESHOLD)
+        
+        return t
+
 
 class ModelLoader:
-    def __init__(self):
-        self.classifier = None
-        self.label_encoder = None
-        self.label_classes = None
-        self.scaler = None
-        self.metadata = {}
-        self.model_loaded = False
-        
-    def load_models(self):
-        """Load classifier and label encoder from disk"""
+    """
+    Loads versioned model bundles and hot-swaps the active one
+    
+    Layout:
+        MODEL_PATH/versions/<version>/  model files + manifest.json (sha256 per file)
+        MODEL_PATH/CURRENT              name of the active version
+    Without a versions/ directory the files directly in MODEL_PATH are used
+    as version 'legacy' (what the training scripts write).
+    """
+    
+    HISTORY_SIZE = 3  # Previous bundles kept in memory for instant rollback
+    
+    def __init__(self, model_path=None):
+        self.model_path = model_path or config.MODEL_PATH
+        self._bundle = None
+        self._history = []
+        self._swap_lock = threading.Lock()
+    
+    # ------------------------------------------------------------------
+    # Version directories
+    # ------------------------------------------------------------------
+    
+    @property
+    def versions_path(self):
+        return os.path.join(self.model_path, 'versions')
+    
+    def _version_dir(self, version):
+        if version == LEGACY_VERSION:
+            return self.model_path
+        return os.path.join(self.versions_path, version)
+    
+    def _read_current_version(self):
+        """Version named in CURRENT, or 'legacy' when there is none"""
+        current_path = os.path.join(self.model_path, CURRENT_NAME)
+        if os.path.exists(current_path):
+            with open(current_path, 'r') as f:
+                version = f.read().strip()
+            if version and os.path.isdir(self._version_dir(version)):
+                return version
+            print(f"⚠️  [Loader] CURRENT points to missing version '{version}', using legacy files")
+        return LEGACY_VERSION
+    
+    def _write_current_version(self, version):
+        """Point CURRENT at version (atomic rename, so other workers never see a partial file)"""
+        current_path = os.path.join(self.model_path, CURRENT_NAME)
+        tmp_path = current_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(version)
+        os.replace(tmp_path, current_path)
+    
+    def list_versions(self):
+        """All published versions with their manifests, newest first"""
+        versions = []
+        if os.path.isdir(self.versions_path):
+            for name in os.listdir(self.versions_path):
+                manifest_path = os.path.join(self.versions_path, name, MANIFEST_NAME)
+                if os.path.exists(manifest_path):
+                    with open(manifest_path, 'r') as f:
+                        versions.append(json.load(f))
+        return sorted(versions, key=_creation_order, reverse=True)
+    
+    def read_manifest(self, version):
+        if version == LEGACY_VERSION:
+            return {'version': LEGACY_VERSION, 'files': {}}
+        
+        manifest_path = os.path.join(self._version_dir(version), MANIFEST_NAME)
+        if not os.path.exists(manifest_path):
+            raise ValueError(f"Model version '{version}' has no manifest")
+        with open(manifest_path, 'r') as f:
+            return json.load(f)
+    
+    def verify_version(self, version):
+        """
+        Check every file of a version against its manifest checksum
+        
+        Returns:
+            The manifest dict
+        
+        Raises:
+            ValueError on a missing file or checksum mismatch
+        """
+        manifest = self.read_manifest(version)
+        version_dir = self._version_dir(version)
+        
+        for filename, expected in manifest.get('files', {}).items():
+            path = os.path.join(version_dir, filename)
+            if not os.path.exists(path):
+                raise ValueError(f"Model version '{version}' is missing {filename}")
+            if file_sha256(path) != expected:
+                raise ValueError(f"Checksum mismatch for {filename} in model version '{version}'")
+        
+        return manifest
+    
+    def create_version(self, source_dir=None, overrides=None, note=None):
+        """
+        Publish a new immutable version directory with a manifest
+        
+        Args:
+            source_dir: Directory to copy model files from (default: the
+                active version, or MODEL_PATH for the first version)
+            overrides: Optional {filename: file-like object or path} replacing
+                individual files (e.g. an admin upload). Overriding the
+                classifier pickle or label encoder drops the source's
+                native files unless they are overridden too.
+            note: Optional free-text description stored in the manifest
+        
+        Returns:
+            The new version name (not yet active; see activate())
+        """
+        if source_dir is None:
+            source_dir = self._version_dir(self._bundle.version if self._bundle else self._read_current_version())
+        overrides = overrides or {}
+        
+        # Native files converted from the replaced pickle would serve the old model
+        skipped = set()
+        if any(name in overrides for name in SOURCE_FILES) and not any(name in overrides for name in NATIVE_FILES):
+            skipped = set(NATIVE_FILES)
+        
+        base = datetime.now().strftime('v%Y%m%d-%H%M%S')
+        version = base
+        suffix = 1
+        while os.path.exists(self._version_dir(version)):
+            suffix += 1
+            version = f"{base}-{suffix}"
+        
+        # Build in a temp dir and rename, so a half-written version never exists
+        os.makedirs(self.versions_path, exist_ok=True)
+        tmp_dir = os.path.join(self.versions_path, f".{version}.tmp")
+        os.makedirs(tmp_dir)
+        
+        try:
+            for filename in MODEL_FILES:
+                target = os.path.join(tmp_dir, filename)
+                if filename in overrides:
+                    source = overrides[filename]
+                    if hasattr(source, 'save'):
+                        source.save(target)  # werkzeug FileStorage
+                    elif hasattr(source, 'read'):
+                        with open(target, 'wb') as f:
+                            shutil.copyfileobj(source, f)
+                    else:
+                        shutil.copy2(source, target)
+                elif filename not in skipped and os.path.exists(os.path.join(source_dir, filename)):
+                    shutil.copy2(os.path.join(source_dir, filename), target)
+            
+            files = {
+                filename: file_sha256(os.path.join(tmp_dir, filename))
+                for filename in sorted(os.listdir(tmp_dir))
+            }
+            manifest = {
+                'version': version,
+                'created_at': datetime.now().isoformat(),
+                'source': os.path.abspath(source_dir),
+                'note': note,
+                'files': files
+            }
+            with open(os.path.join(tmp_dir, MANIFEST_NAME), 'w') as f:
+                json.dump(manifest, f, indent=2)
+            
+            os.rename(tmp_dir, self._version_dir(version))
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        
+        print(f"✅ [Loader] Created model version {version} ({len(files)} files)")
+        return version
+    
+    # ------------------------------------------------------------------
+    # Loading and swapping
+    # ------------------------------------------------------------------
+    
+    def load_models(self, version=None):
+        """
+        Build the bundle of a version (default: CURRENT) and make it active
+        
+        The new bundle is built completely before it replaces the old one,
+        so concurrent requests keep using the previous version until the swap.
+        """
+        version = version or self._read_current_version()
+        bundle = self._load_bundle(version)
+        if bundle is None:
+            return False
+        
+        self._publish(bundle)
+        print(f"✅ [Loader] All models loaded successfully! (version {version})")
+        return True
+    
+    def _load_bundle(self, version):
+        """Verify and build the bundle of a version without activating it (or None on error)"""
         try:
-            model_path = config.MODEL_PATH
             
+            # Only names of existing version directories (never arbitrary paths)
+            if version != LEGACY_VERSION and (
+                    not os.path.isdir(self.versions_path) or version not in os.listdir(self.versions_path)):
+                print(f"❌ [Loader] Unknown model version: {version}")
+                return None
+            
+            model_path = self._version_dir(version)
+            
+            print(f"🔍 [Loader] Model version: {version}")
             print(f"🔍 [Loader] Model directory: {model_path}")
             print(f"🔍 [Loader] Absolute path: {os.path.abspath(model_path)}")
             
@@ -24,152 +324,332 @@ class ModelLoader:
             if not os.path.exists(model_path):
                 print(f"❌ [Loader] Model directory does not exist: {model_path}")
                 print(f"💡 [Loader] Create it with: mkdir {model_path}")
-                return False
-            
-            # Define model file paths
-            classifier_path = os.path.join(model_path, 'face_classifier_v1.pkl')
-            encoder_path = os.path.join(model_path, 'label_encoder.pkl')
-            classes_path = os.path.join(model_path, 'label_encoder_classes.npy')
+                return None
             
-            print(f"🔍 [Loader] Looking for classifier: {classifier_path}")
-            
-            # Check if classifier exists
-            if not os.path.exists(classifier_path):
-                print(f"❌ [Loader] Classifier not found: {classifier_path}")
-                print(f"💡 [Loader] Required file: face_classifier_v1.pkl")
-                
-                # List files in directory to help debug
-                try:
-                    files = os.listdir(model_path)
-                    print(f"📁 [Loader] Files in {model_path}:")
-                    for f in files:
-                        if not f.startswith('.'):
-                            print(f"   - {f}")
-                except Exception as e:
-                    print(f"❌ [Loader] Cannot list directory: {e}")
-                
-                return False
+            try:
+                manifest = self.verify_version(version)
+            except ValueError as e:
+                print(f"❌ [Loader] {e}")
+                return None
             
-            # Load classifier
-            print(f"🔍 [Loader] Loading classifier...")
+            return self._build_bundle(model_path, version, manifest)
+        
+        except Exception as e:
+            print(f"❌ [Loader] Unexpected error loading models: {e}")
+            import traceback
+            traceback.print_exc()
+            return None
+    
+    def activate(self, version):
+        """Load a published version, swap it in and record it in CURRENT"""
+        if not self.load_models(version):
+            return False
+        self._write_current_version(version)
+        return True
+    
+    def _previous_on_disk(self, version):
+        """
+        Version published before the given one in versions/ (by manifest
+        created_at), else the legacy files if there are any
+        """
+        if version == LEGACY_VERSION:
+            return None
+        
+        # list_versions() is newest first
+        names = [manifest['version'] for manifest in self.list_versions()]
+        if version in names and names.index(version) + 1 < len(names):
+            return names[names.index(version) + 1]
+        if any(os.path.exists(os.path.join(self.model_path, filename)) for filename in MODEL_FILES):
+            return LEGACY_VERSION
+        return None
+    
+    def rollback(self):
+        """
+        Swap back to the previously active version and record it in CURRENT
+        
+        The previous version is the one this process ran before (kept in
+        memory for an instant swap) or, after a restart or in another worker,
+        the version published before the active one on disk.
+        
+        Returns:
+            The version rolled back to, or None if there is nothing to roll back to
+        """
+        with self._swap_lock:
+            if self._history:
+                previous = self._history.pop()
+                self._bundle = previous
+            else:
+                previous = None
+        
+        if previous is None:
+            current = self._bundle.version if self._bundle else self._read_current_version()
+            version = self._previous_on_disk(current)
+            if version is None:
+                return None
+            previous = self._load_bundle(version)
+            if previous is None:
+                return None
+            with self._swap_lock:
+                # Replaced, not pushed: rolling back again goes further back
+                self._bundle = previous
+        
+        self._write_current_version(previous.version)
+        print(f"✅ [Loader] Rolled back to model version {previous.version}")
+        return previous.version
+    
+    def _publish(self, bundle):
+        """Atomically replace the active bundle, keeping the old one for rollback"""
+        with self._swap_lock:
+            if self._bundle is not None:
+                self._history.append(self._bundle)
+                del self._history[:-self.HISTORY_SIZE]
+            self._bundle = bundle
+    
+    def _build_bundle(self, model_path, version, manifest):
+        """Load every artifact of one version into a new ModelBundle (or None on error)"""
+        # Define model file paths
+        classifier_path = os.path.join(model_path, 'face_classifier_v1.pkl')
+        encoder_path = os.path.join(model_path, 'label_encoder.pkl')
+        classes_path = os.path.join(model_path, 'label_encoder_classes.npy')
+        metadata_path = os.path.join(model_path, 'training_metadata.json')
+        
+        # training_metadata.json selects the classification head
+        file_metadata = {}
+        if os.path.exists(metadata_path):
             try:
-                with open(classifier_path, 'rb') as f:
-                    data = pickle.load(f)
-                
-                # Check if it's the new format (dict with metadata)
-                if isinstance(data, dict) and 'classifier' in data:
-                    print(f"✅ [Loader] Detected new model format with metadata")
-                    self.classifier = data['classifier']
-                    self.scaler = data.get('scaler', None)
-                    self.label_encoder = data.get('label_encoder', None)
-                    self.metadata = data.get('metadata', {})
-                    
-                    print(f"✅ [Loader] Classifier type: {type(self.classifier).__name__}")
-                    print(f"✅ [Loader] Scaler: {type(self.scaler).__name__ if self.scaler else 'None'}")
-                    print(f"✅ [Loader] Embedding dim: {self.metadata.get('embedding_dim', 'unknown')}")
-                    print(f"✅ [Loader] Threshold: {self.metadata.get('threshold', 'unknown')}")
-                    print(f"✅ [Loader] Num classes: {self.metadata.get('num_classes', 'unknown')}")
-                    
-                    # Verify classifier is not a dict
-                    if isinstance(self.classifier, dict):
-                        print(f"❌ [Loader] ERROR: Classifier is still a dict!")
-                        print(f"   Keys: {self.classifier.keys()}")
-                        return False
-                else:
-                    # Old format - just the classifier
-                    print(f"✅ [Loader] Detected old model format")
-                    self.classifier = data
-                    self.scaler = None
-                    self.metadata = {}
-                    print(f"✅ [Loader] Classifier type: {type(self.classifier).__name__}")
-                
+                with open(metadata_path, 'r') as f:
+                    file_metadata = json.load(f)
             except Exception as e:
-                print(f"❌ [Loader] Error loading classifier: {e}")
-                print(f"💡 [Loader] File may be corrupted or incompatible")
-                return False
-            
-            # Load label encoder
-            print(f"🔍 [Loader] Looking for label encoder: {encoder_path}")
-            if os.path.exists(encoder_path):
-                try:
-                    with open(encoder_path, 'rb') as f:
-                        self.label_encoder = pickle.load(f)
-                    print(f"✅ [Loader] Loaded label encoder from {encoder_path}")
-                    print(f"✅ [Loader] Encoder type: {type(self.label_encoder).__name__}")
-                except Exception as e:
-                    print(f"⚠️  [Loader] Error loading label encoder: {e}")
-                    print(f"⚠️  [Loader] Will use class array instead")
+                print(f"⚠️  [Loader] Error reading training metadata: {e}")
+        
+        head = file_metadata.get('classifier_head', 'svc')
+        print(f"🔍 [Loader] Classification head: {head}")
+        
+        if head == 'gallery':
+            return self._build_gallery(model_path, classes_path, file_metadata, version, manifest)
+        
+        # Pickle-free, memory-mapped artifacts (see convert_model_native.py)
+        if config.MODEL_NATIVE_FORMAT and has_native(model_path):
+            current, reason = native_matches_sources(model_path)
+            if current:
+                bundle = self._build_native(model_path, version, manifest)
+                if bundle is not None:
+                    return bundle
             else:
-                print(f"⚠️  [Loader] Label encoder not found (will use class array)")
+                print(f"⚠️  [Loader] Native artifacts are stale: {reason}")
+            print(f"⚠️  [Loader] Falling back to pickle artifacts")
+        
+        print(f"🔍 [Loader] Looking for classifier: {classifier_path}")
+        
+        # Check if classifier exists
+        if not os.path.exists(classifier_path):
+            print(f"❌ [Loader] Classifier not found: {classifier_path}")
+            print(f"💡 [Loader] Required file: face_classifier_v1.pkl")
             
-            # Load label classes
-            print(f"🔍 [Loader] Looking for label classes: {classes_path}")
-            if os.path.exists(classes_path):
-                try:
-                    self.label_classes = np.load(classes_path, allow_pickle=True)
-                    print(f"✅ [Loader] Loaded {len(self.label_classes)} classes")
-                    print(f"✅ [Loader] Classes: {self.label_classes[:5]}..." if len(self.label_classes) > 5 else f"✅ [Loader] Classes: {self.label_classes}")
-                except Exception as e:
-                    print(f"⚠️  [Loader] Error loading label classes: {e}")
-                    print(f"⚠️  [Loader] Will use numeric labels")
-            else:
-                print(f"⚠️  [Loader] Label classes not found (will use numeric labels)")
+            # List files in directory to help debug
+            try:
+                files = os.listdir(model_path)
+                print(f"📁 [Loader] Files in {model_path}:")
+                for f in files:
+                    if not f.startswith('.'):
+                        print(f"   - {f}")
+            except Exception as e:
+                print(f"❌ [Loader] Cannot list directory: {e}")
             
-            self.model_loaded = True
-            print(f"✅ [Loader] All models loaded successfully!")
-            return True
+            return None
+        
+        classifier = None
+        scaler = None
+        label_encoder = None
+        label_classes = None
+        metadata = {}
+        
+        # Load classifier
+        print(f"🔍 [Loader] Loading classifier...")
+        try:
+            with open(classifier_path, 'rb') as f:
+                data = pickle.load(f)
             
+            # Check if it's the new format (dict with metadata)
+            if isinstance(data, dict) and 'classifier' in data:
+                print(f"✅ [Loader] Detected new model format with metadata")
+                classifier = data['classifier']
+                scaler = data.get('scaler', None)
+                label_encoder = data.get('label_encoder', None)
+                metadata = data.get('metadata', {})
+                
+                print(f"✅ [Loader] Classifier type: {type(classifier).__name__}")
+                print(f"✅ [Loader] Scaler: {type(scaler).__name__ if scaler else 'None'}")
+                print(f"✅ [Loader] Embedding dim: {metadata.get('embedding_dim', 'unknown')}")
+                print(f"✅ [Loader] Threshold: {metadata.get('threshold', 'unknown')}")
+                print(f"✅ [Loader] Num classes: {metadata.get('num_classes', 'unknown')}")
+                
+                # Verify classifier is not a dict
+                if isinstance(classifier, dict):
+                    print(f"❌ [Loader] ERROR: Classifier is still a dict!")
+                    print(f"   Keys: {classifier.keys()}")
+                    return None
+            else:
+                # Old format - just the classifier
+                print(f"✅ [Loader] Detected old model format")
+                classifier = data
+                print(f"✅ [Loader] Classifier type: {type(classifier).__name__}")
+        
         except Exception as e:
-            print(f"❌ [Loader] Unexpected error loading models: {e}")
-            import traceback
-            traceback.print_exc()
-            self.model_loaded = False
-            return False
+            print(f"❌ [Loader] Error loading classifier: {e}")
+            print(f"💡 [Loader] File may be corrupted or incompatible")
+            return None
+        
+        # Load label encoder
+        print(f"🔍 [Loader] Looking for label encoder: {encoder_path}")
+        if os.path.exists(encoder_path):
+            try:
+                with open(encoder_path, 'rb') as f:
+                    label_encoder = pickle.load(f)
+                print(f"✅ [Loader] Loaded label encoder from {encoder_path}")
+                print(f"✅ [Loader] Encoder type: {type(label_encoder).__name__}")
+            except Exception as e:
+                print(f"⚠️  [Loader] Error loading label encoder: {e}")
+                print(f"⚠️  [Loader] Will use class array instead")
+        else:
+            print(f"⚠️  [Loader] Label encoder not found (will use class array)")
+        
+        # Load label classes
+        print(f"🔍 [Loader] Looking for label classes: {classes_path}")
+        if os.path.exists(classes_path):
+            try:
+                label_classes = np.load(classes_path, allow_pickle=True)
+                print(f"✅ [Loader] Loaded {len(label_classes)} classes")
+                print(f"✅ [Loader] Classes: {label_classes[:5]}..." if len(label_classes) > 5 else f"✅ [Loader] Classes: {label_classes}")
+            except Exception as e:
+                print(f"⚠️  [Loader] Error loading label classes: {e}")
+                print(f"⚠️  [Loader] Will use numeric labels")
+        else:
+            print(f"⚠️  [Loader] Label classes not found (will use numeric labels)")
+        
+        return ModelBundle(
+            version, head='svc', classifier=classifier, scaler=scaler,
+            label_encoder=label_encoder, label_classes=label_classes,
+            metadata=metadata, manifest=manifest
+        )
+    
+    def _build_native(self, model_path, version, manifest):
+        """Build a bundle from native_*.npy arrays opened with mmap (no unpickling)"""
+        print(f"🔍 [Loader] Loading native (memory-mapped) model artifacts...")
+        try:
+            native = load_native(model_path, mmap_mode='r')
+        except Exception as e:
+            print(f"❌ [Loader] Error loading native artifacts: {e}")
+            return None
+        
+        classifier = native['classifier']
+        print(f"✅ [Loader] Native classifier: {classifier.kind} "
+              f"({len(classifier.classes_)} classes, {classifier.coef.shape[0]} weight rows)")
+        print(f"✅ [Loader] Scaler: {'NativeScaler' if native['scaler'] is not None else 'None'}")
+        
+        return ModelBundle(
+            version, head='svc', classifier=classifier, scaler=native['scaler'],
+            label_encoder=native['label_encoder'], label_classes=native['classes'],
+            metadata=native['metadata'], manifest=manifest
+        )
+    
+    def _build_gallery(self, model_path, classes_path, file_metadata, version, manifest):
+        """Build the cosine-similarity gallery head from X.npy / y.npy"""
+        X_path = os.path.join(model_path, 'X.npy')
+        y_path = os.path.join(model_path, 'y.npy')
+        
+        if not os.path.exists(X_path) or not os.path.exists(y_path):
+            print(f"❌ [Loader] Gallery head requires X.npy and y.npy in {model_path}")
+            return None
+        
+        if not os.path.exists(classes_path):
+            print(f"❌ [Loader] Gallery head requires label_encoder_classes.npy")
+            return None
+        
+        try:
+            label_classes = np.load(classes_path, allow_pickle=True)
+            gallery = GalleryMatcher.from_model_dir(
+                model_path,
+                classes=label_classes,
+                threshold=file_metadata.get('gallery_threshold', config.GALLERY_SIMILARITY_THRESHOLD),
+                mode=file_metadata.get('gallery_mode', 'centroid')
+            )
+        except Exception as e:
+            print(f"❌ [Loader] Error building gallery: {e}")
+            return None
+        
+        print(f"✅ [Loader] Gallery loaded: {len(gallery)} students, "
+              f"{gallery.matrix.shape[0]} templates ({gallery.mode})")
+        print(f"✅ [Loader] Similarity threshold: {gallery.threshold:.3f}")
+        
+        return ModelBundle(
+            version, head='gallery', label_classes=label_classes,
+            gallery=gallery, metadata=file_metadata, manifest=manifest
+        )
+    
+    # ------------------------------------------------------------------
+    # Accessors (all read the active bundle)
+    # ------------------------------------------------------------------
+    
+    def get_bundle(self):
+        """
+        Active model bundle
+        
+        Take this once per request and read everything from it, so the
+        whole request uses one version even if a swap happens meanwhile.
+        """
+        return self._bundle
+    
+    def get_version(self):
+        """Active model version name, or None if nothing is loaded"""
+        bundle = self._bundle
+        return bundle.version if bundle else None
+    
+    def get_history(self):
+        """Versions available for instant rollback, most recent last"""
+        return [bundle.version for bundle in self._history]
+    
+    @property
+    def model_loaded(self):
+        return self._bundle is not None
     
     def is_loaded(self):
         """Check if models are loaded"""
-        return self.model_loaded
+        return self._bundle is not None
     
     def get_classifier(self):
         """Get classifier instance"""
-        return self.classifier
+        return self._bundle.classifier if self._bundle else None
     
     def get_label_encoder(self):
         """Get label encoder instance"""
-        return self.label_encoder
+        return self._bundle.label_encoder if self._bundle else None
     
     def get_classes(self):
         """Get label classes"""
-        return self.label_classes
+        return self._bundle.label_classes if self._bundle else None
+    
+    def get_head(self):
+        """Get active classification head ('svc' or 'gallery')"""
+        return self._bundle.head if self._bundle else 'svc'
+    
+    def get_gallery(self):
+        """Get gallery matcher instance (gallery head only)"""
+        return self._bundle.gallery if self._bundle else None
     
     def get_scaler(self):
         """Get scaler instance"""
-        return self.scaler
+        return self._bundle.scaler if self._bundle else None
     
     def get_metadata(self):
         """Get model metadata"""
-        return self.metadata
+        return self._bundle.metadata if self._bundle else {}
     
     def get_threshold(self):
         """Get confidence threshold"""
-        # Load threshold from model metadata when available, but validate it
-        raw = self.metadata.get('threshold', None)
-        try:
-            if raw is None:
-                return float(config.RECOGNITION_CONFIDENCE_THRESHOLD)
-            t = float(raw)
-        except Exception:
-            # Fallback to configured threshold on parse error
+        if self._bundle is None:
             return float(config.RECOGNITION_CONFIDENCE_THRESHOLD)
-
-        # Sanity-check the threshold. Extremely high or low thresholds are likely
-        # to be the result of brittle heuristics during training. If the loaded
-        # threshold is outside sensible bounds, fall back to the configured value.
-        if t < 0.05 or t > 0.95:
-            print(f"⚠️ [Loader] Loaded threshold {t:.4f} looks suspicious; using config threshold {config.RECOGNITION_CONFIDENCE_THRESHOLD:.4f} instead")
-            return float(config.RECOGNITION_CONFIDENCE_THRESHOLD)
-
-        return t
+        return self._bundle.get_threshold()
 
 # Global model loader instance
 model_loader = ModelLoader()
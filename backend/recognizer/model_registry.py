@@ -0,0 +1,142 @@
+"""
+Shared model registry
+Loads each InsightFace model pack once per process; detector front-ends with
+different det_size / threshold settings share the same ONNX session and pass
+their settings per call
+"""
+
+import os
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Lowest score the shared detection model keeps; front-ends filter above it
+BASE_DET_THRESH = 0.2
+
+
+def _rss_mb():
+    """Resident set size of this process in MB (Linux /proc, else peak RSS)"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        try:
+            import resource
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        except Exception:
+            return 0.0
+
+
+class ModelRegistry:
+    """Process-wide cache of loaded inference models"""
+
+    def __init__(self):
+        self._models = {}
+        self._info = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, loader, model_file=None):
+        """
+        Return the model stored under key, loading it once with loader()
+
+        Args:
+            key: Registry key, e.g. 'insightface/buffalo_l/detection'
+            loader: Callable building the model
+            model_file: Optional callable(model) -> path of the model file on disk
+        """
+        model = self._models.get(key)
+        if model is not None:
+            return model
+
+        with self._lock:
+            # Another thread may have loaded it while we waited
+            if key in self._models:
+                return self._models[key]
+
+            rss_before = _rss_mb()
+            started = time.perf_counter()
+            model = loader()
+            load_seconds = time.perf_counter() - started
+            rss_delta = _rss_mb() - rss_before
+
+            path = model_file(model) if model_file else None
+            file_mb = os.path.getsize(path) / (1024 * 1024) if path and os.path.exists(path) else None
+
+            self._models[key] = model
+            self._info[key] = {
+                'key': key,
+                'model_file': path,
+                'file_size_mb': round(file_mb, 1) if file_mb is not None else None,
+                'rss_delta_mb': round(rss_delta, 1),
+                'load_seconds': round(load_seconds, 2)
+            }
+
+            print(f"✅ [Registry] Loaded {key} in {load_seconds:.2f}s "
+                  f"(+{rss_delta:.1f} MB RSS" + (f", file {file_mb:.1f} MB)" if file_mb is not None else ")"))
+            return model
+
+    def get_face_analysis(self, pack='buffalo_l'):
+        """
+        Detection-only FaceAnalysis app for an InsightFace model pack
+
+        The app is prepared with a low base threshold and a 640x640 default
+        size; callers pass their own input_size and filter scores per call.
+        """
+        def load():
+            from insightface.app import FaceAnalysis
+            app = FaceAnalysis(
+                name=pack,
+                providers=['CPUExecutionProvider'],
+                allowed_modules=['detection']  # Only detection, not recognition
+            )
+            app.prepare(ctx_id=-1, det_size=(640, 640), det_thresh=BASE_DET_THRESH)
+            return app
+
+        return self.get(f'insightface/{pack}/detection', load,
+                        model_file=lambda app: getattr(app.det_model, 'model_file', None))
+
+    def detect(self, rgb_img, det_size, det_thresh=None, pack='buffalo_l'):
+        """
+        Run the shared detection model at a given input size
+
+        Args:
+            rgb_img: RGB image
+            det_size: (width, height) detector input size for this call
+            det_thresh: Minimum score to keep (None = base threshold)
+
+        Returns:
+            (dets, kpss): (N, 5) [x1, y1, x2, y2, score] and (N, 5, 2) landmarks
+        """
+        det_model = self.get_face_analysis(pack).det_model
+        dets, kpss = det_model.detect(rgb_img, input_size=tuple(det_size), max_num=0, metric='default')
+
+        if det_thresh is not None and len(dets) > 0:
+            keep = dets[:, 4] >= det_thresh
+            dets = dets[keep]
+            kpss = kpss[keep] if kpss is not None else None
+
+        return dets, kpss
+
+    def get_faces(self, rgb_img, det_size, det_thresh=None, pack='buffalo_l'):
+        """Same as FaceAnalysis.get() (detection only) at a given input size"""
+        from insightface.app.common import Face
+
+        dets, kpss = self.detect(rgb_img, det_size, det_thresh=det_thresh, pack=pack)
+        return [
+            Face(bbox=det[:4], kps=kpss[i] if kpss is not None else None, det_score=det[4])
+            for i, det in enumerate(dets)
+        ]
+
+    def footprint(self):
+        """Memory footprint and load time of every loaded model"""
+        return {
+            'process_rss_mb': round(_rss_mb(), 1),
+            'models': list(self._info.values())
+        }
+
+
+# Global instance
+model_registry = ModelRegistry()
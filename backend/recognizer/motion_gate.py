@@ -0,0 +1,123 @@
+"""
+Motion / scene-change gating for live preview detection
+Keeps a tiny grayscale thumbnail of the previous frame per camera. When the
+mean absolute difference to the new frame is below a threshold, the cached
+detection is returned instead of running the detector again; a refresh is
+forced every N frames so the overlay cannot go stale indefinitely.
+"""
+
+import time
+import threading
+import logging
+
+import cv2
+import numpy as np
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+
+class _GateState:
+    """Last thumbnail and detection of one camera"""
+    __slots__ = ('thumb', 'detection', 'frames_since_refresh', 'last_seen')
+
+    def __init__(self, thumb, detection, now):
+        self.thumb = thumb
+        self.detection = detection
+        self.frames_since_refresh = 0
+        self.last_seen = now
+
+
+class MotionGate:
+    """Skips detection on frames that barely differ from the previous one"""
+
+    def __init__(self, diff_threshold=None, force_refresh_frames=None, thumb_width=None, idle_ttl=300):
+        """
+        Args:
+            diff_threshold: Mean absolute gray-level change (0-1) below which the
+                cached detection is reused (Config.MOTION_DIFF_THRESHOLD)
+            force_refresh_frames: Run the detector at least every N frames
+                (Config.MOTION_FORCE_REFRESH_FRAMES)
+            thumb_width: Width of the comparison thumbnail (Config.MOTION_THUMB_WIDTH)
+            idle_ttl: Seconds after which an unused camera state is dropped
+        """
+        self.diff_threshold = config.MOTION_DIFF_THRESHOLD if diff_threshold is None else diff_threshold
+        self.force_refresh_frames = force_refresh_frames or config.MOTION_FORCE_REFRESH_FRAMES
+        self.thumb_width = thumb_width or config.MOTION_THUMB_WIDTH
+        self.idle_ttl = idle_ttl
+
+        self._states = {}
+        self._lock = threading.Lock()
+
+        # Metrics
+        self._frames = 0
+        self._cached = 0
+
+    def thumbnail(self, img):
+        """Downsampled grayscale copy used for frame differencing"""
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+        h, w = gray.shape[:2]
+        height = max(1, int(round(h * self.thumb_width / float(w))))
+        return cv2.resize(gray, (self.thumb_width, height), interpolation=cv2.INTER_AREA).astype(np.float32)
+
+    def run(self, key, img, detect_fn):
+        """
+        Return the detection for `img`, reusing the previous one if the scene is static
+
+        Args:
+            key: Camera / session identifier
+            img: Decoded BGR frame
+            detect_fn: Callable img -> DetectionResult, used on refresh
+
+        Returns:
+            (DetectionResult, cached, frame_diff) - frame_diff is None when
+            there was no comparable previous frame
+        """
+        now = time.monotonic()
+        thumb = self.thumbnail(img)
+        key = str(key)
+
+        with self._lock:
+            self._frames += 1
+            for stale in [k for k, s in self._states.items() if now - s.last_seen > self.idle_ttl]:
+                del self._states[stale]
+
+            state = self._states.get(key)
+            diff = None
+            if state is not None and state.thumb.shape == thumb.shape:
+                diff = float(np.mean(np.abs(thumb - state.thumb))) / 255.0
+
+                if diff < self.diff_threshold and state.frames_since_refresh + 1 < self.force_refresh_frames:
+                    # Compare against the frame that produced the detection, so
+                    # slow drift still accumulates into a refresh
+                    state.frames_since_refresh += 1
+                    state.last_seen = now
+                    self._cached += 1
+                    return state.detection, True, diff
+
+        # Scene changed, first frame, or forced refresh
+        detection = detect_fn(img)
+
+        with self._lock:
+            self._states[key] = _GateState(thumb, detection, now)
+
+        return detection, False, diff
+
+    def reset(self, key):
+        with self._lock:
+            self._states.pop(str(key), None)
+
+    def stats(self):
+        return {
+            'cameras': len(self._states),
+            'frames': self._frames,
+            'cached': self._cached,
+            'cache_rate': round(self._cached / self._frames, 3) if self._frames else 0.0,
+            'diff_threshold': self.diff_threshold,
+            'force_refresh_frames': self.force_refresh_frames
+        }
+
+
+# Global instance
+motion_gate = MotionGate()
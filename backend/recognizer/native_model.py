@@ -0,0 +1,347 @@
+"""
+Pickle-free model artifact format
+Stores the linear classifier, scaler and class IDs as raw .npy arrays plus a
+JSON manifest. Arrays are opened with np.load(mmap_mode='r'), so forked
+workers share the pages through the OS page cache and loading is near-instant.
+
+Files (next to the pickle artifacts in a model directory):
+    native_manifest.json      format version, classifier kind, array names, metadata
+    native_<array>.npy        one raw array per entry in the manifest
+
+The manifest records the sha256 of the pickle artifacts it was converted
+from; when they no longer match (a trainer rewrote the pickle without
+writing native files) the loader ignores the native files.
+
+Supported classifiers: linear-kernel SVC with probability=True (one-vs-one
+with Platt scaling and pairwise coupling, as in libsvm) and LogisticRegression.
+"""
+
+import os
+import json
+import hashlib
+import numpy as np
+
+NATIVE_MANIFEST = 'native_manifest.json'
+NATIVE_FORMAT_VERSION = 1
+
+# Array files written by save_native (also listed as model version artifacts)
+NATIVE_ARRAYS = ('coef', 'intercept', 'prob_a', 'prob_b', 'class_labels',
+                 'scaler_mean', 'scaler_scale', 'classes')
+NATIVE_FILES = (NATIVE_MANIFEST,) + tuple(f'native_{name}.npy' for name in NATIVE_ARRAYS)
+
+# Pickle artifacts the native files are derived from (the scaler lives in the
+# classifier pickle; the label encoder in it and/or label_encoder.pkl)
+SOURCE_FILES = ('face_classifier_v1.pkl', 'label_encoder.pkl', 'label_encoder_classes.npy')
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_hashes(model_dir):
+    """sha256 of each SOURCE_FILES entry present in model_dir"""
+    return {
+        name: file_sha256(os.path.join(model_dir, name))
+        for name in SOURCE_FILES
+        if os.path.exists(os.path.join(model_dir, name))
+    }
+
+
+class NativeScaler:
+    """StandardScaler.transform from stored mean/scale"""
+
+    def __init__(self, mean, scale):
+        self.mean_ = mean
+        self.scale_ = scale
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+
+class NativeLabelEncoder:
+    """LabelEncoder.inverse_transform over a stored class array"""
+
+    def __init__(self, classes):
+        self.classes_ = classes
+
+    def inverse_transform(self, y):
+        return self.classes_[np.asarray(y, dtype=int)]
+
+
+class NativeLinearClassifier:
+    """
+    predict_proba / predict for a linear classifier stored as weight matrices
+
+    kind:
+        'svc_ovo'        SVC(kernel='linear', probability=True): coef/intercept
+                         hold one row per class pair (libsvm order)
+        'logistic_ovr'   LogisticRegression one-vs-rest
+        'logistic_multinomial'  LogisticRegression softmax
+    """
+
+    def __init__(self, kind, coef, intercept, class_labels, prob_a=None, prob_b=None):
+        self.kind = kind
+        self.coef = coef
+        self.intercept = intercept
+        self.classes_ = class_labels
+        self.prob_a = prob_a
+        self.prob_b = prob_b
+
+    def decision_values(self, X):
+        return np.asarray(X, dtype=np.float64) @ self.coef.T + self.intercept
+
+    def predict_proba(self, X):
+        scores = self.decision_values(X)
+
+        if self.kind == 'logistic_ovr':
+            probs = 1.0 / (1.0 + np.exp(-scores))
+            if probs.shape[1] == 1:
+                probs = np.hstack([1.0 - probs, probs])
+            return probs / probs.sum(axis=1, keepdims=True)
+
+        if self.kind == 'logistic_multinomial':
+            scores = scores - scores.max(axis=1, keepdims=True)
+            probs = np.exp(scores)
+            return probs / probs.sum(axis=1, keepdims=True)
+
+        if self.kind == 'svc_ovo':
+            return self._svc_proba(scores)
+
+        raise ValueError(f"Unknown native classifier kind: {self.kind}")
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def _svc_proba(self, dec):
+        """libsvm svm_predict_probability: Platt sigmoid per pair, then pairwise coupling"""
+        k = len(self.classes_)
+        n = dec.shape[0]
+        min_prob = 1e-7
+
+        # Pairwise probabilities r[:, i, j] = P(class i | i or j)
+        pair_prob = 1.0 / (1.0 + np.exp(dec * self.prob_a + self.prob_b))
+        pair_prob = np.clip(pair_prob, min_prob, 1 - min_prob)
+
+        r = np.zeros((n, k, k))
+        iu, ju = np.triu_indices(k, 1)  # libsvm pair order: (0,1), (0,2), ..., (1,2), ...
+        r[:, iu, ju] = pair_prob
+        r[:, ju, iu] = 1 - pair_prob
+
+        return self._multiclass_probability(r)
+
+    @staticmethod
+    def _multiclass_probability(r):
+        """Wu, Lin & Weng (2004) method 2, vectorized over samples as in libsvm"""
+        n, k, _ = r.shape
+        max_iter = max(100, k)
+        eps = 0.005 / k
+
+        # Q[t, t] = sum_{j != t} r[j, t]^2, Q[t, j] = -r[j, t] * r[t, j]
+        rt = np.transpose(r, (0, 2, 1))
+        Q = -rt * r
+        diag = np.einsum('njt,njt->nt', r, r) - np.einsum('ntt,ntt->nt', r, r)
+        idx = np.arange(k)
+        Q[:, idx, idx] = diag
+
+        p = np.full((n, k), 1.0 / k)
+        active = np.ones(n, dtype=bool)
+
+        for _ in range(max_iter):
+            Qp = np.einsum('ntj,nj->nt', Q, p)
+            pQp = np.einsum('nt,nt->n', p, Qp)
+            max_error = np.abs(Qp - pQp[:, None]).max(axis=1)
+            active &= max_error >= eps
+            if not active.any():
+                break
+
+            rows = np.where(active)[0]
+            Qa, pa, Qpa, pQpa = Q[rows], p[rows], Qp[rows], pQp[rows]
+            for t in range(k):
+                diff = (-Qpa[:, t] + pQpa) / Qa[:, t, t]
+                pa[:, t] += diff
+                scale = 1 + diff
+                pQpa = (pQpa + diff * (diff * Qa[:, t, t] + 2 * Qpa[:, t])) / scale / scale
+                Qpa = (Qpa + diff[:, None] * Qa[:, t, :]) / scale[:, None]
+                pa /= scale[:, None]
+            p[rows] = pa
+
+        return p
+
+
+def _classifier_arrays(classifier):
+    """Extract (kind, arrays) from a fitted sklearn classifier"""
+    name = type(classifier).__name__
+
+    if name == 'SVC':
+        if getattr(classifier, 'kernel', None) != 'linear':
+            raise ValueError(f"Only linear-kernel SVC is supported (got kernel={classifier.kernel})")
+        if not getattr(classifier, 'probability', False):
+            raise ValueError("SVC must be trained with probability=True")
+        # Weights rebuilt from the private _dual_coef_ so that they carry
+        # libsvm's sign like _intercept_, probA_ and probB_; the public
+        # coef_/intercept_ are negated for binary problems
+        coef = classifier._dual_coef_ @ classifier.support_vectors_
+        return 'svc_ovo', {
+            'coef': np.asarray(coef.toarray() if hasattr(coef, 'toarray') else coef),
+            'intercept': np.asarray(classifier._intercept_),
+            'prob_a': np.asarray(classifier.probA_),
+            'prob_b': np.asarray(classifier.probB_),
+        }
+
+    if name == 'LogisticRegression':
+        multi_class = getattr(classifier, 'multi_class', 'auto')
+        multinomial = multi_class == 'multinomial' or (
+            multi_class in ('auto', 'deprecated') and len(classifier.classes_) > 2
+            and getattr(classifier, 'solver', 'lbfgs') != 'liblinear')
+        return 'logistic_multinomial' if multinomial else 'logistic_ovr', {
+            'coef': np.asarray(classifier.coef_),
+            'intercept': np.asarray(classifier.intercept_),
+        }
+
+    raise ValueError(f"Unsupported classifier for native format: {name}")
+
+
+def save_native(output_dir, classifier, scaler=None, label_encoder=None, classes=None, metadata=None):
+    """
+    Write the native artifact files for a fitted classifier
+
+    Call it after the pickle artifacts are written: their hashes are stored
+    in the manifest and checked by native_matches_sources.
+
+    Args:
+        output_dir: Model directory (e.g. models/Classifier)
+        classifier: Fitted SVC (linear, probability=True) or LogisticRegression
+        scaler: Optional fitted StandardScaler
+        label_encoder: Optional fitted LabelEncoder (source of student IDs)
+        classes: Student IDs if there is no label encoder
+        metadata: Training metadata stored in the manifest
+
+    Returns:
+        Path of the manifest
+    """
+    kind, arrays = _classifier_arrays(classifier)
+    arrays['class_labels'] = np.asarray(classifier.classes_)
+
+    if scaler is not None:
+        arrays['scaler_mean'] = np.asarray(scaler.mean_)
+        arrays['scaler_scale'] = np.asarray(scaler.scale_)
+
+    if label_encoder is not None:
+        classes = label_encoder.classes_
+    if classes is not None:
+        # Fixed-width unicode so the array loads without pickle
+        arrays['classes'] = np.asarray(classes).astype(str)
+
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        if array.dtype == object:
+            raise ValueError(f"Array {name} has dtype object and cannot be stored without pickle")
+        np.save(os.path.join(output_dir, f'native_{name}.npy'), array, allow_pickle=False)
+
+    manifest = {
+        'format_version': NATIVE_FORMAT_VERSION,
+        'classifier_kind': kind,
+        'arrays': sorted(arrays),
+        'num_classes': int(len(classifier.classes_)),
+        'embedding_dim': int(arrays['coef'].shape[1]),
+        'sources': source_hashes(output_dir),
+        'metadata': metadata or {}
+    }
+    manifest_path = os.path.join(output_dir, NATIVE_MANIFEST)
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2, default=str)
+
+    return manifest_path
+
+
+def has_native(model_dir):
+    return os.path.exists(os.path.join(model_dir, NATIVE_MANIFEST))
+
+
+def native_matches_sources(model_dir):
+    """
+    Check that the native files were converted from the pickle artifacts on disk
+
+    A source file recorded in the manifest may be missing (pickle-free
+    deployment), but one that is present must have the recorded hash, and
+    every present source file must be recorded.
+
+    Returns:
+        (ok, reason) - reason names the first mismatch, or None
+    """
+    try:
+        with open(os.path.join(model_dir, NATIVE_MANIFEST), 'r') as f:
+            recorded = json.load(f).get('sources')
+    except (OSError, ValueError) as e:
+        return False, f"unreadable {NATIVE_MANIFEST}: {e}"
+
+    current = source_hashes(model_dir)
+    if recorded is None:
+        if current:
+            return False, "manifest has no source hashes (re-run convert_model_native.py)"
+        return True, None
+
+    for name, digest in current.items():
+        if recorded.get(name) != digest:
+            return False, f"{name} changed since the native files were written"
+    return True, None
+
+
+def remove_native(model_dir):
+    """Delete the native files in model_dir (e.g. after writing a pickle without them)"""
+    removed = []
+    for name in NATIVE_FILES:
+        path = os.path.join(model_dir, name)
+        if os.path.exists(path):
+            os.remove(path)
+            removed.append(name)
+    return removed
+
+
+def load_native(model_dir, mmap_mode='r'):
+    """
+    Load native artifacts without unpickling anything
+
+    Returns:
+        dict with 'classifier', 'scaler', 'label_encoder', 'classes',
+        'metadata' and 'manifest' (scaler/label_encoder may be None)
+    """
+    with open(os.path.join(model_dir, NATIVE_MANIFEST), 'r') as f:
+        manifest = json.load(f)
+
+    if manifest.get('format_version') != NATIVE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported native format version: {manifest.get('format_version')}")
+
+    arrays = {
+        name: np.load(os.path.join(model_dir, f'native_{name}.npy'), mmap_mode=mmap_mode, allow_pickle=False)
+        for name in manifest['arrays']
+    }
+
+    classifier = NativeLinearClassifier(
+        manifest['classifier_kind'],
+        arrays['coef'],
+        arrays['intercept'],
+        arrays['class_labels'],
+        prob_a=arrays.get('prob_a'),
+        prob_b=arrays.get('prob_b')
+    )
+
+    scaler = None
+    if 'scaler_mean' in arrays:
+        scaler = NativeScaler(arrays['scaler_mean'], arrays['scaler_scale'])
+
+    classes = arrays.get('classes')
+    label_encoder = NativeLabelEncoder(classes) if classes is not None else None
+
+    return {
+        'classifier': classifier,
+        'scaler': scaler,
+        'label_encoder': label_encoder,
+        'classes': classes,
+        'metadata': manifest.get('metadata', {}),
+        'manifest': manifest
+    }
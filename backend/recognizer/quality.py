@@ -0,0 +1,160 @@
+"""
+Face quality gate
+Scores each aligned face crop before it is sent to FaceNet: face size in the
+frame, head pose from the 5-point landmarks, brightness and sharpness
+(variance of the Laplacian). Faces below the configured thresholds almost
+always end up 'unknown', so they are rejected with a 'low_quality' status
+instead of costing a forward pass.
+"""
+
+import threading
+import logging
+
+import cv2
+import numpy as np
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+REASON_MESSAGES = {
+    'too_small': 'Face too small - move closer to the camera',
+    'turned': 'Face turned away - look at the camera',
+    'too_dark': 'Face too dark - improve lighting',
+    'too_bright': 'Face overexposed - reduce direct light',
+    'blurry': 'Face too blurry - hold still',
+}
+
+
+def pose_from_landmarks(kps):
+    """
+    Rough yaw/pitch estimate from 5-point landmarks
+
+    yaw: nose offset from the eye midpoint along the eye line, in units of
+        the eye distance (0 = frontal, about +-0.5 = strongly turned)
+    pitch: nose position between eye line and mouth line (about 0.5 frontal)
+
+    Returns:
+        (yaw, pitch) or None if the landmarks are degenerate
+    """
+    kps = np.asarray(kps, dtype=np.float32).reshape(5, 2)
+    left_eye, right_eye, nose, left_mouth, right_mouth = kps
+
+    eye_axis = right_eye - left_eye
+    eye_dist = float(np.linalg.norm(eye_axis))
+    if eye_dist < 1e-6:
+        return None
+    eye_axis /= eye_dist
+    down_axis = np.array([-eye_axis[1], eye_axis[0]], dtype=np.float32)  # Perpendicular, pointing to the mouth
+
+    eye_mid = (left_eye + right_eye) / 2
+    mouth_mid = (left_mouth + right_mouth) / 2
+
+    yaw = float(np.dot(nose - eye_mid, eye_axis)) / eye_dist
+    face_height = float(np.dot(mouth_mid - eye_mid, down_axis))
+    if face_height < 1e-6:
+        return None
+    pitch = float(np.dot(nose - eye_mid, down_axis)) / face_height
+
+    return yaw, pitch
+
+
+class FaceQualityGate:
+    """Rejects faces that are not worth embedding, counting each reason"""
+
+    def __init__(self, min_face_size=None, min_sharpness=None, min_brightness=None,
+                 max_brightness=None, max_yaw=None, max_pitch_offset=None):
+        """
+        Args (defaults from Config.QUALITY_*):
+            min_face_size: Minimum of bbox width/height in frame pixels
+            min_sharpness: Minimum Laplacian variance of the aligned crop
+            min_brightness / max_brightness: Mean gray level range of the crop
+            max_yaw: Maximum |yaw| from pose_from_landmarks
+            max_pitch_offset: Maximum |pitch - 0.5|
+        """
+        self.min_face_size = config.QUALITY_MIN_FACE_SIZE if min_face_size is None else min_face_size
+        self.min_sharpness = config.QUALITY_MIN_SHARPNESS if min_sharpness is None else min_sharpness
+        self.min_brightness = config.QUALITY_MIN_BRIGHTNESS if min_brightness is None else min_brightness
+        self.max_brightness = config.QUALITY_MAX_BRIGHTNESS if max_brightness is None else max_brightness
+        self.max_yaw = config.QUALITY_MAX_YAW if max_yaw is None else max_yaw
+        self.max_pitch_offset = config.QUALITY_MAX_PITCH_OFFSET if max_pitch_offset is None else max_pitch_offset
+
+        self._lock = threading.Lock()
+        self._checked = 0
+        self._rejected = {reason: 0 for reason in REASON_MESSAGES}
+
+    def score(self, crop, bbox, kps=None):
+        """Quality measurements of one face (no decision)"""
+        scores = {'face_size': int(min(bbox[2], bbox[3]))}
+
+        if kps is not None:
+            pose = pose_from_landmarks(kps)
+            if pose is not None:
+                scores['yaw'] = round(pose[0], 3)
+                scores['pitch'] = round(pose[1], 3)
+
+        gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+        scores['brightness'] = round(float(gray.mean()), 1)
+        scores['sharpness'] = round(float(cv2.Laplacian(gray, cv2.CV_64F).var()), 1)
+        return scores
+
+    def _reason(self, scores):
+        """First failed check, cheapest and most actionable first"""
+        if scores['face_size'] < self.min_face_size:
+            return 'too_small'
+        if 'yaw' in scores and (abs(scores['yaw']) > self.max_yaw
+                                or abs(scores['pitch'] - 0.5) > self.max_pitch_offset):
+            return 'turned'
+        if scores['brightness'] < self.min_brightness:
+            return 'too_dark'
+        if scores['brightness'] > self.max_brightness:
+            return 'too_bright'
+        if scores['sharpness'] < self.min_sharpness:
+            return 'blurry'
+        return None
+
+    def assess(self, crop, bbox, kps=None):
+        """
+        Decide whether a face is worth a FaceNet pass
+
+        Args:
+            crop: Aligned face crop (BGR, as returned by extract_face)
+            bbox: (x, y, w, h) of the face in the frame
+            kps: Optional 5-point landmarks
+
+        Returns:
+            None if the face passes, else a 'low_quality' result dict
+        """
+        scores = self.score(crop, bbox, kps)
+        reason = self._reason(scores)
+
+        with self._lock:
+            self._checked += 1
+            if reason is not None:
+                self._rejected[reason] += 1
+
+        if reason is None:
+            return None
+
+        return {
+            'status': 'low_quality',
+            'reason': reason,
+            'message': REASON_MESSAGES[reason],
+            'quality': scores
+        }
+
+    def stats(self):
+        with self._lock:
+            rejected = sum(self._rejected.values())
+            return {
+                'enabled': config.QUALITY_GATE_ENABLED,
+                'checked': self._checked,
+                'passed': self._checked - rejected,
+                'rejected': dict(self._rejected),
+                'embeddings_saved': rejected,
+                'reject_rate': round(rejected / self._checked, 3) if self._checked else 0.0
+            }
+
+
+# Global instance
+quality_gate = FaceQualityGate()
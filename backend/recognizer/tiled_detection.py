@@ -0,0 +1,169 @@
+"""
+Tiled detection for high-resolution classroom photos
+A 12 MP lecture-hall photo squeezed into one 640x640 detector input shrinks
+back-row faces below what SCRFD can find. The photo is split into
+overlapping tiles, each tile is detected at full detector resolution on a
+thread pool (ONNX Runtime releases the GIL), and boxes are merged across
+tiles with NMS that also drops partial faces cut by a tile border.
+"""
+
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from config import config
+from recognizer.detector import DetectionResult
+from recognizer.model_registry import model_registry
+
+logger = logging.getLogger(__name__)
+
+MERGE_IOU = 0.4  # Same face seen by two tiles
+MERGE_CONTAINMENT = 0.7  # Partial face: this share of its box lies inside a better one
+
+
+def tile_grid(width, height, tile_size, overlap):
+    """(x1, y1, x2, y2) tiles covering the image with the given overlap"""
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        stride = tile_size - overlap
+        positions = list(range(0, length - tile_size, stride))
+        positions.append(length - tile_size)  # Last tile flush with the edge
+        return positions
+
+    return [
+        (x, y, min(x + tile_size, width), min(y + tile_size, height))
+        for y in starts(height)
+        for x in starts(width)
+    ]
+
+
+def merge_detections(dets, kpss=None):
+    """
+    Greedy cross-tile NMS on (N, 5) [x1, y1, x2, y2, score] detections
+
+    A box is dropped if it overlaps a higher-scored box by IoU > MERGE_IOU,
+    or if more than MERGE_CONTAINMENT of its own area lies inside it (the
+    cut-off half of a face on a tile border).
+
+    Returns:
+        (dets, kpss) of the kept faces, highest score first
+    """
+    if len(dets) == 0:
+        return dets, kpss
+
+    boxes = dets[:, :4]
+    areas = np.maximum(boxes[:, 2] - boxes[:, 0], 0) * np.maximum(boxes[:, 3] - boxes[:, 1], 0)
+
+    keep = []
+    for i in np.argsort(-dets[:, 4]):
+        suppressed = False
+        for j in keep:
+            inter_w = min(boxes[i, 2], boxes[j, 2]) - max(boxes[i, 0], boxes[j, 0])
+            inter_h = min(boxes[i, 3], boxes[j, 3]) - max(boxes[i, 1], boxes[j, 1])
+            if inter_w <= 0 or inter_h <= 0:
+                continue
+            intersection = inter_w * inter_h
+            iou = intersection / max(areas[i] + areas[j] - intersection, 1e-9)
+            if iou > MERGE_IOU or intersection / max(areas[i], 1e-9) > MERGE_CONTAINMENT:
+                suppressed = True
+                break
+        if not suppressed:
+            keep.append(i)
+
+    keep = np.array(keep, dtype=int)
+    return dets[keep], (kpss[keep] if kpss is not None else None)
+
+
+class TiledDetector:
+    """Overlapping-tile SCRFD detection on the shared buffalo_l model"""
+
+    def __init__(self, tile_size=None, overlap=None, det_size=None, workers=None, det_thresh=None):
+        """
+        Args (defaults from Config.PHOTO_*):
+            tile_size: Tile side in image pixels
+            overlap: Overlap between neighbouring tiles in pixels (larger
+                than the biggest expected face)
+            det_size: Detector input size per tile
+            workers: Detection threads
+            det_thresh: Minimum detection score
+        """
+        self.tile_size = tile_size or config.PHOTO_TILE_SIZE
+        self.overlap = config.PHOTO_TILE_OVERLAP if overlap is None else overlap
+        self.det_size = (det_size or config.PHOTO_DET_SIZE,) * 2
+        self.workers = workers or config.PHOTO_DETECT_WORKERS
+        self.det_thresh = config.PHOTO_DET_THRESH if det_thresh is None else det_thresh
+
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='photo-tile')
+            return self._executor
+
+    def _detect_tile(self, rgb_img, tile):
+        x1, y1, x2, y2 = tile
+        crop = np.ascontiguousarray(rgb_img[y1:y2, x1:x2])
+        dets, kpss = model_registry.detect(crop, self.det_size, self.det_thresh)
+        if len(dets) == 0:
+            return dets, kpss
+
+        offset = np.array([x1, y1], dtype=np.float32)
+        dets = dets.copy()
+        dets[:, 0:2] += offset
+        dets[:, 2:4] += offset
+        if kpss is not None:
+            kpss = kpss + offset
+        return dets, kpss
+
+    def detect(self, img, stats=None):
+        """
+        Detect every face in a large image
+
+        Args:
+            img: BGR image
+            stats: Optional dict filled with tile count and raw/merged face counts
+
+        Returns:
+            DetectionResult in full-image coordinates, highest score first
+        """
+        height, width = img.shape[:2]
+        rgb_img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        tiles = tile_grid(width, height, self.tile_size, self.overlap)
+
+        started = time.perf_counter()
+        results = list(self._pool().map(lambda tile: self._detect_tile(rgb_img, tile), tiles))
+
+        found = [(dets, kpss) for dets, kpss in results if len(dets) > 0]
+        if found:
+            dets = np.concatenate([d for d, _ in found])
+            kpss = None
+            if all(k is not None for _, k in found):
+                kpss = np.concatenate([k for _, k in found])
+        else:
+            dets, kpss = np.zeros((0, 5), dtype=np.float32), None
+
+        raw_count = len(dets)
+        dets, kpss = merge_detections(dets, kpss)
+
+        if stats is not None:
+            stats.update({
+                'tiles': len(tiles),
+                'raw_detections': raw_count,
+                'faces': len(dets),
+                'tile_detect_ms': round((time.perf_counter() - started) * 1000, 1)
+            })
+
+        if len(dets) == 0:
+            return DetectionResult.empty()
+        return DetectionResult.from_xyxy(dets[:, :4], dets[:, 4], kpss)
+
+
+# Global instance
+tiled_detector = TiledDetector()
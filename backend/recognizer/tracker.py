@@ -0,0 +1,229 @@
+"""
+Per-session face tracking
+Assigns each frame's detections to tracks by IoU so that a face which was
+already recognized is not aligned, embedded and classified again while it
+stays in view; later frames only update its box.
+
+Tracks also accumulate evidence: each frame's normalized embedding is added
+to a running mean and the mean is what gets classified, so a borderline face
+is decided after a few frames instead of being re-sent indefinitely.
+"""
+
+import time
+import threading
+import logging
+
+import numpy as np
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """
+    Pairwise Intersection over Union of two sets of (x, y, w, h) boxes
+
+    Returns:
+        (len(boxes_a), len(boxes_b)) float array
+    """
+    a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+
+    ax2, ay2 = a[:, 0] + a[:, 2], a[:, 1] + a[:, 3]
+    bx2, by2 = b[:, 0] + b[:, 2], b[:, 1] + b[:, 3]
+
+    inter_w = np.clip(np.minimum(ax2[:, None], bx2[None, :]) - np.maximum(a[:, 0][:, None], b[:, 0][None, :]), 0, None)
+    inter_h = np.clip(np.minimum(ay2[:, None], by2[None, :]) - np.maximum(a[:, 1][:, None], b[:, 1][None, :]), 0, None)
+    intersection = inter_w * inter_h
+
+    union = (a[:, 2] * a[:, 3])[:, None] + (b[:, 2] * b[:, 3])[None, :] - intersection
+    return np.where(union > 0, intersection / np.maximum(union, 1e-9), 0.0)
+
+
+class Track:
+    """One face followed across frames"""
+
+    def __init__(self, track_id, bbox, now):
+        self.track_id = track_id
+        self.bbox = tuple(int(v) for v in bbox)
+        self.first_seen = now
+        self.last_seen = now
+        self.hits = 1
+        self.result = None  # Last classification result for this face
+        self.payload = None  # Last attendance response built for this face
+
+        # Evidence accumulated over frames
+        self.embedding_sum = None
+        self.frames = 0
+        self.rejected_until = None  # Given up on until this time (monotonic)
+
+    @property
+    def recognized(self):
+        """Once recognized, the track is not embedded or classified again"""
+        return self.result is not None and self.result.get('status') == 'recognized'
+
+    def decided(self, now=None):
+        """Recognized, or rejected and still inside the rejection cooldown"""
+        if self.recognized:
+            return True
+        if self.rejected_until is None:
+            return False
+
+        now = time.monotonic() if now is None else now
+        if now < self.rejected_until:
+            return True
+
+        # Cooldown over: start collecting evidence again
+        self.reset_evidence()
+        return False
+
+    def add_embedding(self, embedding):
+        """Add one frame's embedding and return the L2-normalized running mean"""
+        embedding = np.asarray(embedding, dtype=np.float32)
+        embedding = embedding / max(float(np.linalg.norm(embedding)), 1e-12)
+
+        self.embedding_sum = embedding if self.embedding_sum is None else self.embedding_sum + embedding
+        self.frames += 1
+
+        mean = self.embedding_sum / self.frames
+        return mean / max(float(np.linalg.norm(mean)), 1e-12)
+
+    def reject(self, cooldown, now=None):
+        """Stop embedding this face for `cooldown` seconds"""
+        now = time.monotonic() if now is None else now
+        self.rejected_until = now + cooldown
+
+    def reset_evidence(self):
+        self.embedding_sum = None
+        self.frames = 0
+        self.rejected_until = None
+        self.result = None
+
+    def to_dict(self):
+        return {
+            'track_id': self.track_id,
+            'bbox': {'x': self.bbox[0], 'y': self.bbox[1], 'w': self.bbox[2], 'h': self.bbox[3]},
+            'hits': self.hits,
+            'age_seconds': round(self.last_seen - self.first_seen, 1),
+            'recognized': self.recognized,
+            'rejected': self.rejected_until is not None,
+            'frames': self.frames,
+            'student_id': self.result.get('student_id') if self.recognized else None
+        }
+
+
+class FaceTracker:
+    """IoU tracker for one camera / attendance session"""
+
+    def __init__(self, iou_threshold=None, max_age=None):
+        """
+        Args:
+            iou_threshold: Minimum IoU to continue a track (Config.TRACK_IOU_THRESHOLD)
+            max_age: Seconds a track survives without a matching detection
+                (Config.TRACK_MAX_AGE_SECONDS)
+        """
+        self.iou_threshold = config.TRACK_IOU_THRESHOLD if iou_threshold is None else iou_threshold
+        self.max_age = config.TRACK_MAX_AGE_SECONDS if max_age is None else max_age
+        self.tracks = {}
+        self.last_update = time.monotonic()
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def update(self, bboxes, now=None):
+        """
+        Assign detections to tracks (greedy, highest IoU first)
+
+        Args:
+            bboxes: (N, 4) detections of the current frame as (x, y, w, h)
+
+        Returns:
+            list of N Track objects, aligned with bboxes
+        """
+        now = time.monotonic() if now is None else now
+        bboxes = np.asarray(bboxes).reshape(-1, 4)
+
+        with self._lock:
+            self.last_update = now
+
+            # Expire tracks that have not been seen for max_age seconds
+            for track_id in [tid for tid, t in self.tracks.items() if now - t.last_seen > self.max_age]:
+                del self.tracks[track_id]
+
+            track_list = list(self.tracks.values())
+            assigned = [None] * len(bboxes)
+
+            if track_list and len(bboxes):
+                ious = iou_matrix(bboxes, [t.bbox for t in track_list])
+
+                # Visit candidate pairs from best to worst IoU
+                det_idx, trk_idx = np.unravel_index(np.argsort(-ious, axis=None), ious.shape)
+                used_dets, used_trks = set(), set()
+                for d, t in zip(det_idx, trk_idx):
+                    if ious[d, t] < self.iou_threshold:
+                        break
+                    if d in used_dets or t in used_trks:
+                        continue
+                    used_dets.add(d)
+                    used_trks.add(t)
+
+                    track = track_list[t]
+                    track.bbox = tuple(int(v) for v in bboxes[d])
+                    track.last_seen = now
+                    track.hits += 1
+                    assigned[d] = track
+
+            # Unmatched detections start new tracks
+            for d, track in enumerate(assigned):
+                if track is None:
+                    track = Track(self._next_id, bboxes[d], now)
+                    self._next_id += 1
+                    self.tracks[track.track_id] = track
+                    assigned[d] = track
+
+            return assigned
+
+    def get(self, track_id):
+        return self.tracks.get(track_id)
+
+    def stats(self):
+        tracks = list(self.tracks.values())
+        return {
+            'tracks': len(tracks),
+            'recognized': sum(1 for t in tracks if t.recognized),
+            'rejected': sum(1 for t in tracks if t.rejected_until is not None),
+            'frames_embedded': sum(t.frames for t in tracks)
+        }
+
+
+class SessionTrackers:
+    """One FaceTracker per attendance session, dropped when idle"""
+
+    def __init__(self, idle_ttl=300):
+        self.idle_ttl = idle_ttl
+        self._trackers = {}
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        now = time.monotonic()
+        with self._lock:
+            # Drop trackers of sessions that stopped sending frames
+            for key in [k for k, t in self._trackers.items() if now - t.last_update > self.idle_ttl]:
+                del self._trackers[key]
+
+            key = str(session_id)
+            if key not in self._trackers:
+                self._trackers[key] = FaceTracker()
+            return self._trackers[key]
+
+    def drop(self, session_id):
+        with self._lock:
+            self._trackers.pop(str(session_id), None)
+
+    def stats(self):
+        with self._lock:
+            return {key: tracker.stats() for key, tracker in self._trackers.items()}
+
+
+# Global instance
+session_trackers = SessionTrackers()
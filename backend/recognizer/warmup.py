@@ -0,0 +1,143 @@
+"""
+Model preload and warm-up
+Loads the classifier, detectors and FaceNet at startup and runs a few
+inferences on synthetic frames so that ONNX Runtime / torch allocate their
+graphs before the first real request. /ready reports the result.
+"""
+
+import time
+import logging
+import threading
+
+import numpy as np
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+
+class ModelWarmup:
+    """Tracks load state and warm-up latency of each recognition component"""
+
+    COMPONENTS = ('classifier', 'detector', 'preview_detector', 'embedder')
+
+    def __init__(self, iterations=None):
+        self.iterations = max(1, iterations or config.WARMUP_ITERATIONS)
+        self.status = {
+            name: {'loaded': False, 'load_seconds': None, 'warmup_ms': None, 'error': None}
+            for name in self.COMPONENTS
+        }
+        self.started = False
+        self.finished = False
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def is_ready(self):
+        """True once every component loaded and warmed up"""
+        return self.finished and all(s['loaded'] for s in self.status.values())
+
+    def report(self):
+        return {
+            'ready': self.is_ready(),
+            'warming_up': self.started and not self.finished,
+            'components': self.status
+        }
+
+    def _step(self, name, load, warm):
+        """Load one component, then time `iterations` warm-up calls"""
+        entry = self.status[name]
+        try:
+            started = time.perf_counter()
+            target = load()
+            entry['load_seconds'] = round(time.perf_counter() - started, 2)
+
+            timings = []
+            for _ in range(self.iterations):
+                started = time.perf_counter()
+                warm(target)
+                timings.append((time.perf_counter() - started) * 1000)
+
+            # First call pays graph allocation; report both
+            entry['warmup_ms'] = {
+                'first': round(timings[0], 1),
+                'steady': round(float(np.median(timings[1:] or timings)), 1)
+            }
+            entry['loaded'] = True
+            print(f"✅ [Warmup] {name}: loaded in {entry['load_seconds']}s, "
+                  f"first {entry['warmup_ms']['first']}ms, steady {entry['warmup_ms']['steady']}ms")
+        except Exception as e:
+            entry['error'] = str(e)
+            logger.error(f"Warm-up of {name} failed: {e}", exc_info=True)
+            print(f"❌ [Warmup] {name} failed: {e}")
+
+    def run(self):
+        """Load and warm every component (blocking)"""
+        with self._lock:
+            if self.started:
+                return self.is_ready()
+            self.started = True
+
+        print("\n" + "="*60)
+        print("PRELOADING FACE RECOGNITION MODELS")
+        print("="*60)
+
+        rng = np.random.default_rng(0)
+        frame = rng.integers(0, 256, (480, 640, 3), dtype=np.uint8)
+        crops = rng.integers(0, 256, (config.INFERENCE_MAX_BATCH_SIZE, 160, 160, 3), dtype=np.uint8)
+
+        def load_classifier():
+            from recognizer.loader import model_loader
+            if not model_loader.is_loaded() and not model_loader.load_models():
+                raise RuntimeError('model_loader.load_models() failed')
+            from recognizer.classifier import face_recognizer
+            return face_recognizer
+
+        def warm_classifier(recognizer):
+            embeddings = rng.standard_normal((4, 512)).astype(np.float32)
+            recognizer._classify_embeddings(embeddings)
+
+        def load_detector():
+            from recognizer.detector import face_detector
+            if face_detector.detector is None:
+                raise RuntimeError('Face detector not initialized')
+            return face_detector
+
+        def load_preview_detector():
+            from recognizer.detector_improved import get_face_detector
+            # Create the preview detector now instead of on the first /detect-face
+            return get_face_detector()
+
+        def load_embedder():
+            from recognizer.embeddings_backend import embedding_generator
+            if embedding_generator is None or not embedding_generator.is_available():
+                raise RuntimeError('Embedding generator not available')
+            return embedding_generator
+
+        def warm_embedder(embedder):
+            # Single-face and full-batch shapes, as used by the scheduler
+            embedder.generate_embeddings(crops[:1])
+            embedder.generate_embeddings(crops)
+
+        self._step('classifier', load_classifier, warm_classifier)
+        self._step('detector', load_detector, lambda detector: detector.detect(frame))
+        self._step('preview_detector', load_preview_detector, lambda detector: detector.detect(frame, min_confidence=0.5))
+        self._step('embedder', load_embedder, warm_embedder)
+
+        self.finished = True
+        print(f"{'✅' if self.is_ready() else '⚠️ '} [Warmup] Ready: {self.is_ready()}")
+        print("="*60 + "\n")
+        return self.is_ready()
+
+    def start(self, background=True):
+        """Run the warm-up, by default on a daemon thread so the server can bind immediately"""
+        if not background:
+            return self.run()
+
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, name='model-warmup', daemon=True)
+            self._thread.start()
+        return False
+
+
+# Global instance
+model_warmup = ModelWarmup()
@@ -0,0 +1,164 @@
+"""
+Command-line client for the live streaming endpoint
+Drives /api/attendance/stream without a browser: logs in, opens the
+WebSocket, sends JPEG frames from a webcam, a video file or a folder of
+images at a fixed rate and prints every message the server pushes back.
+
+Usage:
+    python stream_client.py --username instructor1 --password secret --session-id 12 --camera 0
+    python stream_client.py --token <JWT> --session-id 12 --images dataset/processed --fps 5
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from pathlib import Path
+from urllib import request as urlrequest
+
+import cv2
+
+try:
+    from simple_websocket import Client, ConnectionClosed
+except ImportError:
+    print("❌ simple-websocket is required: pip install flask-sock")
+    sys.exit(1)
+
+
+def login(base_url, username, password):
+    """Get a JWT from /api/auth/login"""
+    body = json.dumps({'username': username, 'password': password}).encode('utf-8')
+    req = urlrequest.Request(f"{base_url}/api/auth/login", data=body,
+                             headers={'Content-Type': 'application/json'})
+    with urlrequest.urlopen(req) as response:
+        data = json.loads(response.read())
+    token = data.get('access_token') or data.get('token')
+    if not token:
+        raise RuntimeError(f"Login failed: {data}")
+    return token
+
+
+def frame_source(args):
+    """Yield BGR frames from the camera, a video file or an image folder"""
+    if args.images:
+        paths = sorted(p for p in Path(args.images).rglob('*') if p.suffix.lower() in ('.jpg', '.jpeg', '.png'))
+        for _ in range(args.loops):
+            for path in paths:
+                img = cv2.imread(str(path))
+                if img is not None:
+                    yield img
+        return
+
+    capture = cv2.VideoCapture(args.video if args.video else args.camera)
+    try:
+        while True:
+            ok, img = capture.read()
+            if not ok:
+                break
+            yield img
+    finally:
+        capture.release()
+
+
+def print_messages(ws, stats):
+    """Print server messages until the connection closes"""
+    try:
+        while True:
+            message = json.loads(ws.receive())
+            kind = message.get('type')
+            if kind == 'frame':
+                stats['frames'] += 1
+                faces = ', '.join(
+                    f"{f.get('student_name') or f.get('status')}"
+                    + (f" ({f['confidence']:.2f})" if isinstance(f.get('confidence'), (int, float)) else '')
+                    for f in message.get('faces', [])
+                ) or 'no face'
+                print(f"🖼️  frame {message['frame_id']}: {message.get('status')} - {faces} "
+                      f"[{message.get('processing_ms')}ms, dropped {message.get('dropped')}]")
+            elif kind == 'attendance':
+                stats['attendance'] += 1
+                print(f"✅ ATTENDANCE: {message.get('student_name')} ({message.get('student_id')}) "
+                      f"- {message.get('status')}")
+            elif kind == 'error':
+                print(f"❌ {message.get('error') or message.get('status')}: {message.get('message', '')}")
+            else:
+                print(f"ℹ️  {message}")
+    except (ConnectionClosed, TypeError):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stream frames to /api/attendance/stream')
+    parser.add_argument('--url', type=str, default='http://localhost:5000', help='Backend base URL')
+    parser.add_argument('--token', type=str, default=os.getenv('ATTENDANCE_TOKEN'), help='JWT (or use --username/--password)')
+    parser.add_argument('--username', type=str)
+    parser.add_argument('--password', type=str)
+    parser.add_argument('--session-id', type=str, required=True, help='Active attendance session')
+    parser.add_argument('--camera', type=int, default=0, help='Webcam index')
+    parser.add_argument('--video', type=str, help='Video file instead of the webcam')
+    parser.add_argument('--images', type=str, help='Folder of images instead of the webcam')
+    parser.add_argument('--loops', type=int, default=1, help='Passes over --images')
+    parser.add_argument('--fps', type=float, default=5.0, help='Frames sent per second')
+    parser.add_argument('--single-face', action='store_true', help='Disable multi-face mode')
+    args = parser.parse_args()
+
+    token = args.token
+    if not token:
+        if not (args.username and args.password):
+            parser.error('--token or --username/--password is required')
+        token = login(args.url, args.username, args.password)
+        print("✅ Logged in")
+
+    ws_url = args.url.replace('http://', 'ws://').replace('https://', 'wss://') + '/api/attendance/stream'
+    ws = Client.connect(ws_url)
+    ws.send(json.dumps({
+        'type': 'auth',
+        'token': token,
+        'session_id': args.session_id,
+        'multi_face': not args.single_face
+    }))
+
+    ready = json.loads(ws.receive(timeout=15))
+    if ready.get('type') != 'ready':
+        print(f"❌ Stream refused: {ready}")
+        ws.close()
+        return 1
+    print(f"✅ Streaming session {ready.get('session_id')} ({ready.get('course_name')})")
+
+    stats = {'sent': 0, 'frames': 0, 'attendance': 0}
+    printer = threading.Thread(target=print_messages, args=(ws, stats), daemon=True)
+    printer.start()
+
+    interval = 1.0 / args.fps if args.fps > 0 else 0
+    started = time.monotonic()
+    try:
+        for img in frame_source(args):
+            ok, jpeg = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, 85])
+            if ok:
+                ws.send(jpeg.tobytes())
+                stats['sent'] += 1
+            time.sleep(interval)
+        # Give the last frames time to come back
+        time.sleep(2)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        try:
+            ws.send(json.dumps({'type': 'close'}))
+        except ConnectionClosed:
+            pass
+        ws.close()
+
+    elapsed = time.monotonic() - started
+    print("\n" + "=" * 60)
+    print(f"Frames sent:       {stats['sent']} ({stats['sent'] / max(elapsed, 1e-9):.1f}/s)")
+    print(f"Frames processed:  {stats['frames']}")
+    print(f"Attendance events: {stats['attendance']}")
+    print("=" * 60)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""
+Test script for the attendance upsert outcomes
+Runs record_present against a recording stand-in for the database and
+checks that every earlier attendance state maps to the right /recognize
+status, including a record created by a concurrent request after
+load_student, and that only new records bump the session's
+attendance_count (no MySQL needed)
+"""
+
+import sys
+import os
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from utils.attendance_service import record_present
+
+SESSION = {'instructor_id': 1, 'section_id': 'A', 'year': '3', 'session_type': 'lab',
+           'time_block': 'morning', 'course_name': 'Networks', 'class_year': '3'}
+
+
+class RecordingDB:
+    """execute_query stand-in: records statements and answers from the attendance row it holds
+
+    locked is the row SELECT ... FOR UPDATE sees (None = no row, so
+    INSERT IGNORE inserts)
+    """
+
+    def __init__(self, locked=None):
+        self.locked = locked
+        self.queries = []
+
+    def execute_query(self, query, params=None, fetch=True, rowcount=False):
+        query = ' '.join(query.split())
+        self.queries.append(query)
+        if query.startswith('INSERT IGNORE'):
+            return 0 if self.locked else 1
+        if query.endswith('FOR UPDATE'):
+            return [self.locked] if self.locked else []
+        return 1 if rowcount else None
+
+    def ran(self, prefix):
+        return any(q.startswith(prefix) for q in self.queries)
+
+    @property
+    def counter_updates(self):
+        return sum(1 for q in self.queries if q.startswith('UPDATE sessions SET attendance_count'))
+
+
+def student(status=None, confidence=None):
+    return {'student_id': 'S1', 'name': 'Abebe', 'attendance_status': status,
+            'attendance_confidence': confidence, 'attendance_timestamp': None}
+
+
+def row(status, confidence):
+    return {'status': status, 'confidence': confidence, 'timestamp': None}
+
+
+def test_outcomes():
+    """Row seen by load_student + locked row + new confidence -> response status"""
+    print("\n" + "="*60)
+    print("TEST 1: Upsert outcome mapping")
+    print("="*60)
+
+    cases = [
+        # (description, load_student row, locked row, new confidence, expected status, counter bumps)
+        ('no record -> inserted', student(), None, 80.0, 'recognized', 1),
+        ('absent, high confidence', student('absent', 0), row('absent', 0), 80.0, 'updated_to_present', 0),
+        ('absent, too low to promote', student('absent', 0), row('absent', 0), 40.0, 'duplicate_blocked', 0),
+        ('present, better confidence', student('present', 70.0), row('present', 70.0), 85.0, 'confidence_updated', 0),
+        ('present, lower confidence', student('present', 90.0), row('present', 90.0), 85.0, 'already_present', 0),
+        # The locked row wins over what load_student saw before the lock
+        ('present, improved concurrently', student('present', 70.0), row('present', 90.0), 85.0, 'already_present', 0),
+    ]
+
+    passed = True
+    for description, earlier, locked, confidence, expected, bumps in cases:
+        db = RecordingDB(locked)
+        body = record_present(db, SESSION, 7, earlier, confidence, day='2026-10-17')
+        ok = body['status'] == expected and db.counter_updates == bumps
+        passed &= ok
+        print(f"{'✅' if ok else '❌'} {description}: {body['status']} "
+              f"(expected {expected}), counter +{db.counter_updates}")
+
+    return passed
+
+
+def test_no_prior_row():
+    """No row at load_student: only a real insert counts as a new record"""
+    print("\n" + "="*60)
+    print("TEST 2: No prior row")
+    print("="*60)
+
+    db = RecordingDB()
+    body = record_present(db, SESSION, 7, student(), 80.0, day='2026-10-17')
+    ok1 = (body['status'] == 'recognized' and db.counter_updates == 1
+           and not db.ran('INSERT INTO') and not db.ran('SELECT'))
+    print(f"{'✅' if ok1 else '❌'} insert affected 1 row -> {body['status']}, counter +{db.counter_updates}, no lock taken")
+
+    # A concurrent request inserted the row after load_student read nothing
+    db = RecordingDB(locked=row('present', 90.0))
+    body = record_present(db, SESSION, 7, student(), 85.0, day='2026-10-17')
+    ok2 = body['status'] == 'already_present' and db.counter_updates == 0 and db.ran('INSERT INTO')
+    print(f"{'✅' if ok2 else '❌'} insert lost the race -> {body['status']} "
+          f"(expected already_present), counter +{db.counter_updates}")
+
+    db = RecordingDB(locked=row('present', 60.0))
+    body = record_present(db, SESSION, 7, student(), 85.0, day='2026-10-17')
+    ok3 = body['status'] == 'confidence_updated' and db.counter_updates == 0
+    print(f"{'✅' if ok3 else '❌'} lost the race with a better confidence -> {body['status']}")
+
+    return ok1 and ok2 and ok3
+
+
+def test_promotion_keeps_best_confidence():
+    """Promoting an absent record reports the higher of old and new confidence"""
+    print("\n" + "="*60)
+    print("TEST 3: Absent promotion confidence")
+    print("="*60)
+
+    db = RecordingDB(locked=row('absent', 92.0))
+    body = record_present(db, SESSION, 7, student('absent', 92.0), 60.0, day='2026-10-17')
+    ok = body['status'] == 'updated_to_present' and body['confidence'] == 92.0
+    print(f"{'✅' if ok else '❌'} confidence {body['confidence']} (expected 92.0)")
+    return ok
+
+
+def main():
+    results = [test_outcomes(), test_no_prior_row(), test_promotion_keeps_best_confidence()]
+    passed = all(results)
+
+    print("\n" + "="*60)
+    print("✅ ALL TESTS PASSED" if passed else "❌ SOME TESTS FAILED")
+    print("="*60)
+    return 0 if passed else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""
+Test script for the MySQL ConnectionPool
+Checks overflow connections, bounded waiting (timeout and overload), pre-ping
+and recycling with stand-in connections (no MySQL needed)
+"""
+
+import sys
+import os
+import time
+import threading
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from db.pool import ConnectionPool, PoolTimeout, PoolOverloaded
+
+
+class FakeRaw:
+    """mysql.connector connection stand-in"""
+
+    def __init__(self):
+        self.closed = False
+        self.rollbacks = 0
+        self.ping_fails = False
+
+    def ping(self, reconnect=False):
+        if self.ping_fails:
+            raise ConnectionError('MySQL server has gone away')
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnectionPool(ConnectionPool):
+    """ConnectionPool that opens FakeRaw connections and remembers them"""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('pool_size', 2)
+        kwargs.setdefault('max_overflow', 1)
+        kwargs.setdefault('timeout', 0.2)
+        kwargs.setdefault('max_waiters', 5)
+        kwargs.setdefault('pre_ping', True)
+        kwargs.setdefault('recycle_seconds', 0)
+        super().__init__({}, **kwargs)
+        # Exact sizes, whatever DB_MAX_CONNECTIONS budget the local .env sets
+        self.pool_size, self.max_overflow = kwargs['pool_size'], kwargs['max_overflow']
+        self.opened = []
+
+    def _connect(self):
+        raw = FakeRaw()
+        self.opened.append(raw)
+        self._opened_at[id(raw)] = time.monotonic()
+        return raw
+
+
+def test_overflow():
+    """Overflow connections absorb a burst and are closed when returned"""
+    print("\n" + "="*60)
+    print("TEST 1: Overflow")
+    print("="*60)
+
+    pool = FakeConnectionPool()
+    conns = [pool.get_connection() for _ in range(3)]
+    ok1 = pool.metrics()['open'] == 3 and pool.metrics()['in_use'] == 3
+    print(f"{'✅' if ok1 else '❌'} pool 2 + overflow 1: {pool.metrics()['open']} open")
+
+    for conn in conns:
+        conn.close()
+    metrics = pool.metrics()
+    ok2 = metrics['idle'] == 2 and metrics['open'] == 2 and sum(raw.closed for raw in pool.opened) == 1
+    ok3 = all(raw.rollbacks == 1 for raw in pool.opened)
+    print(f"{'✅' if ok2 else '❌'} after return: {metrics['idle']} idle, overflow connection closed")
+    print(f"{'✅' if ok3 else '❌'} every returned connection rolled back")
+
+    reused = pool.get_connection()
+    ok4 = len(pool.opened) == 3
+    reused.close()
+    print(f"{'✅' if ok4 else '❌'} idle connection reused instead of opening a new one")
+
+    return ok1 and ok2 and ok3 and ok4
+
+
+def test_bounded_wait():
+    """Checkouts wait for a returned connection, then time out or fail fast"""
+    print("\n" + "="*60)
+    print("TEST 2: Timeout and overload")
+    print("="*60)
+
+    pool = FakeConnectionPool()
+    held = [pool.get_connection() for _ in range(3)]
+
+    started = time.monotonic()
+    try:
+        pool.get_connection(timeout=0.1)
+        ok1 = False
+    except PoolTimeout:
+        ok1 = pool.metrics()['timeouts'] == 1 and time.monotonic() - started >= 0.1
+    print(f"{'✅' if ok1 else '❌'} exhausted pool times out after the checkout timeout")
+
+    # A waiter gets the connection another thread returns
+    threading.Timer(0.05, held.pop().close).start()
+    try:
+        waited = pool.get_connection(timeout=1.0)
+        ok2 = len(pool.opened) == 3
+        waited.close()
+    except PoolTimeout:
+        ok2 = False
+    print(f"{'✅' if ok2 else '❌'} waiting checkout served by a returned connection")
+
+    busy = FakeConnectionPool(max_waiters=0)
+    busy_held = [busy.get_connection() for _ in range(3)]
+    try:
+        busy.get_connection(timeout=1.0)
+        ok3 = False
+    except PoolOverloaded:
+        ok3 = busy.metrics()['overloaded'] == 1
+    print(f"{'✅' if ok3 else '❌'} too many waiters -> PoolOverloaded without waiting")
+
+    for conn in held + busy_held:
+        conn.close()
+    return ok1 and ok2 and ok3
+
+
+def test_ping_and_recycle():
+    """Dead or old idle connections are replaced before being handed out"""
+    print("\n" + "="*60)
+    print("TEST 3: Pre-ping and recycling")
+    print("="*60)
+
+    pool = FakeConnectionPool()
+    first = pool.get_connection()
+    raw = pool.opened[0]
+    first.close()
+    raw.ping_fails = True  # e.g. MySQL restarted while the connection was idle
+
+    replacement = pool.get_connection()
+    ok1 = raw.closed and len(pool.opened) == 2 and pool.metrics()['pings_failed'] == 1
+    replacement.close()
+    print(f"{'✅' if ok1 else '❌'} failed ping -> connection discarded and replaced")
+
+    pool = FakeConnectionPool(recycle_seconds=0.05)
+    pool.get_connection().close()
+    time.sleep(0.1)
+    recycled = pool.get_connection()
+    metrics = pool.metrics()
+    ok2 = pool.opened[0].closed and len(pool.opened) == 2 and metrics['recycled'] == 1 and metrics['open'] == 1
+    recycled.close()
+    print(f"{'✅' if ok2 else '❌'} connection older than recycle_seconds reopened ({metrics['open']} open)")
+
+    try:
+        recycled.cursor()
+        ok3 = False
+    except Exception:
+        ok3 = True
+    print(f"{'✅' if ok3 else '❌'} returned connection can no longer be used")
+
+    return ok1 and ok2 and ok3
+
+
+def main():
+    results = [test_overflow(), test_bounded_wait(), test_ping_and_recycle()]
+    passed = all(results)
+
+    print("\n" + "="*60)
+    print("✅ ALL TESTS PASSED" if passed else "❌ SOME TESTS FAILED")
+    print("="*60)
+    return 0 if passed else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
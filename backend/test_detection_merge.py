@@ -0,0 +1,172 @@
+"""
+Test script for detection region merging and NMS
+Checks how coarse-to-fine proposals are merged into crops (size cap, crowded
+fallback), the duplicate suppression across crops, and the tile grid and
+cross-tile merge of tiled photo detection, on synthetic boxes with a
+stand-in for the shared detection model (no models needed)
+"""
+
+import sys
+import os
+
+import numpy as np
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from recognizer import coarse_to_fine
+from recognizer.coarse_to_fine import CoarseToFineDetector, _merge_regions, _nms
+from recognizer.tiled_detection import tile_grid, merge_detections
+
+
+class FakeRegistry:
+    """Returns fixed coarse proposals and records the det_size of every call"""
+
+    def __init__(self, proposals):
+        self.proposals = np.asarray(proposals, dtype=np.float32)
+        self.sizes = []
+
+    def detect(self, rgb_img, det_size, det_thresh=None):
+        self.sizes.append(tuple(det_size))
+        if len(self.sizes) == 1:
+            return self.proposals, None
+        # Later passes: one face in the middle of whatever was passed in
+        h, w = rgb_img.shape[:2]
+        box = [[w * 0.4, h * 0.4, w * 0.6, h * 0.6, 0.9]]
+        return np.asarray(box, dtype=np.float32), None
+
+
+def row_of_faces(count, size=30, gap=10, y=100):
+    """(x1, y1, x2, y2, score) proposals side by side, like a classroom row"""
+    return [[x, y, x + size, y + size, 0.8] for x in range(20, 20 + count * (size + gap), size + gap)]
+
+
+def test_merge_regions():
+    """Overlapping regions merge, but never beyond max_side"""
+    print("\n" + "="*60)
+    print("TEST 1: Region merging")
+    print("="*60)
+
+    merged = _merge_regions([[0, 0, 50, 50], [40, 40, 90, 90], [200, 200, 250, 250]])
+    ok1 = sorted(merged) == [[0, 0, 90, 90], [200, 200, 250, 250]]
+    print(f"{'✅' if ok1 else '❌'} uncapped: {merged}")
+
+    chain = [[x, 0, x + 60, 60] for x in range(0, 1000, 50)]
+    uncapped = _merge_regions(chain)
+    capped = _merge_regions(chain, max_side=320)
+    widest = max(r[2] - r[0] for r in capped)
+    ok2 = len(uncapped) == 1 and len(capped) > 1 and widest <= 320
+    print(f"{'✅' if ok2 else '❌'} chain of {len(chain)}: uncapped -> {len(uncapped)} region, "
+          f"capped -> {len(capped)} regions (widest {widest}px)")
+
+    big = _merge_regions([[0, 0, 500, 500], [400, 400, 450, 450]], max_side=320)
+    ok3 = len(big) == 2
+    print(f"{'✅' if ok3 else '❌'} a region already above the cap is left alone")
+
+    return ok1 and ok2 and ok3
+
+
+def test_crowded_fallback():
+    """A crowded frame falls back to one 640 pass instead of one huge crop"""
+    print("\n" + "="*60)
+    print("TEST 2: Crowded frame fallback")
+    print("="*60)
+
+    img = np.zeros((720, 1280, 3), dtype=np.uint8)
+    original = coarse_to_fine.model_registry
+    try:
+        detector = CoarseToFineDetector(coarse_size=320, fine_size=160, crop_expand=1.0,
+                                        max_crops=8, max_region_scale=2.0)
+
+        # Three rows of 30 small faces: a full lecture hall
+        crowd = FakeRegistry(row_of_faces(30, y=100) + row_of_faces(30, y=300) + row_of_faces(30, y=500))
+        coarse_to_fine.model_registry = crowd
+        regions = detector.regions(crowd.proposals, img.shape)
+        detector.detect(img)
+        ok1 = len(regions) > 8 and crowd.sizes[-1] == (640, 640) and len(crowd.sizes) == 2
+        print(f"{'✅' if ok1 else '❌'} 90 faces -> {len(regions)} capped regions, passes {crowd.sizes}")
+
+        few = FakeRegistry(row_of_faces(3) + [[900, 500, 930, 530, 0.8]])
+        coarse_to_fine.model_registry = few
+        result = detector.detect(img)
+        fine_passes = few.sizes[1:]
+        ok2 = fine_passes and all(size == (160, 160) for size in fine_passes) and result.num_faces == len(fine_passes)
+        print(f"{'✅' if ok2 else '❌'} 4 faces -> {len(fine_passes)} fine pass(es) at 160, {result.num_faces} face(s)")
+    finally:
+        coarse_to_fine.model_registry = original
+
+    return ok1 and bool(ok2)
+
+
+def test_nms():
+    """Duplicates from overlapping crops collapse to the best-scored box"""
+    print("\n" + "="*60)
+    print("TEST 3: Cross-crop NMS")
+    print("="*60)
+
+    boxes = np.array([[10, 10, 40, 40], [11, 10, 40, 40], [100, 100, 40, 40]], dtype=np.float32)
+    scores = np.array([0.7, 0.9, 0.8])
+    keep = _nms(boxes, scores)
+    ok = keep.tolist() == [1, 2]
+    print(f"{'✅' if ok else '❌'} kept {keep.tolist()} (expected [1, 2])")
+    return ok
+
+
+def test_tile_grid():
+    """Tiles cover the photo, overlap by the requested amount and end flush"""
+    print("\n" + "="*60)
+    print("TEST 4: Tile grid")
+    print("="*60)
+
+    tiles = tile_grid(4000, 3000, 1280, 256)
+    xs = sorted({t[0] for t in tiles})
+    covered = max(t[2] for t in tiles) == 4000 and max(t[3] for t in tiles) == 3000
+    overlaps = all(b - a <= 1280 - 256 for a, b in zip(xs, xs[1:]))
+    sized = all(t[2] - t[0] == 1280 and t[3] - t[1] == 1280 for t in tiles)
+    ok1 = covered and overlaps and sized
+    print(f"{'✅' if ok1 else '❌'} 4000x3000 -> {len(tiles)} tiles, x starts {xs}")
+
+    ok2 = tile_grid(800, 600, 1280, 256) == [(0, 0, 800, 600)]
+    print(f"{'✅' if ok2 else '❌'} photo smaller than a tile -> one tile")
+
+    return ok1 and ok2
+
+
+def test_merge_detections():
+    """Cross-tile NMS drops duplicates and faces cut by a tile border"""
+    print("\n" + "="*60)
+    print("TEST 5: Cross-tile merge")
+    print("="*60)
+
+    dets = np.array([
+        [100, 100, 160, 170, 0.95],  # Face seen whole in tile A
+        [102, 101, 161, 170, 0.90],  # Same face seen whole in tile B
+        [130, 100, 160, 170, 0.85],  # Right half of it, cut by tile A's border
+        [500, 500, 560, 570, 0.80],  # Another face
+    ], dtype=np.float32)
+    kpss = np.arange(4 * 5 * 2, dtype=np.float32).reshape(4, 5, 2)
+
+    kept, kept_kps = merge_detections(dets, kpss)
+    ok1 = kept[:, 4].tolist() == dets[[0, 3], 4].tolist() and np.array_equal(kept_kps, kpss[[0, 3]])
+    print(f"{'✅' if ok1 else '❌'} kept scores {np.round(kept[:, 4], 2).tolist()} (expected [0.95, 0.8])")
+
+    empty, empty_kps = merge_detections(np.zeros((0, 5), dtype=np.float32), None)
+    ok2 = len(empty) == 0 and empty_kps is None
+    print(f"{'✅' if ok2 else '❌'} no detections -> nothing kept")
+
+    return ok1 and ok2
+
+
+def main():
+    results = [test_merge_regions(), test_crowded_fallback(), test_nms(),
+               test_tile_grid(), test_merge_detections()]
+    passed = all(results)
+
+    print("\n" + "="*60)
+    print("✅ ALL TESTS PASSED" if passed else "❌ SOME TESTS FAILED")
+    print("="*60)
+    return 0 if passed else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
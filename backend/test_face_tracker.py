@@ -0,0 +1,128 @@
+"""
+Test script for the per-session IoU face tracker
+Checks IoU computation, track assignment across frames, expiry of unseen
+tracks and the per-track evidence (running mean embedding, rejection
+cooldown) on synthetic boxes and embeddings (no models needed)
+"""
+
+import sys
+import os
+
+import numpy as np
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from recognizer.tracker import FaceTracker, Track, iou_matrix
+
+
+def test_iou_matrix():
+    """Identical, disjoint and half-overlapping (x, y, w, h) boxes"""
+    print("\n" + "="*60)
+    print("TEST 1: IoU matrix")
+    print("="*60)
+
+    ious = iou_matrix([[0, 0, 10, 10]], [[0, 0, 10, 10], [20, 20, 10, 10], [5, 0, 10, 10]])
+    expected = [1.0, 0.0, 50 / 150]
+    ok = ious.shape == (1, 3) and np.allclose(ious[0], expected)
+    print(f"{'✅' if ok else '❌'} IoU {np.round(ious[0], 3).tolist()} (expected {np.round(expected, 3).tolist()})")
+
+    empty = iou_matrix(np.zeros((0, 4)), [[0, 0, 10, 10]])
+    ok_empty = empty.shape == (0, 1)
+    print(f"{'✅' if ok_empty else '❌'} no detections -> shape {empty.shape}")
+
+    return ok and ok_empty
+
+
+def test_assignment():
+    """Moving faces keep their track IDs; a new face gets a new one"""
+    print("\n" + "="*60)
+    print("TEST 2: Track assignment")
+    print("="*60)
+
+    tracker = FaceTracker(iou_threshold=0.3, max_age=10)
+    first = tracker.update([[0, 0, 50, 50], [200, 0, 50, 50]], now=0.0)
+    # Same faces shifted a little (listed in the other order), plus a newcomer
+    second = tracker.update([[205, 3, 50, 50], [4, 2, 50, 50], [400, 400, 50, 50]], now=0.5)
+
+    ok1 = second[0] is first[1] and second[1] is first[0]
+    ok2 = second[2].track_id not in (first[0].track_id, first[1].track_id)
+    ok3 = first[0].hits == 2 and first[0].bbox == (4, 2, 50, 50) and len(tracker.tracks) == 3
+    print(f"{'✅' if ok1 else '❌'} moved faces keep their tracks")
+    print(f"{'✅' if ok2 else '❌'} new face starts track {second[2].track_id}")
+    print(f"{'✅' if ok3 else '❌'} track box and hit count updated")
+
+    # Two detections competing for one track: only the better match keeps it
+    tracker = FaceTracker(iou_threshold=0.3, max_age=10)
+    track = tracker.update([[0, 0, 50, 50]], now=0.0)[0]
+    competing = tracker.update([[20, 0, 50, 50], [2, 0, 50, 50]], now=0.1)
+    ok4 = competing[1] is track and competing[0] is not track
+    print(f"{'✅' if ok4 else '❌'} best IoU wins when detections compete")
+
+    return ok1 and ok2 and ok3 and ok4
+
+
+def test_expiry():
+    """Tracks unseen for max_age seconds are dropped"""
+    print("\n" + "="*60)
+    print("TEST 3: Track expiry")
+    print("="*60)
+
+    tracker = FaceTracker(iou_threshold=0.3, max_age=2)
+    old = tracker.update([[0, 0, 50, 50]], now=0.0)[0]
+    new = tracker.update([[0, 0, 50, 50]], now=5.0)[0]
+
+    ok = new is not old and old.track_id not in tracker.tracks and len(tracker.tracks) == 1
+    print(f"{'✅' if ok else '❌'} face seen again after max_age gets a fresh track")
+    return ok
+
+
+def test_evidence():
+    """Running mean of normalized embeddings, recognition and rejection cooldown"""
+    print("\n" + "="*60)
+    print("TEST 4: Evidence aggregation")
+    print("="*60)
+
+    rng = np.random.default_rng(0)
+    identity = rng.normal(size=512)
+    identity /= np.linalg.norm(identity)
+
+    track = Track(1, (0, 0, 50, 50), now=0.0)
+    single = None
+    for n in range(8):
+        noisy = identity + 0.1 * rng.normal(size=512)
+        mean = track.add_embedding(noisy * (n + 1))  # Scale must not matter
+        if single is None:
+            single = float(mean @ identity)
+    aggregated = float(mean @ identity)
+
+    ok1 = track.frames == 8 and abs(np.linalg.norm(mean) - 1.0) < 1e-5
+    ok2 = aggregated > single
+    print(f"{'✅' if ok1 else '❌'} mean stays unit length over {track.frames} frames")
+    print(f"{'✅' if ok2 else '❌'} similarity to identity: 1 frame {single:.3f} -> 8 frames {aggregated:.3f}")
+
+    track.reject(30, now=100.0)
+    ok3 = track.decided(now=110.0) and not track.recognized
+    ok4 = not track.decided(now=131.0) and track.frames == 0 and track.embedding_sum is None
+    print(f"{'✅' if ok3 else '❌'} rejected track skipped during cooldown")
+    print(f"{'✅' if ok4 else '❌'} evidence reset once the cooldown is over")
+
+    track.result = {'status': 'recognized', 'student_id': 'S1'}
+    ok5 = track.decided(now=0.0) and track.to_dict()['student_id'] == 'S1'
+    print(f"{'✅' if ok5 else '❌'} recognized track is decided for good")
+
+    return ok1 and ok2 and ok3 and ok4 and ok5
+
+
+def main():
+    results = [test_iou_matrix(), test_assignment(), test_expiry(), test_evidence()]
+    passed = all(results)
+
+    print("\n" + "="*60)
+    print("✅ ALL TESTS PASSED" if passed else "❌ SOME TESTS FAILED")
+    print("="*60)
+    return 0 if passed else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,10 +6,7 @@ Verifies embedding distribution matches between training and inference
 import numpy as np
 import pickle
 from pathlib import Path
-import torch
 from PIL import Image
-from torchvision import transforms
-from facenet_pytorch import InceptionResnetV1
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -72,15 +69,8 @@ def test_inference_pipeline():
     logger.info("TEST 2: Inference Pipeline")
     logger.info("="*60)
     
-    # Initialize FaceNet (same as inference)
-    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-    facenet = InceptionResnetV1(pretrained='vggface2').eval().to(device)
-    
-    transform = transforms.Compose([
-        transforms.Resize((160, 160)),
-        transforms.ToTensor(),
-        transforms.Normalize(mean=[0.5, 0.5, 0.5], std=[0.5, 0.5, 0.5])
-    ])
+    # Use the runtime embedder (same as inference)
+    from recognizer.embeddings_facenet import embedding_generator
     
     # Find a test image
     dataset_path = Path('dataset/processed')
@@ -93,25 +83,12 @@ def test_inference_pipeline():
     logger.info(f"Testing {len(test_images)} images...")
     
     norms = []
-    with torch.no_grad():
-        for img_path in test_images:
-            try:
-                # Load and process image
-                img = Image.open(img_path).convert('RGB')
-                img_tensor = transform(img).unsqueeze(0).to(device)
-                
-                # Generate embedding
-                embedding = facenet(img_tensor).cpu().numpy().flatten()
-                
-                # Apply L2 normalization (as in inference)
-                norm = np.linalg.norm(embedding)
-                if norm > 0:
-                    embedding = embedding / norm
-                
-                norms.append(np.linalg.norm(embedding))
-                
-            except Exception as e:
-                logger.error(f"Error processing {img_path}: {e}")
+    try:
+        faces = [np.asarray(Image.open(img_path).convert('RGB')) for img_path in test_images]
+        embeddings = embedding_generator.generate_embeddings(faces, bgr=False)
+        norms = list(np.linalg.norm(embeddings, axis=1))
+    except Exception as e:
+        logger.error(f"Error generating embeddings: {e}")
     
     if len(norms) > 0:
         norms = np.array(norms)
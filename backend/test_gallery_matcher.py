@@ -0,0 +1,96 @@
+"""
+Test script for the cosine-similarity GalleryMatcher
+Checks top-k ordering, the open-set threshold and candidate restriction on
+synthetic embeddings (no trained model needed)
+"""
+
+import sys
+import os
+
+import numpy as np
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from recognizer.gallery import GalleryMatcher
+
+
+def make_gallery(mode='centroid', classes=None):
+    """Three students with 4 noisy enrollment embeddings around random centers"""
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(3, 512)).astype(np.float32)
+    X = np.concatenate([center + 0.05 * rng.normal(size=(4, 512)) for center in centers])
+    y = np.repeat(np.arange(3), 4)
+    classes = np.array(['S1', 'S2', 'S3']) if classes is None else classes
+    return GalleryMatcher.from_embeddings(X, y, classes, threshold=0.65, mode=mode), centers
+
+
+def test_top_k():
+    """The query's own student ranks first, scores sorted descending"""
+    print("\n" + "="*60)
+    print("TEST 1: Top-k matching")
+    print("="*60)
+
+    passed = True
+    for mode in ('centroid', 'templates'):
+        gallery, centers = make_gallery(mode)
+        results = gallery.match_batch(centers, top_k=3)
+        for expected, result in zip(['S1', 'S2', 'S3'], results):
+            sims = [c['similarity'] for c in result['top_k']]
+            ok = (result['status'] == 'recognized' and result['student_id'] == expected
+                  and len(sims) == 3 and sims == sorted(sims, reverse=True))
+            passed &= ok
+            print(f"{'✅' if ok else '❌'} [{mode}] {expected} -> {result.get('student_id')} {[round(s, 3) for s in sims]}")
+
+    return passed
+
+
+def test_threshold():
+    """An unrelated face is 'unknown' and still reports its best guess"""
+    print("\n" + "="*60)
+    print("TEST 2: Open-set threshold")
+    print("="*60)
+
+    gallery, _ = make_gallery()
+    stranger = np.random.default_rng(1).normal(size=512)
+    result = gallery.match(stranger, top_k=2)
+
+    ok = result['status'] == 'unknown' and 'top_prediction' in result and len(result['top_k']) == 2
+    print(f"{'✅' if ok else '❌'} stranger: {result['status']} (similarity {result['confidence']:.3f})")
+    return ok
+
+
+def test_restrict():
+    """Restriction keeps only the requested students, for int or str IDs"""
+    print("\n" + "="*60)
+    print("TEST 3: Candidate restriction")
+    print("="*60)
+
+    gallery, centers = make_gallery(mode='templates')
+    sub = gallery.restrict({'S2', 'S3'})
+    result = sub.match(centers[0], top_k=3)
+    ok1 = len(sub) == 2 and {c['student_id'] for c in result['top_k']} == {'S2', 'S3'}
+    print(f"{'✅' if ok1 else '❌'} restrict to S2/S3: {len(sub)} students, top-k {[c['student_id'] for c in result['top_k']]}")
+
+    # Integer labels with string candidate IDs (and vice versa)
+    int_gallery, _ = make_gallery(classes=np.array([101, 102, 103]))
+    ok2 = int_gallery.restrict({'102'}) is not None and len(int_gallery.restrict({'102'})) == 1
+    ok3 = gallery.restrict({'S9'}) is None
+    print(f"{'✅' if ok2 else '❌'} int labels restricted by str ID")
+    print(f"{'✅' if ok3 else '❌'} unknown candidates -> None")
+
+    return ok1 and ok2 and ok3
+
+
+def main():
+    results = [test_top_k(), test_threshold(), test_restrict()]
+    passed = all(results)
+
+    print("\n" + "="*60)
+    print("✅ ALL TESTS PASSED" if passed else "❌ SOME TESTS FAILED")
+    print("="*60)
+    return 0 if passed else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""
+Test script for model version directories
+Publishes versions from a temporary model directory and checks which files
+end up in them when an admin upload replaces the classifier pickle, and the
+order rollback walks back through (no trained model needed)
+"""
+
+import io
+import sys
+import os
+import json
+import tempfile
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from recognizer.loader import ModelLoader
+from recognizer.native_model import NATIVE_MANIFEST
+
+
+def write_files(model_dir, files):
+    for filename, content in files.items():
+        with open(os.path.join(model_dir, filename), 'wb') as f:
+            f.write(content)
+
+
+def read_file(loader, version, filename):
+    path = os.path.join(loader.versions_path, version, filename)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_upload_drops_native():
+    """A pickle uploaded over a version with native files does not inherit them"""
+    print("\n" + "="*60)
+    print("TEST 1: Pickle upload over native files")
+    print("="*60)
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        write_files(model_dir, {
+            'face_classifier_v1.pkl': b'old classifier',
+            'label_encoder_classes.npy': b'classes',
+            NATIVE_MANIFEST: b'{}',
+            'native_coef.npy': b'old weights',
+        })
+        loader = ModelLoader(model_path=model_dir)
+
+        base = loader.create_version(source_dir=model_dir)
+        ok1 = read_file(loader, base, NATIVE_MANIFEST) is not None
+        print(f"{'✅' if ok1 else '❌'} plain copy keeps the native files")
+
+        # What admin upload_model does
+        uploaded = loader.create_version(source_dir=loader._version_dir(base),
+                                         overrides={'face_classifier_v1.pkl': io.BytesIO(b'new classifier')})
+        manifest = loader.read_manifest(uploaded)
+        ok2 = (read_file(loader, uploaded, 'face_classifier_v1.pkl') == b'new classifier'
+               and read_file(loader, uploaded, NATIVE_MANIFEST) is None
+               and read_file(loader, uploaded, 'native_coef.npy') is None
+               and 'native_coef.npy' not in manifest['files'])
+        ok3 = read_file(loader, uploaded, 'label_encoder_classes.npy') == b'classes'
+        print(f"{'✅' if ok2 else '❌'} uploaded pickle -> stale native files dropped")
+        print(f"{'✅' if ok3 else '❌'} other files still copied from the base version")
+
+        both = loader.create_version(source_dir=loader._version_dir(base), overrides={
+            'face_classifier_v1.pkl': io.BytesIO(b'new classifier'),
+            NATIVE_MANIFEST: io.BytesIO(b'{"new": true}'),
+        })
+        ok4 = read_file(loader, both, NATIVE_MANIFEST) == b'{"new": true}'
+        print(f"{'✅' if ok4 else '❌'} native files uploaded with the pickle are kept")
+
+    return ok1 and ok2 and ok3 and ok4
+
+
+def test_version_order():
+    """Versions are ordered by creation, not by name ('-10' comes after '-2')"""
+    print("\n" + "="*60)
+    print("TEST 2: Version order")
+    print("="*60)
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        loader = ModelLoader(model_path=model_dir)
+        names = ['v20261017-090000'] + [f'v20261017-090000-{n}' for n in range(2, 12)]
+        for n, name in enumerate(names):
+            os.makedirs(os.path.join(loader.versions_path, name))
+            with open(os.path.join(loader.versions_path, name, 'manifest.json'), 'w') as f:
+                json.dump({'version': name, 'created_at': f'2026-10-17T09:00:00.{n:06d}', 'files': {}}, f)
+
+        listed = [manifest['version'] for manifest in loader.list_versions()]
+        ok1 = listed == names[::-1]
+        print(f"{'✅' if ok1 else '❌'} newest first: {listed[:3]}...")
+
+        ok2 = (loader._previous_on_disk('v20261017-090000-10') == 'v20261017-090000-9'
+               and loader._previous_on_disk('v20261017-090000-2') == 'v20261017-090000'
+               and loader._previous_on_disk('v20261017-090000') is None)
+        print(f"{'✅' if ok2 else '❌'} rollback from -10 goes to -9, from -2 to the first version")
+
+    return ok1 and ok2
+
+
+def main():
+    results = [test_upload_drops_native(), test_version_order()]
+    passed = all(results)
+
+    print("\n" + "="*60)
+    print("✅ ALL TESTS PASSED" if passed else "❌ SOME TESTS FAILED")
+    print("="*60)
+    return 0 if passed else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""
+Test script for the pickle-free native model format
+Trains small sklearn classifiers on synthetic embeddings, writes them with
+save_native and checks that the memory-mapped native classifier reproduces
+sklearn's predict_proba for binary and multi-class problems, and that
+native files go stale when the pickle they came from is rewritten
+"""
+
+import sys
+import os
+import pickle
+import tempfile
+
+import numpy as np
+from sklearn.svm import SVC
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from recognizer.native_model import save_native, load_native, native_matches_sources, remove_native, has_native
+
+PARITY_ATOL = 1e-6
+
+
+def make_data(num_classes, per_class=12, dim=32):
+    """Noisy clusters of unit vectors, one per student"""
+    rng = np.random.default_rng(num_classes)
+    centers = rng.normal(size=(num_classes, dim))
+    X = np.concatenate([center + 0.8 * rng.normal(size=(per_class, dim)) for center in centers])
+    X /= np.linalg.norm(X, axis=1, keepdims=True)
+    y = np.repeat(np.arange(num_classes), per_class)
+    queries = rng.normal(size=(40, dim))
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return X, y, np.concatenate([X[::3], queries])
+
+
+def check_parity(name, classifier, num_classes):
+    """Fit, round-trip through the native files and compare predict_proba"""
+    X, y, queries = make_data(num_classes)
+    scaler = StandardScaler().fit(X)
+    classifier.fit(scaler.transform(X), y)
+    expected = classifier.predict_proba(scaler.transform(queries))
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        save_native(model_dir, classifier, scaler=scaler, classes=[f'S{i}' for i in range(num_classes)])
+        native = load_native(model_dir)
+        actual = native['classifier'].predict_proba(native['scaler'].transform(queries))
+
+    max_diff = float(np.abs(expected - actual).max())
+    ok = max_diff <= PARITY_ATOL and np.array_equal(expected.argmax(axis=1), actual.argmax(axis=1))
+    print(f"{'✅' if ok else '❌'} {name} k={num_classes}: max |Δ proba| {max_diff:.2e}")
+    return ok
+
+
+def test_svc_parity():
+    """Linear SVC: libsvm pairwise coupling, binary sign convention included"""
+    print("\n" + "="*60)
+    print("TEST 1: Linear SVC parity")
+    print("="*60)
+
+    results = [
+        check_parity('SVC', SVC(kernel='linear', probability=True, random_state=0), num_classes)
+        for num_classes in (2, 3, 5)
+    ]
+    return all(results)
+
+
+def test_logistic_parity():
+    """LogisticRegression: one-vs-rest (binary) and multinomial"""
+    print("\n" + "="*60)
+    print("TEST 2: LogisticRegression parity")
+    print("="*60)
+
+    results = [
+        check_parity('LogisticRegression', LogisticRegression(max_iter=1000), num_classes)
+        for num_classes in (2, 4)
+    ]
+    return all(results)
+
+
+def test_rejects_unsupported():
+    """Non-linear kernels cannot be stored as weight matrices"""
+    print("\n" + "="*60)
+    print("TEST 3: Unsupported classifiers")
+    print("="*60)
+
+    X, y, _ = make_data(3)
+    classifier = SVC(kernel='rbf', probability=True, random_state=0).fit(X, y)
+    with tempfile.TemporaryDirectory() as model_dir:
+        try:
+            save_native(model_dir, classifier)
+            ok = False
+        except ValueError as e:
+            ok = True
+            print(f"   {e}")
+
+    print(f"{'✅' if ok else '❌'} RBF SVC rejected")
+    return ok
+
+
+def test_stale_sources():
+    """A pickle rewritten after the conversion makes the native files stale"""
+    print("\n" + "="*60)
+    print("TEST 4: Source hashes")
+    print("="*60)
+
+    X, y, _ = make_data(3)
+    classifier = LogisticRegression(max_iter=1000).fit(X, y)
+    with tempfile.TemporaryDirectory() as model_dir:
+        pickle_path = os.path.join(model_dir, 'face_classifier_v1.pkl')
+        with open(pickle_path, 'wb') as f:
+            pickle.dump({'classifier': classifier}, f)
+        save_native(model_dir, classifier)
+        ok1, _ = native_matches_sources(model_dir)
+        print(f"{'✅' if ok1 else '❌'} freshly converted files match the pickle")
+
+        # Retrained without writing native files
+        with open(pickle_path, 'wb') as f:
+            pickle.dump({'classifier': LogisticRegression(max_iter=1000).fit(X, y[::-1])}, f)
+        current, reason = native_matches_sources(model_dir)
+        ok2 = not current and 'face_classifier_v1.pkl' in reason
+        print(f"{'✅' if ok2 else '❌'} rewritten pickle detected: {reason}")
+
+        ok3 = len(remove_native(model_dir)) > 1 and not has_native(model_dir) and os.path.exists(pickle_path)
+        print(f"{'✅' if ok3 else '❌'} remove_native deletes only the native files")
+
+    return ok1 and ok2 and ok3
+
+
+def main():
+    results = [test_svc_parity(), test_logistic_parity(), test_rejects_unsupported(), test_stale_sources()]
+    passed = all(results)
+
+    print("\n" + "="*60)
+    print("✅ ALL TESTS PASSED" if passed else "❌ SOME TESTS FAILED")
+    print("="*60)
+    return 0 if passed else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
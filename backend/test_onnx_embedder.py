@@ -0,0 +1,111 @@
+"""
+Test script for the ONNX Runtime FaceNet backend
+Checks parity against the torch embedder and benchmarks both backends
+
+Run after: python export_facenet_onnx.py
+"""
+
+import sys
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import cv2
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from recognizer.embeddings_facenet import FaceNetEmbeddingGenerator
+from recognizer.embeddings_onnx import OnnxEmbeddingGenerator
+
+PARITY_THRESHOLD = 0.999
+
+
+def load_faces(count=32):
+    """Load dataset face crops, padding with random faces if needed"""
+    faces = []
+    for img_path in sorted(Path('dataset/processed').rglob('*.jpg'))[:count]:
+        img = cv2.imread(str(img_path))
+        if img is not None:
+            faces.append(cv2.resize(img, (160, 160)))
+
+    rng = np.random.default_rng(42)
+    while len(faces) < count:
+        faces.append(rng.integers(0, 256, (160, 160, 3), dtype=np.uint8))
+
+    return np.stack(faces)
+
+
+def test_parity(torch_gen, onnx_gen, faces):
+    """ONNX embeddings must match torch embeddings (cosine > 0.999)"""
+    print("\n" + "="*60)
+    print("TEST 1: Parity (torch vs ONNX)")
+    print("="*60)
+
+    torch_emb = torch_gen.generate_embeddings(faces)
+    onnx_emb = onnx_gen.generate_embeddings(faces)
+
+    # Both are L2-normalized, so the row-wise dot product is the cosine
+    cosine = np.sum(torch_emb * onnx_emb, axis=1)
+
+    print(f"Faces compared: {len(cosine)}")
+    print(f"Cosine min:  {cosine.min():.6f}")
+    print(f"Cosine mean: {cosine.mean():.6f}")
+
+    if cosine.min() > PARITY_THRESHOLD:
+        print(f"✅ Parity OK (all > {PARITY_THRESHOLD})")
+        return True
+
+    print(f"❌ Parity FAILED ({np.sum(cosine <= PARITY_THRESHOLD)} face(s) <= {PARITY_THRESHOLD})")
+    return False
+
+
+def benchmark(torch_gen, onnx_gen, faces, repeats=10):
+    """Compare per-call latency of both backends at several batch sizes"""
+    print("\n" + "="*60)
+    print("TEST 2: Latency benchmark")
+    print("="*60)
+    print(f"{'batch':>6} {'torch (ms)':>12} {'onnx (ms)':>12} {'speedup':>9}")
+
+    for batch_size in (1, 8, len(faces)):
+        batch = faces[:batch_size]
+        timings = {}
+
+        for name, gen in (('torch', torch_gen), ('onnx', onnx_gen)):
+            gen.generate_embeddings(batch)  # Warm-up
+            start = time.perf_counter()
+            for _ in range(repeats):
+                gen.generate_embeddings(batch, batch_size=batch_size)
+            timings[name] = (time.perf_counter() - start) / repeats * 1000
+
+        print(f"{batch_size:>6} {timings['torch']:>12.1f} {timings['onnx']:>12.1f} "
+              f"{timings['torch'] / timings['onnx']:>8.2f}x")
+
+    return True
+
+
+def main():
+    torch_gen = FaceNetEmbeddingGenerator()
+    onnx_gen = OnnxEmbeddingGenerator()
+
+    if not torch_gen.is_available():
+        print("❌ Torch FaceNet not available")
+        return 1
+    if not onnx_gen.is_available():
+        print("❌ ONNX FaceNet not available - run: python export_facenet_onnx.py")
+        return 1
+
+    faces = load_faces()
+
+    passed = test_parity(torch_gen, onnx_gen, faces)
+    benchmark(torch_gen, onnx_gen, faces)
+
+    print("\n" + "="*60)
+    print("✅ ALL TESTS PASSED" if passed else "❌ PARITY TEST FAILED")
+    print("="*60)
+    return 0 if passed else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
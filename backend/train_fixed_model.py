@@ -13,8 +13,7 @@ from datetime import datetime
 from PIL import Image
 import torch
 
-from torchvision import transforms
-from facenet_pytorch import MTCNN, InceptionResnetV1
+from facenet_pytorch import MTCNN
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 from sklearn.svm import SVC
 from sklearn.model_selection import train_test_split
@@ -22,6 +21,8 @@ from sklearn.metrics import classification_report, accuracy_score
 import logging
 from tqdm import tqdm
 
+from recognizer.embeddings_facenet import FaceNetEmbeddingGenerator
+
 # Set random seeds
 np.random.seed(42)
 torch.manual_seed(42)
@@ -64,22 +65,17 @@ class FixedProductionTrainer:
             min_face_size=20,
             thresholds=[0.6, 0.7, 0.7],
             factor=0.709,
-            post_process=True,
+            post_process=False,  # Raw 0-255 crops; the embedder normalizes
             device=self.device,
             keep_all=False
         )
         
-        # Initialize FaceNet (same as inference)
-        self.facenet = InceptionResnetV1(pretrained='vggface2').eval().to(self.device)
+        # Initialize FaceNet (same batched embedder as inference)
+        self.embedder = FaceNetEmbeddingGenerator()
+        if not self.embedder.is_available():
+            raise RuntimeError("FaceNet embedding generator could not be initialized")
         logger.info("✅ Loaded FaceNet InceptionResnetV1 (vggface2) - 512-dim embeddings")
         
-        # Transform (same as inference)
-        self.transform = transforms.Compose([
-            transforms.Resize((160, 160)),
-            transforms.ToTensor(),
-            transforms.Normalize(mean=[0.5, 0.5, 0.5], std=[0.5, 0.5, 0.5])
-        ])
-        
         # Storage
         self.image_paths = []
         self.labels = []
@@ -126,11 +122,12 @@ class FixedProductionTrainer:
         if len(self.image_paths) == 0:
             raise ValueError("No images found in dataset")
     
-    def extract_embeddings(self):
+    def extract_embeddings(self, batch_size=32):
         """
         Extract 512-dimensional embeddings with L2 normalization
         
-        CRITICAL FIX: Applies L2 normalization to match inference pipeline
+        CRITICAL FIX: Uses the same batched FaceNet embedder as inference,
+        which L2-normalizes every embedding
         """
         logger.info("Extracting embeddings with L2 normalization...")
         logger.info("⚠️  IMPORTANT: Embeddings will be L2-normalized to match inference")
@@ -140,46 +137,52 @@ class FixedProductionTrainer:
         valid_paths = []
         failed_count = 0
         
-        with torch.no_grad():
-            for img_path, label in tqdm(zip(self.image_paths, self.labels), 
-                                       total=len(self.image_paths), 
-                                       desc="Extracting embeddings"):
-                try:
-                    # Load image
-                    img = Image.open(img_path).convert('RGB')
-                    
-                    # Try MTCNN detection first
-                    face_tensor = self.mtcnn(img)
-                    
-                    # If MTCNN fails, use direct resize (images are pre-cropped)
-                    if face_tensor is None:
-                        img_resized = img.resize((160, 160))
-                        face_tensor = self.transform(img_resized).unsqueeze(0)
-                    else:
-                        face_tensor = face_tensor.unsqueeze(0)
-                    
-                    # Extract embedding
-                    face_tensor = face_tensor.to(self.device)
-                    embedding = self.facenet(face_tensor).cpu().numpy().flatten()
-                    
-                    # Verify dimension
-                    if embedding.shape[0] != 512:
-                        logger.error(f"Invalid embedding dimension: {embedding.shape[0]} for {img_path}")
-                        failed_count += 1
-                        continue
-                    
-                    # ⭐ CRITICAL FIX: L2-normalize embedding (same as inference)
-                    norm = np.linalg.norm(embedding)
-                    if norm > 0:
-                        embedding = embedding / norm
-                    
-                    embeddings_list.append(embedding)
-                    valid_labels.append(label)
-                    valid_paths.append(img_path)
-                    
-                except Exception as e:
-                    logger.error(f"Error processing {img_path}: {e}")
-                    failed_count += 1
+        # Face crops are collected per image, then embedded batch_size at a time
+        pending_faces = []
+        pending_labels = []
+        pending_paths = []
+        
+        def flush_pending():
+            if not pending_faces:
+                return
+            # ⭐ Same preprocessing and normalization as inference
+            embeddings_list.extend(
+                self.embedder.generate_embeddings(pending_faces, batch_size=batch_size, bgr=False)
+            )
+            valid_labels.extend(pending_labels)
+            valid_paths.extend(pending_paths)
+            pending_faces.clear()
+            pending_labels.clear()
+            pending_paths.clear()
+        
+        for img_path, label in tqdm(zip(self.image_paths, self.labels), 
+                                   total=len(self.image_paths), 
+                                   desc="Extracting embeddings"):
+            try:
+                # Load image
+                img = Image.open(img_path).convert('RGB')
+                
+                # Try MTCNN detection first
+                face_tensor = self.mtcnn(img)
+                
+                # If MTCNN fails, use direct resize (images are pre-cropped)
+                if face_tensor is None:
+                    face = np.asarray(img.resize((160, 160)))
+                else:
+                    face = face_tensor.permute(1, 2, 0).clamp(0, 255).byte().cpu().numpy()
+                
+                pending_faces.append(face)
+                pending_labels.append(label)
+                pending_paths.append(img_path)
+                
+                if len(pending_faces) >= batch_size:
+                    flush_pending()
+                
+            except Exception as e:
+                logger.error(f"Error processing {img_path}: {e}")
+                failed_count += 1
+        
+        flush_pending()
         
         self.embeddings = np.array(embeddings_list)
         self.labels = valid_labels
@@ -350,6 +353,19 @@ class FixedProductionTrainer:
         np.save(classes_path, self.label_encoder.classes_)
         logger.info(f"✅ Saved: {classes_path}")
         
+        # Pickle-free copy for the backend loader (memory-mapped .npy arrays),
+        # written after the pickle artifacts whose hashes it records
+        from recognizer.native_model import save_native, remove_native
+        try:
+            native_path = save_native(self.output_path, self.classifier, scaler=self.scaler,
+                                      label_encoder=self.label_encoder, metadata=metadata)
+            logger.info(f"✅ Saved: {native_path} (native format)")
+        except Exception as e:
+            # Native files from an earlier run would no longer match the pickle
+            removed = remove_native(self.output_path)
+            logger.warning(f"Native format not written: {e}"
+                           + (f" (removed {len(removed)} stale native files)" if removed else ""))
+        
         # Save embeddings (L2-normalized)
         X_path = self.output_path / 'X.npy'
         y_path = self.output_path / 'y.npy'
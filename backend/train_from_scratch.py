@@ -47,6 +47,8 @@ from sklearn.metrics import accuracy_score, classification_report
 from sklearn.svm import SVC
 from sklearn.linear_model import LogisticRegression
 
+from recognizer.native_model import remove_native
+
 
 def find_image_files(dataset_dir: Path) -> List[Tuple[str, Path]]:
     """Return list of tuples (student_id, image_path)"""
@@ -244,10 +246,15 @@ def main(argv=None):
     with open(threshold_path, 'w') as f:
         f.write(str(threshold))
 
+    # Native files from an earlier conversion no longer match the new pickle
+    removed = remove_native(model_dir)
+
     print(f"💾 Saved classifier to {classifier_path}")
     print(f"💾 Saved label encoder to {encoder_path}")
     print(f"💾 Saved label classes to {classes_path}")
     print(f"💾 Saved open-set threshold to {threshold_path}")
+    if removed:
+        print(f"🗑️  Removed {len(removed)} stale native files (convert_model_native.py regenerates them)")
 
     print('\n✅ Training complete. Artifacts are ready to be used by the backend.')
     print('Next steps:')
@@ -14,8 +14,7 @@ from datetime import datetime
 from PIL import Image
 import torch
 
-from torchvision import transforms
-from facenet_pytorch import MTCNN, InceptionResnetV1
+from facenet_pytorch import MTCNN
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 from sklearn.svm import SVC
 from sklearn.linear_model import LogisticRegression
@@ -24,6 +23,8 @@ from sklearn.metrics import classification_report, accuracy_score, confusion_mat
 import logging
 from tqdm import tqdm
 
+from recognizer.embeddings_facenet import FaceNetEmbeddingGenerator
+
 # Set random seeds for reproducibility
 np.random.seed(42)
 torch.manual_seed(42)
@@ -61,21 +62,17 @@ class ProductionTrainer:
             min_face_size=20,
             thresholds=[0.6, 0.7, 0.7],
             factor=0.709,
-            post_process=True,
+            post_process=False,  # Raw 0-255 crops; the embedder normalizes
             device=self.device,
             keep_all=False
         )
         
-        self.facenet = InceptionResnetV1(pretrained='vggface2').eval().to(self.device)
+        # Same batched embedder as inference (L2-normalized output)
+        self.embedder = FaceNetEmbeddingGenerator()
+        if not self.embedder.is_available():
+            raise RuntimeError("FaceNet embedding generator could not be initialized")
         logger.info("Loaded FaceNet InceptionResnetV1 (vggface2) - 512-dim embeddings")
         
-        # Data augmentation transforms
-        self.transform = transforms.Compose([
-            transforms.Resize((160, 160)),
-            transforms.ToTensor(),
-            transforms.Normalize(mean=[0.5, 0.5, 0.5], std=[0.5, 0.5, 0.5])
-        ])
-        
         # Storage
         self.image_paths = []
         self.labels = []
@@ -131,42 +128,51 @@ class ProductionTrainer:
         valid_paths = []
         failed_count = 0
         
-        # Process images one by one (simpler and more reliable)
-        with torch.no_grad():
-            for img_path, label in tqdm(zip(self.image_paths, self.labels), 
-                                       total=len(self.image_paths), 
-                                       desc="Extracting embeddings"):
-                try:
-                    # Load and detect face
-                    img = Image.open(img_path).convert('RGB')
-                    
-                    # Try MTCNN detection first
-                    face_tensor = self.mtcnn(img)
-                    
-                    # If MTCNN fails, use direct resize (images are pre-cropped)
-                    if face_tensor is None:
-                        img_resized = img.resize((160, 160))
-                        face_tensor = self.transform(img_resized).unsqueeze(0)
-                    else:
-                        face_tensor = face_tensor.unsqueeze(0)
-                    
-                    # Extract embedding
-                    face_tensor = face_tensor.to(self.device)
-                    embedding = self.facenet(face_tensor).cpu().numpy().flatten()
-                    
-                    # Verify dimension
-                    if embedding.shape[0] != 512:
-                        logger.error(f"Invalid embedding dimension: {embedding.shape[0]} for {img_path}")
-                        failed_count += 1
-                        continue
-                    
-                    embeddings_list.append(embedding)
-                    valid_labels.append(label)
-                    valid_paths.append(img_path)
-                    
-                except Exception as e:
-                    logger.error(f"Error processing {img_path}: {e}")
-                    failed_count += 1
+        # Face crops are collected per image, then embedded batch_size at a time
+        pending_faces = []
+        pending_labels = []
+        pending_paths = []
+        
+        def flush_pending():
+            if not pending_faces:
+                return
+            embeddings_list.extend(
+                self.embedder.generate_embeddings(pending_faces, batch_size=batch_size, bgr=False)
+            )
+            valid_labels.extend(pending_labels)
+            valid_paths.extend(pending_paths)
+            pending_faces.clear()
+            pending_labels.clear()
+            pending_paths.clear()
+        
+        for img_path, label in tqdm(zip(self.image_paths, self.labels), 
+                                   total=len(self.image_paths), 
+                                   desc="Extracting embeddings"):
+            try:
+                # Load and detect face
+                img = Image.open(img_path).convert('RGB')
+                
+                # Try MTCNN detection first
+                face_tensor = self.mtcnn(img)
+                
+                # If MTCNN fails, use direct resize (images are pre-cropped)
+                if face_tensor is None:
+                    face = np.asarray(img.resize((160, 160)))
+                else:
+                    face = face_tensor.permute(1, 2, 0).clamp(0, 255).byte().cpu().numpy()
+                
+                pending_faces.append(face)
+                pending_labels.append(label)
+                pending_paths.append(img_path)
+                
+                if len(pending_faces) >= batch_size:
+                    flush_pending()
+                
+            except Exception as e:
+                logger.error(f"Error processing {img_path}: {e}")
+                failed_count += 1
+        
+        flush_pending()
         
         self.embeddings = np.array(embeddings_list)
         self.labels = valid_labels
@@ -265,7 +271,7 @@ class ProductionTrainer:
         
         return threshold
     
-    def save_model(self, threshold, accuracy):
+    def save_model(self, threshold, accuracy, head='svc'):
         """Save model artifacts in backend-compatible format"""
         logger.info("Saving model artifacts...")
         
@@ -278,6 +284,8 @@ class ProductionTrainer:
             'classes': self.label_encoder.classes_.tolist(),
             'threshold': float(threshold),
             'classifier_type': type(self.classifier).__name__,
+            'classifier_head': head,  # 'svc' or 'gallery' (cosine match on X.npy)
+            'gallery_mode': 'centroid',
             'accuracy': float(accuracy),
             'training_date': datetime.now().isoformat(),
             'python_version': sys.version,
@@ -303,6 +311,19 @@ class ProductionTrainer:
         np.save(classes_path, self.label_encoder.classes_)
         logger.info(f"✓ Saved: {classes_path}")
         
+        # Pickle-free copy for the backend loader (memory-mapped .npy arrays),
+        # written after the pickle artifacts whose hashes it records
+        from recognizer.native_model import save_native, remove_native
+        try:
+            native_path = save_native(self.output_path, self.classifier, scaler=self.scaler,
+                                      label_encoder=self.label_encoder, metadata=metadata)
+            logger.info(f"✓ Saved: {native_path} (native format)")
+        except Exception as e:
+            # Native files from an earlier run would no longer match the pickle
+            removed = remove_native(self.output_path)
+            logger.warning(f"Native format not written: {e}"
+                           + (f" (removed {len(removed)} stale native files)" if removed else ""))
+        
         # Save embeddings and labels (optional, for analysis)
         X_path = self.output_path / 'X.npy'
         y_path = self.output_path / 'y.npy'
@@ -351,7 +372,7 @@ class ProductionTrainer:
         logger.info(f"  - training_summary.txt (summary)")
         logger.info("="*60)
         
-    def train(self, classifier_type='svm', threshold_percentile=95):
+    def train(self, classifier_type='svm', threshold_percentile=95, head='svc'):
         """Complete training pipeline"""
         try:
             logger.info("\n" + "="*60)
@@ -373,7 +394,7 @@ class ProductionTrainer:
             threshold = self.calculate_threshold(X_train_scaled, percentile=threshold_percentile)
             
             # Step 5: Save model
-            self.save_model(threshold, accuracy)
+            self.save_model(threshold, accuracy, head=head)
             
             logger.info("\n✓ Training completed successfully!")
             return True
@@ -399,6 +420,9 @@ def main():
                        help='Classifier type')
     parser.add_argument('--threshold-percentile', type=int, default=95,
                        help='Percentile for confidence threshold (1-100)')
+    parser.add_argument('--head', type=str, default='svc',
+                       choices=['svc', 'gallery'],
+                       help='Classification head the backend should load')
     
     args = parser.parse_args()
     
@@ -411,7 +435,8 @@ def main():
     # Train model
     success = trainer.train(
         classifier_type=args.classifier,
-        threshold_percentile=args.threshold_percentile
+        threshold_percentile=args.threshold_percentile,
+        head=args.head
     )
     
     if success:
@@ -0,0 +1,233 @@
+"""
+Attendance recording service
+Records a recognized student on the unique_attendance (student_id,
+session_id, date) key instead of select-then-insert-then-catch-1062:
+
+- no row yet (per load_student): INSERT IGNORE; 1 affected row means this
+  request created the record, 0 that a concurrent request got there first
+- existing row: read with SELECT ... FOR UPDATE, then one
+  INSERT ... ON DUPLICATE KEY UPDATE applies the absent->present promotion
+  and the GREATEST confidence rule in SQL
+
+The outcome comes from the INSERT IGNORE result and the locked row, never
+from the upsert's affected rows (an unchanged row reports 0 or 1 depending
+on CLIENT_FOUND_ROWS). Run record_present inside db.transaction() so the
+lock holds until the upsert commits.
+"""
+
+from datetime import date, timedelta
+
+from utils.timezone_helper import get_ethiopian_time
+
+# An absent record is promoted to present only above this confidence
+ABSENT_PROMOTION_MIN_CONFIDENCE = 50
+
+# Student row plus today's attendance row for the session, in one round trip
+STUDENT_WITH_ATTENDANCE_QUERY = '''
+    SELECT s.*, a.status AS attendance_status, a.confidence AS attendance_confidence,
+           a.timestamp AS attendance_timestamp
+    FROM students s
+    LEFT JOIN attendance a
+        ON a.student_id = s.student_id AND a.session_id = %s AND a.date = %s
+    WHERE s.student_id = %s
+'''
+
+# Today's attendance row, locked until the transaction ends
+LOCK_ATTENDANCE_QUERY = '''
+    SELECT status, confidence, timestamp
+    FROM attendance
+    WHERE student_id = %s AND session_id = %s AND date = %s
+    FOR UPDATE
+'''
+
+_PRESENT_ROW = '''
+    INTO attendance
+        (student_id, session_id, instructor_id, section_id, year,
+         session_type, time_block, course_name, class_year,
+         timestamp, date, confidence, status)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 'present')
+'''
+
+# 1 affected row = inserted, 0 = the row already exists (whatever CLIENT_FOUND_ROWS says)
+INSERT_PRESENT_QUERY = 'INSERT IGNORE' + _PRESENT_ROW
+
+# Assignments run left to right and later ones see earlier results, so
+# timestamp and confidence are decided from the old status before it changes
+UPSERT_PRESENT_QUERY = 'INSERT' + _PRESENT_ROW + '''
+    ON DUPLICATE KEY UPDATE
+        timestamp = IF((status = 'absent' AND VALUES(confidence) > %s)
+                       OR (status = 'present' AND VALUES(confidence) > confidence),
+                       VALUES(timestamp), timestamp),
+        confidence = IF((status = 'absent' AND VALUES(confidence) > %s) OR status = 'present',
+                        GREATEST(confidence, VALUES(confidence)), confidence),
+        status = IF(status = 'absent' AND VALUES(confidence) > %s, 'present', status)
+'''
+
+# What record_present did
+OUTCOME_INSERTED = 'inserted'
+OUTCOME_PROMOTED = 'promoted'
+OUTCOME_CONFIDENCE_UPDATED = 'confidence_updated'
+OUTCOME_BLOCKED = 'blocked'
+OUTCOME_UNCHANGED = 'unchanged'
+
+
+def load_student(db, student_id, session_id, day=None):
+    """
+    Student row with today's attendance for the session
+
+    Returns:
+        dict with the students columns plus attendance_status,
+        attendance_confidence and attendance_timestamp (None when the
+        student has no record yet), or None if the student does not exist
+    """
+    day = day or date.today().isoformat()
+    result = db.execute_query(STUDENT_WITH_ATTENDANCE_QUERY, (session_id, day, student_id))
+    return result[0] if result else None
+
+
+def _time_since(timestamp, now):
+    """Elapsed time since a stored (naive = UTC) timestamp"""
+    if not timestamp:
+        return timedelta(0)
+    if timestamp.tzinfo is None:
+        from utils.timezone_helper import UTC_TZ
+        timestamp = UTC_TZ.localize(timestamp)
+    return now - timestamp.astimezone(now.tzinfo)
+
+
+def upsert_outcome(previous_status, previous_confidence, confidence):
+    """
+    What the upsert does to an existing row, from that row as locked before it
+
+    Mirrors the ON DUPLICATE KEY UPDATE rules.
+
+    Args:
+        previous_status: status of the locked row
+        previous_confidence: confidence of the locked row
+        confidence: Confidence being written
+
+    Returns:
+        One of the OUTCOME_* constants other than OUTCOME_INSERTED
+    """
+    if previous_status == 'absent':
+        if confidence > ABSENT_PROMOTION_MIN_CONFIDENCE:
+            return OUTCOME_PROMOTED
+        return OUTCOME_BLOCKED
+
+    if previous_status == 'present' and confidence > previous_confidence:
+        return OUTCOME_CONFIDENCE_UPDATED
+
+    return OUTCOME_UNCHANGED
+
+
+def record_present(db, session, session_id, student, confidence, day=None):
+    """
+    Mark a recognized student present (call inside db.transaction())
+
+    Args:
+        student: Row from load_student; without an attendance row the
+            student gets an INSERT IGNORE before any lock is taken
+        confidence: Recognition confidence
+
+    Returns:
+        dict response payload with the status values of /recognize:
+        recognized, updated_to_present, confidence_updated, already_present
+        or duplicate_blocked
+    """
+    student_id = student['student_id']
+    name = student.get('name')
+    day = day or date.today().isoformat()
+    now = get_ethiopian_time()
+
+    values = (student_id, session_id, session.get('instructor_id'), session.get('section_id', ''),
+              session.get('year', ''), session.get('session_type', ''), session.get('time_block', ''),
+              session.get('course_name', ''), session.get('class_year', ''), now, day, confidence)
+
+    # No FOR UPDATE while the row is missing: locking the gap lets two
+    # first recognitions of the same student deadlock each other
+    inserted = False
+    if student.get('attendance_status') is None:
+        # 0 when a concurrent request created the record since load_student
+        inserted = db.execute_query(INSERT_PRESENT_QUERY, values, fetch=False, rowcount=True) == 1
+
+    if inserted:
+        outcome = OUTCOME_INSERTED
+    else:
+        locked = db.execute_query(LOCK_ATTENDANCE_QUERY, (student_id, session_id, day))
+        previous = locked[0]
+        previous_status = previous['status']
+        previous_confidence = float(previous['confidence'] or 0)
+        previous_timestamp = previous['timestamp']
+
+        db.execute_query(
+            UPSERT_PRESENT_QUERY,
+            values + (ABSENT_PROMOTION_MIN_CONFIDENCE,) * 3,
+            fetch=False
+        )
+        outcome = upsert_outcome(previous_status, previous_confidence, confidence)
+
+    if outcome == OUTCOME_INSERTED:
+        # Only new records count toward the session total
+        db.execute_query(
+            'UPDATE sessions SET attendance_count = attendance_count + 1 WHERE id = %s',
+            (session_id,),
+            fetch=False
+        )
+        print(f"✓ NEW attendance recorded: {name}")
+        return {
+            'status': 'recognized',
+            'student_id': student_id,
+            'student_name': name,
+            'confidence': confidence,
+            'message': f'Attendance recorded for {name}',
+            'new_entry': True
+        }
+
+    if outcome == OUTCOME_PROMOTED:
+        new_confidence = max(confidence, previous_confidence)
+        print(f"✓ Updated absent → present: confidence {previous_confidence:.1f}% → {new_confidence:.1f}%")
+        return {
+            'status': 'updated_to_present',
+            'message': f'{name} updated from absent to present',
+            'student_id': student_id,
+            'student_name': name,
+            'confidence': new_confidence,
+            'previous_status': previous_status,
+            'action': 'absent_to_present'
+        }
+
+    if outcome == OUTCOME_CONFIDENCE_UPDATED:
+        print(f"✓ Updated confidence: {previous_confidence:.1f}% → {confidence:.1f}%")
+        return {
+            'status': 'confidence_updated',
+            'message': f'{name} confidence updated (already present)',
+            'student_id': student_id,
+            'student_name': name,
+            'confidence': confidence,
+            'previous_confidence': previous_confidence,
+            'action': 'confidence_improved'
+        }
+
+    # Existing record left unchanged
+    if outcome == OUTCOME_BLOCKED:
+        print(f"🚫 DUPLICATE BLOCKED: {name} marked absent, confidence {confidence:.1f}% too low to promote")
+        return {
+            'status': 'duplicate_blocked',
+            'message': f'{name} already has attendance record in this session',
+            'student_id': student_id,
+            'student_name': name,
+            'existing_status': previous_status,
+            'existing_confidence': previous_confidence,
+            'action': 'blocked_duplicate'
+        }
+
+    print(f"✓ No update needed: existing confidence {previous_confidence:.1f}% >= new {confidence:.1f}%")
+    return {
+        'status': 'already_present',
+        'message': f'{name} already marked present',
+        'student_id': student_id,
+        'student_name': name,
+        'confidence': previous_confidence or confidence,
+        'time_since_last': f"{_time_since(previous_timestamp, now).total_seconds():.1f}s",
+        'action': 'no_change_needed'
+    }
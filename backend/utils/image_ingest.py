@@ -0,0 +1,153 @@
+"""
+Single ingestion path for camera frames
+Accepts raw multipart bytes (bytes / bytearray / memoryview, wrapped without
+copying), base64 strings or data URLs. Frames that are too large are rejected
+from their byte size or header dimensions before any pixel is decoded, and
+large JPEGs are decoded at reduced resolution (IMREAD_REDUCED_COLOR_2/4/8,
+DCT scaling in libjpeg) when the detector would downscale them anyway.
+
+The result is a BGR uint8 array, the order every detector and aligner here
+takes; the detector does the one BGR->RGB conversion it needs.
+"""
+
+import base64
+import binascii
+import struct
+import logging
+
+import cv2
+import numpy as np
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# Reduced-resolution decode flags by scale factor (largest first)
+_REDUCED_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+# JPEG start-of-frame markers carrying the image size (not DHT/JPG/DAC)
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+class FrameTooLarge(ValueError):
+    """Raised when a frame exceeds INGEST_MAX_BYTES or INGEST_MAX_PIXELS"""
+    pass
+
+
+def _as_buffer(image_data):
+    """Return the encoded frame as a uint8 array without copying raw bytes"""
+    if isinstance(image_data, str):
+        # Strip the data URL prefix if present
+        if image_data.startswith('data:'):
+            image_data = image_data.split(',', 1)[1]
+        try:
+            image_data = base64.b64decode(image_data)
+        except (binascii.Error, ValueError) as e:
+            raise ValueError(f"Invalid base64 image data: {e}")
+
+    if isinstance(image_data, (bytes, bytearray, memoryview)):
+        return np.frombuffer(memoryview(image_data), dtype=np.uint8)
+
+    raise ValueError(f"Unsupported image data type: {type(image_data)}")
+
+
+def image_dimensions(buf):
+    """
+    (width, height) from a JPEG or PNG header, or None if unknown
+
+    Only the header is read; nothing is decoded.
+    """
+    data = memoryview(buf)
+
+    # PNG: fixed-position IHDR chunk
+    if len(data) >= 24 and bytes(data[:8]) == b'\x89PNG\r\n\x1a\n':
+        width, height = struct.unpack('>II', bytes(data[16:24]))
+        return width, height
+
+    # JPEG: walk the markers up to the first start-of-frame segment
+    if len(data) < 4 or data[0] != 0xFF or data[1] != 0xD8:
+        return None
+
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:  # Fill byte
+            pos += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:  # No length field
+            pos += 2
+            continue
+
+        length = (data[pos + 2] << 8) | data[pos + 3]
+        if marker in _JPEG_SOF:
+            if pos + 9 > len(data):
+                return None
+            height = (data[pos + 5] << 8) | data[pos + 6]
+            width = (data[pos + 7] << 8) | data[pos + 8]
+            return width, height
+        pos += 2 + length
+
+    return None
+
+
+def _reduced_flag(dimensions, max_side):
+    """Largest IMREAD_REDUCED_* factor that keeps the long side >= max_side"""
+    if not max_side or dimensions is None:
+        return cv2.IMREAD_COLOR, 1
+
+    long_side = max(dimensions)
+    for factor, flag in _REDUCED_FLAGS:
+        if long_side // factor >= max_side:
+            return flag, factor
+
+    return cv2.IMREAD_COLOR, 1
+
+
+def decode_frame(image_data, max_side=None):
+    """
+    Decode a camera frame to a BGR uint8 array
+
+    Args:
+        image_data: bytes / bytearray / memoryview, base64 string or data URL;
+            a numpy array is returned unchanged
+        max_side: Long side the consumer needs (e.g. the detector input). The
+            JPEG is decoded at 1/2, 1/4 or 1/8 scale as long as the long side
+            stays at or above this; None decodes at full resolution
+
+    Returns:
+        BGR image (H, W, 3)
+
+    Raises:
+        FrameTooLarge: frame over INGEST_MAX_BYTES or INGEST_MAX_PIXELS
+        ValueError: anything that cannot be decoded
+    """
+    if isinstance(image_data, np.ndarray):
+        return image_data
+
+    buf = _as_buffer(image_data)
+    if buf.size == 0:
+        raise ValueError("Empty image data")
+    if buf.size > config.INGEST_MAX_BYTES:
+        raise FrameTooLarge(f"Frame is {buf.size} bytes (limit {config.INGEST_MAX_BYTES})")
+
+    dimensions = image_dimensions(buf)
+    if dimensions is not None and dimensions[0] * dimensions[1] > config.INGEST_MAX_PIXELS:
+        raise FrameTooLarge(
+            f"Frame is {dimensions[0]}x{dimensions[1]} (limit {config.INGEST_MAX_PIXELS} pixels)"
+        )
+
+    flag, factor = _reduced_flag(dimensions, max_side)
+    img = cv2.imdecode(buf, flag)
+    if img is None:
+        raise ValueError("Failed to decode image")
+
+    if factor > 1:
+        logger.debug(f"Decoded {dimensions[0]}x{dimensions[1]} frame at 1/{factor} scale")
+
+    return img
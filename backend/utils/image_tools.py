@@ -4,25 +4,13 @@ from PIL import Image
 import io
 import base64
 
+from utils.image_ingest import decode_frame
+
 def decode_image(image_data):
     """Decode image from various formats (base64, bytes, file)"""
+    # Same ingestion path as the attendance endpoints
     try:
-        # If it's base64 string
-        if isinstance(image_data, str):
-            if ',' in image_data:
-                image_data = image_data.split(',')[1]
-            image_bytes = base64.b64decode(image_data)
-        else:
-            image_bytes = image_data
-        
-        # Convert to numpy array
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        if img is None:
-            raise ValueError("Failed to decode image")
-        
-        return img
+        return decode_frame(image_data)
     except Exception as e:
         raise ValueError(f"Image decode error: {str(e)}")
 
@@ -42,6 +30,43 @@ def resize_image(img, max_size=800):
         img = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_AREA)
     return img
 
+def stack_face_batch(faces, size=160, bgr=True):
+    """
+    Stack face crops into one contiguous (N, size, size, 3) uint8 RGB array
+
+    Accepts a list of numpy arrays / PIL images or an (N, H, W, 3) array.
+    Crops of a different size are resized; PIL images are taken as RGB
+    regardless of the bgr flag.
+    """
+    if isinstance(faces, np.ndarray) and faces.ndim == 4:
+        batch = faces
+    else:
+        crops = []
+        for face in faces:
+            if isinstance(face, Image.Image):
+                face = np.asarray(face.convert('RGB'))
+                if bgr:
+                    face = face[..., ::-1]
+            face = np.asarray(face)
+            if face.ndim == 2:
+                face = cv2.cvtColor(face, cv2.COLOR_GRAY2BGR)
+            if face.shape[:2] != (size, size):
+                face = cv2.resize(face, (size, size), interpolation=cv2.INTER_LINEAR)
+            crops.append(face)
+        batch = np.stack(crops)
+
+    if batch.shape[1:] != (size, size, 3):
+        batch = np.stack([
+            cv2.resize(face, (size, size), interpolation=cv2.INTER_LINEAR)
+            for face in batch
+        ])
+
+    # OpenCV uses BGR, FaceNet was trained on RGB
+    if bgr:
+        batch = batch[..., ::-1]
+
+    return np.ascontiguousarray(batch, dtype=np.uint8)
+
 def allowed_file(filename, allowed_extensions):
     """Check if file extension is allowed"""
     return '.' in filename and \
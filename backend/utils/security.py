@@ -12,6 +12,49 @@ def verify_password(password: str, hashed: str) -> bool:
     """Verify a password against its hash"""
     return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
 
+def check_user_role(user_id, allowed_roles, verbose=True):
+    """
+    Load a user and check that the account is enabled and has an allowed role.
+    
+    Shared by role_required and callers outside a Flask view (e.g. the
+    WebSocket stream, which authenticates with a token in its first message).
+    verbose=False skips the console tracing; the caller reports the error.
+    
+    Returns:
+        (user, None, None) if allowed, else (user or None, error message, HTTP status)
+    """
+    if verbose:
+        print(f"SECURITY DEBUG: Checking role for user {user_id}")
+    
+    db = get_db()
+    result = db.execute_query("SELECT * FROM users WHERE id = %s", (user_id,))
+    if verbose:
+        print(f"SECURITY DEBUG: Query result type: {type(result)}, length: {len(result) if result else 0}")
+    user = result[0] if result else None
+    if verbose:
+        print(f"SECURITY DEBUG: User extracted: {user is not None}")
+    
+    if not user:
+        if verbose:
+            print(f"❌ User not found with ID: {user_id}")
+        return None, 'User not found', 404
+    
+    # Check if user is enabled
+    if not user.get('enabled', True):
+        if verbose:
+            print(f"❌ User account is disabled: {user_id}")
+        return user, 'Account is disabled. Please contact administrator.', 403
+    
+    if verbose:
+        print(f"✅ User role: {user['role']}, Required roles: {allowed_roles}")
+    
+    if user['role'] not in allowed_roles:
+        if verbose:
+            print(f"❌ Insufficient permissions. User role: {user['role']}, Required: {allowed_roles}")
+        return user, 'Insufficient permissions', 403
+    
+    return user, None, None
+
 def role_required(*allowed_roles):
     """
     Decorator to require specific roles.
@@ -32,28 +75,9 @@ def role_required(*allowed_roles):
             # At this point, @jwt_required() has already verified the JWT
             # We can safely call get_jwt_identity() without RuntimeError
             user_id = get_jwt_identity()
-            print(f"SECURITY DEBUG: Checking role for user {user_id}")
-            
-            db = get_db()
-            result = db.execute_query("SELECT * FROM users WHERE id = %s", (user_id,))
-            print(f"SECURITY DEBUG: Query result type: {type(result)}, length: {len(result) if result else 0}")
-            user = result[0] if result else None
-            print(f"SECURITY DEBUG: User extracted: {user is not None}")
-            
-            if not user:
-                print(f"❌ User not found with ID: {user_id}")
-                return jsonify({'error': 'User not found'}), 404
-            
-            # Check if user is enabled
-            if not user.get('enabled', True):
-                print(f"❌ User account is disabled: {user_id}")
-                return jsonify({'error': 'Account is disabled. Please contact administrator.'}), 403
-            
-            print(f"✅ User role: {user['role']}, Required roles: {allowed_roles}")
-            
-            if user['role'] not in allowed_roles:
-                print(f"❌ Insufficient permissions. User role: {user['role']}, Required: {allowed_roles}")
-                return jsonify({'error': 'Insufficient permissions'}), 403
+            user, error, status = check_user_role(user_id, allowed_roles)
+            if error is not None:
+                return jsonify({'error': error}), status
             
             return fn(*args, **kwargs)
         return wrapper
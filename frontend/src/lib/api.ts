@@ -308,6 +308,34 @@ export const attendanceAPI = {
     formData.append('image', image);
     return api.post('/api/attendance/detect-face', formData);
   },
+
+  // Overlay boxes and attendance for every face from one detection pass
+  recognizeFrame: (image: Blob, sessionId: string) => {
+    const formData = new FormData();
+    formData.append('session_id', sessionId);
+    formData.append('overlay', 'true');
+    formData.append('image', image, 'frame.jpg');
+    return api.post('/api/attendance/recognize', formData);
+  },
+
+  // Classroom-photo mode: attendance for everyone in one high-resolution photo
+  recognizePhoto: (image: Blob, sessionId: string) => {
+    const formData = new FormData();
+    formData.append('session_id', sessionId);
+    formData.append('image', image, 'classroom.jpg');
+    return api.post('/api/attendance/recognize-photo', formData);
+  },
+
+  // Late uploads / recorded replays: many images (or zip archives) in one request
+  recognizeBatch: (images: Blob[], sessionId: string, multiFace = false) => {
+    const formData = new FormData();
+    formData.append('session_id', sessionId);
+    formData.append('multi_face', String(multiFace));
+    images.forEach((image, i) => {
+      formData.append('images', image, image instanceof File ? image.name : `image_${i}.jpg`);
+    });
+    return api.post('/api/attendance/recognize-batch', formData);
+  },
 };
 
 // Instructor API
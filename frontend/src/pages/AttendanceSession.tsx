@@ -67,7 +67,12 @@ export default function AttendanceSession() {
       } else if (result.status === 'no_face') {
         toast('⚠️ No face detected - Please face the camera', { 
           icon: '👤',
-          duration: 2000 
+          duration: 2000
+        });
+      } else if (result.status === 'low_quality') {
+        toast(`⚠️ ${result.message}`, {
+          icon: '📷',
+          duration: 2000
         });
       } else if (result.error) {
         toast.error(result.error);